@@ -0,0 +1,20 @@
+# asgi.py
+"""
+ASGI 진입점(선택)
+
+    pip install asgiref uvicorn
+    uvicorn asgi:app --workers 2 --host 0.0.0.0 --port $PORT
+
+Flask 앱을 asgiref의 WsgiToAsgi로 감싸 같은 라우트를 ASGI 서버에서 제공합니다.
+요청 처리는 여전히 스레드에서 동기로 실행됩니다. 배포용이 아니라 `python -m benchmarks.load`의
+비교 대상(asgi)으로 남겨 둡니다. 이 비교에서 gthread가 더 빨랐고, 오래 기다리는 작업(크롤, 발송)은
+이미 요청 스레드 밖(작업 워커, 발송 풀)에서 돌기 때문에 httpx/asyncpg 기반 비동기 재작성은 하지 않았습니다.
+"""
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError as e:
+    raise RuntimeError("ASGI로 실행하려면 asgiref와 uvicorn을 설치하세요: pip install asgiref uvicorn") from e
+
+from main import app as wsgi_app
+
+app = WsgiToAsgi(wsgi_app)
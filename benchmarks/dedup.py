@@ -0,0 +1,72 @@
+"""
+중복 확인 마이크로 벤치마크: 게시글별 is_post_sent 반복 vs fingerprint_lookup 일괄 조회(크롤러가 쓰는 방식)
+
+실행: DATABASE_URL=postgres://... python -m benchmarks.dedup --posts 10 --rounds 20
+벤치마크 전용 테이블(bench_sent_posts)을 만들고 끝나면 삭제합니다. 게시글별 조회/기록은 비교 기준으로만
+여기에 두고, database 모듈은 일괄 API만 제공합니다.
+"""
+import argparse
+import time
+
+import database
+
+
+def _is_post_sent(link):
+    with database.get_cursor() as cur:
+        cur.execute(f"SELECT id FROM {database.POSTS_TABLE} WHERE link = %s LIMIT 1", (link,))
+        return cur.fetchone() is not None
+
+
+def _add_sent_post(link, title):
+    with database.get_cursor() as cur:
+        cur.execute(f"INSERT INTO {database.POSTS_TABLE} (link, title) VALUES (%s, %s) ON CONFLICT (link) DO NOTHING",
+                    (link, title))
+
+
+def _run(label, func, rounds):
+    before = database.pool_stats()["checkouts"]
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = time.perf_counter() - started
+    round_trips = (database.pool_stats()["checkouts"] - before) / rounds
+    print(f"{label:<28} {elapsed / rounds * 1000:8.2f} ms/크롤  DB 왕복 {round_trips:.0f}회/크롤")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=10, help="페이지당 게시글 수")
+    parser.add_argument("--rounds", type=int, default=20, help="반복 횟수")
+    args = parser.parse_args()
+
+    database.init_db()
+    # 운영 테이블과 같은 구조(제약 조건 포함)의 벤치마크 전용 테이블을 씁니다.
+    with database.get_cursor() as cur:
+        cur.execute(f"CREATE TABLE IF NOT EXISTS bench_sent_posts (LIKE {database.POSTS_TABLE} INCLUDING ALL)")
+    database.POSTS_TABLE = "bench_sent_posts"
+    try:
+        posts = [{"link": f"https://bench.invalid/post/{i}", "title": f"벤치마크 공지 {i}"} for i in range(args.posts)]
+        links = [p["link"] for p in posts]
+        # 절반은 이미 발송된 상태로 만들어 실제 크롤과 비슷하게 맞춥니다.
+        database.add_sent_posts(posts[args.posts // 2:])
+
+        def per_post():
+            for link in links:
+                _is_post_sent(link)
+
+        def bulk():
+            database.fingerprint_lookup(links)
+
+        _run("is_post_sent 반복", per_post, args.rounds)
+        _run("fingerprint_lookup 일괄", bulk, args.rounds)
+
+        _run("add_sent_post 반복", lambda: [_add_sent_post(p["link"], p["title"]) for p in posts], args.rounds)
+        _run("add_sent_posts 일괄", lambda: database.add_sent_posts(posts), args.rounds)
+    finally:
+        with database.get_cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {database.POSTS_TABLE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+크롤+발송 종단 간 벤치마크: 로컬 게시판 스텁, 텔레그램 스텁, 일회용 Postgres 데이터베이스
+
+실행: python -m benchmarks.e2e [--subscribers 1000,10000,100000] [--posts 1] [--output result.json]
+                               [--compare baseline.json] [--board-latency-ms 50] [--board-429 0.0]
+
+구독자 수마다 새 데이터베이스를 만들어 구독자를 채우고, 별도 프로세스에서
+pipeline.run_crawl_and_notify()를 한 번 실행합니다. 측정 항목:
+- 종단 간 시간과 단계별 시간(crawl_history.timings: 크롤, 대기열 등록, 발송, 색인)
+- 초당 발송 수, 스텁이 받은 sendMessage 수
+- DB 왕복 수(연결 풀 대여 횟수), 최대 메모리(RSS)
+
+DB는 --database-url(기본 DATABASE_URL)이 가리키는 서버에 임시 데이터베이스를 만들어 쓰고 끝나면 삭제합니다.
+서버 주소가 없으면 pgserver(선택 설치)로 임시 Postgres를 띄웁니다.
+결과는 JSON으로 저장하고, --compare로 이전 결과와 항목별 변화율을 비교할 수 있습니다.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import psycopg2
+
+from benchmarks.stubs import BoardStub, TelegramStub
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = "123456:bench-token"
+# 비교 시 값이 클수록 좋은 항목. 나머지는 작을수록 좋습니다.
+HIGHER_IS_BETTER = {"sends_per_sec"}
+
+
+def _database_url(url: str, dbname: str) -> str:
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(path=f"/{dbname}"))
+
+
+def _admin(url: str, sql: str) -> None:
+    conn = psycopg2.connect(url)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+    finally:
+        conn.close()
+
+
+def _start_pgserver():
+    try:
+        import pgserver
+    except ImportError:
+        raise SystemExit("DATABASE_URL(또는 --database-url)을 지정하거나 pgserver를 설치하세요: pip install pgserver")
+    server = pgserver.get_server(tempfile.mkdtemp(prefix="bench-pg-"), cleanup_mode="stop")
+    uri = server.get_uri()
+    return server, f"{uri}{'&' if '?' in uri else '?'}sslmode=disable"
+
+
+def run_one(subscribers: int, posts: int, output: str) -> None:
+    """자식 프로세스: 환경변수로 받은 스텁/DB 주소로 파이프라인을 한 번 실행하고 결과를 output에 씁니다."""
+    import crawler
+    import database
+    import pipeline
+
+    database.init_db()
+    with database.get_cursor() as cur:
+        cur.execute(
+            f"INSERT INTO {database.SUBSCRIBERS_TABLE} (user_id) SELECT g::text FROM generate_series(1, %s) g",
+            (subscribers,),
+        )
+    # 첫 페이지의 위쪽 일반 글 posts개만 새 글로 남기고 나머지는 발송된 것으로(지문 포함) 기록합니다.
+    with open(os.path.join(ROOT, "benchmarks", "fixtures", "board_list.html"), encoding="utf-8") as f:
+        rows = crawler._parse_recent_posts(f.read(), board=crawler.load_boards()[0])
+    fresh = [row["link"] for row in rows if not row["pinned"]][:posts]
+    known = [row for row in rows if row["link"] not in fresh]
+    database.add_sent_posts(known)
+    database.save_fingerprints(known)
+
+    checkouts = database.pool_stats()["checkouts"]
+    started = time.perf_counter()
+    result = pipeline.run_crawl_and_notify()
+    elapsed = time.perf_counter() - started
+    round_trips = database.pool_stats()["checkouts"] - checkouts
+    timings = database.recent_crawl_history(1)[0]["timings"] or {}
+    delivery = result.get("delivery", {})
+    delivery_sec = (timings.get("delivery_ms") or 0) / 1000
+    report = {
+        "subscribers": subscribers,
+        "new_posts": result.get("posts_count", 0),
+        "status": result["status"],
+        "end_to_end_sec": round(elapsed, 3),
+        "timings_ms": timings,
+        "sent": delivery.get("sent", 0),
+        "failed": delivery.get("failed", 0) + delivery.get("blocked", 0),
+        "sends_per_sec": round(delivery.get("sent", 0) / delivery_sec, 1) if delivery_sec else None,
+        "db_round_trips": round_trips,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False)
+
+
+def _run_size(admin_url: str, subscribers: int, args, board: BoardStub, telegram: TelegramStub) -> dict:
+    dbname = f"hoseo_bench_{os.getpid()}_{subscribers}"
+    _admin(admin_url, f"CREATE DATABASE {dbname}")
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            output = f.name
+        env = dict(
+            os.environ,
+            DATABASE_URL=_database_url(admin_url, dbname),
+            HOSEO_BASE_URL=board.url,
+            TELEGRAM_API_URL=telegram.url,
+            TELEGRAM_BOT_TOKEN=TOKEN,
+            # 스텁 상대이므로 예의 대기와 전송 속도 제한을 풀어 코드 자체의 비용을 잽니다.
+            CRAWL_MIN_INTERVAL="0",
+            CRAWL_MAX_INTERVAL="0",
+            TELEGRAM_GLOBAL_RATE=str(args.send_rate),
+            PYTHONUNBUFFERED="1",
+        )
+        sends_before = telegram.calls.get("sendMessage", 0)
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.e2e", "--run-one", str(subscribers), "--posts", str(args.posts),
+             "--output", output],
+            cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL if not args.verbose else None,
+        )
+        with open(output, encoding="utf-8") as f:
+            report = json.load(f)
+        os.unlink(output)
+        report["stub_send_calls"] = telegram.calls.get("sendMessage", 0) - sends_before
+        return report
+    finally:
+        _admin(admin_url, f"DROP DATABASE IF EXISTS {dbname}")
+
+
+def _compare(results: list[dict], baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["subscribers"]: r for r in json.load(f)["results"]}
+    print(f"\n{baseline_path} 대비 변화율(+는 개선)")
+    for r in results:
+        base = baseline.get(r["subscribers"])
+        if not base:
+            continue
+        changes = []
+        for key in ("end_to_end_sec", "sends_per_sec", "db_round_trips", "max_rss_mb"):
+            old, new = base.get(key), r.get(key)
+            if not old or new is None:
+                continue
+            delta = (new - old) / old * 100
+            changes.append(f"{key} {delta if key in HIGHER_IS_BETTER else -delta:+.1f}%")
+        print(f"  구독자 {r['subscribers']:>7}: " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", default="1000,10000,100000", help="쉼표로 구분한 구독자 수 목록")
+    parser.add_argument("--posts", type=int, default=1, help="새 글 수(첫 페이지 위쪽부터)")
+    parser.add_argument("--board-latency-ms", type=float, default=50.0)
+    parser.add_argument("--board-429", type=float, default=0.0, help="게시판 스텁의 429 응답 비율")
+    parser.add_argument("--telegram-latency-ms", type=float, default=0.0)
+    parser.add_argument("--send-rate", type=float, default=100000.0, help="TELEGRAM_GLOBAL_RATE(초당 전송 한도)")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL", ""))
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", help="이전 결과 JSON과 비교")
+    parser.add_argument("--verbose", action="store_true", help="파이프라인 로그 출력")
+    parser.add_argument("--run-one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one is not None:
+        run_one(args.run_one, args.posts, args.output)
+        return
+
+    pg = None
+    admin_url = args.database_url
+    if not admin_url:
+        pg, admin_url = _start_pgserver()
+    sizes = [int(s) for s in args.subscribers.split(",") if s.strip()]
+    try:
+        with BoardStub(latency_ms=args.board_latency_ms, rate_limit_ratio=args.board_429) as board, \
+                TelegramStub(latency_ms=args.telegram_latency_ms) as telegram:
+            results = []
+            for size in sizes:
+                report = _run_size(admin_url, size, args, board, telegram)
+                results.append(report)
+                print(f"구독자 {size:>7}: 종단 간 {report['end_to_end_sec']:>8.2f}s  발송 {report['sent']:>7} "
+                      f"({report['sends_per_sec']}건/초)  DB 왕복 {report['db_round_trips']:>6}  "
+                      f"최대 RSS {report['max_rss_mb']}MB")
+            board_calls = dict(board.calls)
+    finally:
+        if pg is not None:
+            pg.cleanup()
+
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    document = {
+        "benchmark": "e2e",
+        "commit": commit.stdout.strip() or None,
+        "python": platform.python_version(),
+        "params": {"posts": args.posts, "board_latency_ms": args.board_latency_ms, "board_429": args.board_429,
+                   "telegram_latency_ms": args.telegram_latency_ms, "send_rate": args.send_rate},
+        "board_calls": board_calls,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(document, ensure_ascii=False, indent=2))
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+서버 부하 벤치마크: gunicorn gthread(현재 배포) vs ASGI(uvicorn + asgi.py)
+
+실행: python -m benchmarks.load [--target gthread|asgi|both] [--clients 32] [--duration 10] [--json]
+DATABASE_URL이 가리키는 DB로 서버를 실제 배포와 같은 설정(워커 2개, gthread는 스레드 8개)으로 띄우고,
+텔레그램 호출은 로컬 Bot API 스텁으로 보냅니다. 시나리오별 초당 요청 수, 지연 분포,
+워커당 메모리(RSS)를 비교합니다. 크롤링 스케줄러는 학교 서버에 요청하지 않도록 끕니다.
+
+- healthz: I/O 없는 요청(서버·프레임워크 자체 비용)
+- webhook: /telegram/webhook의 /help 업데이트(응답 본문으로 즉시 답장, DB 없음)
+- search: /search?q=...(DB 조회 포함)
+"""
+import argparse
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+from benchmarks.stubs import TelegramStub
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = "123456:bench-token"
+WORKERS = 2
+THREADS = 8
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _server_command(server: str, port: int) -> list[str]:
+    bind = f"127.0.0.1:{port}"
+    if server == "gthread":
+        return [sys.executable, "-m", "gunicorn", "-w", str(WORKERS), "-k", "gthread", "--threads", str(THREADS),
+                "-t", "60", "--bind", bind, "main:app"]
+    return [sys.executable, "-m", "uvicorn", "asgi:app", "--workers", str(WORKERS), "--host", "127.0.0.1",
+            "--port", str(port), "--log-level", "warning", "--no-access-log"]
+
+
+def _is_helper(pid: int) -> bool:
+    # uvicorn --workers는 multiprocessing 자원 추적 프로세스도 띄우므로 워커에서 제외합니다.
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return b"resource_tracker" in f.read()
+    except OSError:
+        return True
+
+
+def _children(pid: int) -> list[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # 두 번째 필드(comm)에 공백이 있을 수 있으므로 마지막 ')' 뒤에서 읽습니다.
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid and not _is_helper(int(entry)):
+            children.append(int(entry))
+    return children
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _wait_ready(url: str, process, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("서버가 시작 중 종료되었습니다.")
+        try:
+            if requests.get(f"{url}/healthz", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("서버가 준비되지 않았습니다.")
+
+
+def _scenarios():
+    update_ids = itertools.count(1)
+
+    def webhook(session, url):
+        update = {"update_id": next(update_ids), "message": {"chat": {"id": 1}, "text": "/help"}}
+        return session.post(f"{url}/telegram/webhook", json=update, timeout=10)
+
+    return {
+        "healthz": lambda session, url: session.get(f"{url}/healthz", timeout=10),
+        "webhook": webhook,
+        "search": lambda session, url: session.get(f"{url}/search", params={"q": "수강신청", "limit": 5}, timeout=10),
+    }
+
+
+def _load(url: str, request, clients: int, duration: float) -> dict:
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        local, failed = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                ok = request(session, url).status_code < 500
+            except requests.RequestException:
+                ok = False
+            local.append(time.perf_counter() - started)
+            failed += not ok
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def pct(q):
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 2) if latencies else None
+
+    return {"requests": len(latencies), "errors": errors[0], "requests_per_sec": round(len(latencies) / elapsed, 1),
+            "p50_ms": pct(0.5), "p99_ms": pct(0.99)}
+
+
+def run_server(server: str, scenarios: list[str], clients: int, duration: float, stub_url: str) -> dict:
+    port = _free_port()
+    env = dict(os.environ, TELEGRAM_API_URL=stub_url, TELEGRAM_BOT_TOKEN=TOKEN, CRAWL_SCHEDULER="0",
+               PYTHONUNBUFFERED="1")
+    process = subprocess.Popen(_server_command(server, port), cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(url, process)
+        available = _scenarios()
+        results = {}
+        for name in scenarios:
+            results[name] = _load(url, available[name], clients, duration)
+        workers = _children(process.pid)
+        rss = [_rss_kb(pid) for pid in workers]
+        return {"server": server, "workers": len(workers), "scenarios": results,
+                "rss_mb_per_worker": round(sum(rss) / len(rss) / 1024, 1) if rss else None,
+                "rss_mb_master": round(_rss_kb(process.pid) / 1024, 1)}
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["gthread", "asgi", "both"], default="both",
+                        help="asgi는 asgi.py(WsgiToAsgi 비교용)를 uvicorn으로 띄웁니다")
+    parser.add_argument("--scenario", action="append", choices=["healthz", "webhook", "search"],
+                        help="여러 번 지정 가능(기본: 전체)")
+    parser.add_argument("--clients", type=int, default=32, help="동시 클라이언트 수")
+    parser.add_argument("--duration", type=float, default=10.0, help="시나리오별 측정 시간(초)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if not os.environ.get("DATABASE_URL"):
+        parser.error("DATABASE_URL 환경변수가 필요합니다.")
+    servers = ["gthread", "asgi"] if args.target == "both" else [args.target]
+    scenarios = args.scenario or ["healthz", "webhook", "search"]
+
+    with TelegramStub() as stub:
+        reports = [run_server(server, scenarios, args.clients, args.duration, stub.url) for server in servers]
+
+    if args.json:
+        print(json.dumps({"clients": args.clients, "duration_sec": args.duration, "results": reports},
+                         ensure_ascii=False, indent=2))
+        return
+    print(f"동시 클라이언트 {args.clients}개, 시나리오별 {args.duration:.0f}초")
+    for report in reports:
+        print(f"\n[{report['server']}] 워커 {report['workers']}개, 워커당 RSS {report['rss_mb_per_worker']}MB")
+        for name, r in report["scenarios"].items():
+            print(f"  {name:<8} {r['requests_per_sec']:>8.1f} req/s  p50 {r['p50_ms']:>7}ms  p99 {r['p99_ms']:>7}ms  "
+                  f"오류 {r['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+계측 오버헤드 벤치마크: metrics.timed 데코레이터와 라벨 카운터의 호출당 비용
+
+실행: python -m benchmarks.metrics_overhead [--calls 200000]
+측정한 호출당 비용을 실제 경로의 대표 소요 시간(파싱 ~0.3ms, DB 조회 ~1ms, 텔레그램 전송 ~10ms)과
+비교해 비율로 보여 줍니다.
+"""
+import argparse
+import time
+
+import metrics
+from prometheus_client import CollectorRegistry, Counter, Histogram
+
+TYPICAL_PATH_MS = {"parse": 0.3, "db_query": 1.0, "telegram_send": 10.0}
+
+
+def _per_call_ns(func, calls):
+    started = time.perf_counter_ns()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter_ns() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    # 실제 지표를 오염시키지 않도록 별도 레지스트리에 같은 구성의 지표를 만듭니다.
+    registry = CollectorRegistry()
+    histogram = Histogram("bench_seconds", "bench", ["query"], registry=registry)
+    counter = Counter("bench_total", "bench", ["reason"], registry=registry)
+
+    def plain():
+        return None
+
+    decorated = metrics.timed(histogram, query="bench")(plain)
+
+    baseline = _per_call_ns(plain, args.calls)
+    timed_ns = _per_call_ns(decorated, args.calls) - baseline
+    counter_ns = _per_call_ns(lambda: counter.labels(reason="bench").inc(), args.calls) - baseline
+
+    print(f"{args.calls}회 측정")
+    print(f"timed 데코레이터      {timed_ns:8.0f} ns/호출")
+    print(f"라벨 카운터 inc()     {counter_ns:8.0f} ns/호출")
+    for path, ms in TYPICAL_PATH_MS.items():
+        print(f"  {path:<14} 대비 {timed_ns / (ms * 1e6) * 100:.4f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+목록 파서 벤치마크: 백엔드별 파싱 시간과 최대 메모리 비교
+
+실행: python -m benchmarks.parse [--rounds 200] [--fixture benchmarks/fixtures/*.html]
+"기존 방식"은 페이지 전체를 BeautifulSoup(html.parser)로 파싱하던 이전 구현입니다.
+메모리는 백엔드마다 별도 프로세스에서 측정합니다(C 확장 할당까지 포함되도록 ru_maxrss 사용).
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import time
+
+import parsers
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _legacy_parse(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    return [row.select_one(parsers.TITLE_SELECTOR) for row in soup.select(parsers.ROW_SELECTOR)]
+
+
+def _measure(backend, pages, rounds, queue):
+    if backend == "legacy":
+        parse = _legacy_parse
+        _legacy_parse(pages[0])
+    else:
+        parser = parsers.BACKENDS[backend]()
+        parse = parser.parse_rows
+        parse(pages[0])
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            parse(html)
+    elapsed = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        "backend": backend,
+        "ms_per_page": round(elapsed / (rounds * len(pages)) * 1000, 3),
+        "peak_rss_delta_kb": rss_after - rss_before,
+        "peak_rss_kb": rss_after,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--fixture", action="append", help="측정할 HTML 파일(여러 번 지정 가능)")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    args = parser.parse_args()
+
+    paths = args.fixture or sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for backend in ["legacy", *parsers.BACKENDS]:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_measure, args=(backend, pages, args.rounds, queue))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0 or queue.empty():
+            results.append({"backend": backend, "error": "측정 실패(미설치 가능성)"})
+            continue
+        results.append(queue.get())
+
+    if args.json:
+        print(json.dumps({"fixtures": paths, "rounds": args.rounds, "results": results}, ensure_ascii=False, indent=2))
+        return
+    print(f"픽스처 {len(pages)}개, {args.rounds}회 반복")
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<11} {r['error']}")
+        else:
+            print(f"{r['backend']:<11} {r['ms_per_page']:8.3f} ms/페이지  최대 RSS 증가 {r['peak_rss_delta_kb']:>6} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+벤치마크용 로컬 스텁 서버
+
+- TelegramStub: Bot API(sendMessage, getUpdates 등)를 흉내 냅니다. 지연 시간과 429 주입을 설정할 수 있고,
+  push_updates()로 쌓은 업데이트를 getUpdates 롱 폴링으로 돌려줍니다.
+- BoardStub: 학교 게시판(BBSList/BBSView)을 흉내 냅니다. 목록은 기록해 둔 HTML(fixtures/board_list.html)을,
+  상세는 간단한 본문 페이지를 돌려주며, 지연 시간과 429(Retry-After) 주입을 설정할 수 있습니다.
+- 선택적으로 자체 서명 인증서(openssl 필요)로 TLS를 켜서 핸드셰이크 비용까지 재현합니다.
+"""
+import json
+import os
+import random
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def make_self_signed_cert(directory: str) -> tuple[str, str]:
+    """localhost/127.0.0.1용 자체 서명 인증서를 만들어 (cert, key) 경로를 반환합니다."""
+    if shutil.which("openssl") is None:
+        raise RuntimeError("TLS 스텁에는 openssl이 필요합니다.")
+    cert = os.path.join(directory, "stub-cert.pem")
+    key = os.path.join(directory, "stub-key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+class _StubServer:
+    """ThreadingHTTPServer를 백그라운드 스레드에서 실행하는 공통 틀입니다."""
+
+    handler_class = BaseHTTPRequestHandler
+
+    def __init__(self, latency_ms: float = 0.0, tls: bool = False):
+        self.latency_ms = latency_ms
+        self.tls = tls
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._tmpdir = None
+        self.cert_file = None
+        self._server = None
+        self._thread = None
+
+    def _count(self, new_connection: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            if new_connection:
+                self.connections += 1
+
+    def start(self):
+        stub = self
+
+        class Handler(self.handler_class):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # 헤더와 본문이 따로 전송될 때 Nagle/지연 ACK로 40ms씩 묶이는 것을 막습니다.
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self.stub = stub
+                self._seen = False
+
+            def log_message(self, format, *args):
+                pass
+
+            def begin(self):
+                """요청 수/연결 수를 세고 설정된 지연을 적용합니다."""
+                stub._count(not self._seen)
+                self._seen = True
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        if self.tls:
+            self._tmpdir = tempfile.mkdtemp(prefix="stub-tls-")
+            self.cert_file, key_file = make_self_signed_cert(self._tmpdir)
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(self.cert_file, key_file)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def url(self) -> str:
+        scheme = "https" if self.tls else "http"
+        host = "localhost" if self.tls else "127.0.0.1"
+        return f"{scheme}://{host}:{self._server.server_address[1]}"
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _TelegramHandler(BaseHTTPRequestHandler):
+    def _reply(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode() if length else ""
+        self.begin()
+        stub = self.stub
+        method = self.path.rsplit("/", 1)[-1]
+        if stub.rate_limit_ratio and random.random() < stub.rate_limit_ratio:
+            stub.record(method, None, limited=True)
+            self._reply(429, {"ok": False, "error_code": 429, "description": "Too Many Requests: retry later",
+                              "parameters": {"retry_after": stub.retry_after}})
+            return
+        params = {k: v[0] for k, v in parse_qs(raw).items()}
+        if method == "getUpdates":
+            stub.record(method, None)
+            self._reply(200, {"ok": True, "result": stub.take_updates(params)})
+            return
+        chat_id = params.get("chat_id")
+        stub.record(method, chat_id)
+        if chat_id is not None and chat_id in stub.blocked_chat_ids:
+            self._reply(403, {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"})
+            return
+        self._reply(200, {"ok": True, "result": {"message_id": stub.requests, "chat": {"id": chat_id}}})
+
+
+class TelegramStub(_StubServer):
+    """Bot API 스텁. url + "/bot<token>/sendMessage" 형태의 요청에 응답합니다."""
+
+    handler_class = _TelegramHandler
+
+    def __init__(self, latency_ms: float = 0.0, tls: bool = False, rate_limit_ratio: float = 0.0,
+                 retry_after: int = 1, blocked_chat_ids=()):
+        super().__init__(latency_ms=latency_ms, tls=tls)
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.blocked_chat_ids = {str(c) for c in blocked_chat_ids}
+        self.calls: dict[str, int] = {}
+        self.rate_limited = 0
+        self._updates: list[dict] = []
+        self._updates_ready = threading.Condition(self._lock)
+
+    def push_updates(self, updates: list[dict]) -> None:
+        """getUpdates로 돌려줄 업데이트를 쌓습니다."""
+        with self._updates_ready:
+            self._updates.extend(updates)
+            self._updates_ready.notify_all()
+
+    def take_updates(self, params: dict) -> list[dict]:
+        """offset 이전 업데이트는 확인된 것으로 버리고, 최대 limit개를 돌려줍니다(없으면 timeout까지 대기)."""
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        deadline = time.monotonic() + float(params.get("timeout") or 0)
+        with self._updates_ready:
+            while True:
+                self._updates = [u for u in self._updates if u["update_id"] >= offset]
+                remaining = deadline - time.monotonic()
+                if self._updates or remaining <= 0:
+                    return self._updates[:limit]
+                self._updates_ready.wait(remaining)
+
+    def record(self, method: str, chat_id, limited: bool = False) -> None:
+        with self._lock:
+            if limited:
+                self.rate_limited += 1
+            else:
+                self.calls[method] = self.calls.get(method, 0) + 1
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+DETAIL_TEMPLATE = (
+    '<html><body><div class="board-view-contents"><p>{post_id}번 공지 본문입니다. 수강신청 일정과 장학 안내를 '
+    '확인하세요.</p></div><div class="board-view-file"><a href="/download.do?id={post_id}">첨부{post_id}.hwp</a>'
+    '</div></body></html>'
+)
+
+
+class _BoardHandler(BaseHTTPRequestHandler):
+    def _reply(self, status: int, body: bytes, headers=()) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.begin()
+        stub = self.stub
+        if stub.rate_limit_ratio and random.random() < stub.rate_limit_ratio:
+            stub.record("429")
+            self._reply(429, b"Too Many Requests", [("Retry-After", str(stub.retry_after))])
+            return
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path.endswith("BBSList.mbz"):
+            stub.record("list")
+            self._reply(200, stub.list_html)
+        elif url.path.endswith("BBSView.mbz"):
+            stub.record("view")
+            self._reply(200, DETAIL_TEMPLATE.format(post_id=params.get("schIdx", "0")).encode())
+        else:
+            self._reply(404, b"not found")
+
+
+class BoardStub(_StubServer):
+    """학교 게시판 스텁. crawler.py에 HOSEO_BASE_URL=stub.url을 지정해 사용합니다."""
+
+    handler_class = _BoardHandler
+
+    def __init__(self, latency_ms: float = 0.0, rate_limit_ratio: float = 0.0, retry_after: int = 1,
+                 fixture: str = "board_list.html"):
+        super().__init__(latency_ms=latency_ms)
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        with open(os.path.join(FIXTURE_DIR, fixture), "rb") as f:
+            self.list_html = f.read()
+        self.calls: dict[str, int] = {}
+
+    def record(self, kind: str) -> None:
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
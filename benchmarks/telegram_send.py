@@ -0,0 +1,84 @@
+"""
+텔레그램 전송 벤치마크: 호출마다 새 연결(requests.post) vs 공유 keep-alive 세션
+
+실행: python -m benchmarks.telegram_send [--calls 300] [--threads 8] [--tls] [--latency-ms 0]
+로컬 Bot API 스텁에 sendMessage를 보내고, 방식별 처리량·지연 분포·서버가 받은 TCP 연결 수를 비교합니다.
+--tls를 주면 자체 서명 인증서로 HTTPS 스텁을 띄워 TLS 핸드셰이크 비용까지 포함합니다(openssl 필요).
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stubs import TelegramStub
+
+TOKEN = "123456:bench-token"
+
+
+def _run(label, send, calls, threads, stub):
+    connections_before = stub.connections
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        oks = list(pool.map(send, range(calls)))
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": label,
+        "calls": calls,
+        "ok": sum(1 for ok in oks if ok),
+        "elapsed_sec": round(elapsed, 3),
+        "calls_per_sec": round(calls / elapsed, 1),
+        "server_connections": stub.connections - connections_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="스텁 응답 지연")
+    parser.add_argument("--tls", action="store_true")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    with TelegramStub(latency_ms=args.latency_ms, tls=args.tls) as stub:
+        if stub.cert_file:
+            os.environ["REQUESTS_CA_BUNDLE"] = stub.cert_file
+        # telegram_utils는 import 시점에 환경변수를 읽으므로 스텁 주소를 먼저 지정합니다.
+        os.environ["TELEGRAM_API_URL"] = stub.url
+        os.environ["TELEGRAM_BOT_TOKEN"] = TOKEN
+        os.environ.setdefault("TELEGRAM_POOL_SIZE", str(args.threads))
+        import requests
+        import telegram_utils
+
+        url = f"{stub.url}/bot{TOKEN}/sendMessage"
+
+        def fresh_connection(i):
+            resp = requests.post(url, data={"chat_id": i, "text": "bench"}, timeout=10)
+            return resp.status_code == 200
+
+        def shared_session(i):
+            resp, body = telegram_utils._call("sendMessage", {"chat_id": i, "text": "bench"})
+            return resp.status_code == 200 and body.get("ok")
+
+        results = [
+            _run("requests.post(매 호출 새 연결)", fresh_connection, args.calls, args.threads, stub),
+            _run("공유 세션(keep-alive)", shared_session, args.calls, args.threads, stub),
+        ]
+        latency = telegram_utils.latency_stats().get("sendMessage")
+
+    if args.json:
+        print(json.dumps({"tls": args.tls, "results": results, "shared_session_latency": latency},
+                         ensure_ascii=False, indent=2))
+        return
+    print(f"스텁: {'HTTPS' if args.tls else 'HTTP'}, 지연 {args.latency_ms}ms, 스레드 {args.threads}")
+    for r in results:
+        print(f"{r['mode']:<28} {r['calls_per_sec']:>8.1f} 건/초  {r['elapsed_sec']:>7.3f}초  "
+              f"서버 연결 {r['server_connections']}개  성공 {r['ok']}/{r['calls']}")
+    if latency:
+        print(f"공유 세션 지연: 평균 {latency['avg_ms']}ms, p50≤{latency['p50_le_ms']}ms, "
+              f"p95≤{latency['p95_le_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+키워드 알림 매칭 벤치마크: 사용자 × 키워드 전수 비교 vs Aho-Corasick 색인
+
+실행: python -m benchmarks.watch_match [--filters 100000] [--users 50000] [--titles 200] [--json]
+가상의 사용자별 키워드(한글 2~4자)를 만들고, 고정 파일(fixtures/board_list.html)의 제목에
+대해 방식별 색인 생성 시간, 제목당 매칭 시간, 결과 일치 여부를 비교합니다.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import watches
+from parsers import parse_board_rows
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "board_list.html")
+COMMON_WORDS = ["장학", "수강신청", "등록금", "졸업", "계절학기", "휴학", "복학", "기숙사", "학위", "성적",
+                "공고", "변경", "신청", "2학기", "교직", "납부", "예정자", "일정"]
+
+
+def _random_keyword(rng):
+    # 자주 쓰는 단어와 임의 음절 조합을 섞어 일치/불일치가 모두 나오게 합니다.
+    if rng.random() < 0.05:
+        return rng.choice(COMMON_WORDS)
+    return "".join(chr(rng.randint(0xAC00, 0xD7A3)) for _ in range(rng.randint(2, 4)))
+
+
+def make_watches(filters, users, seed=7):
+    rng = random.Random(seed)
+    by_keyword = {}
+    for i in range(filters):
+        user_id = str(rng.randrange(users))
+        by_keyword.setdefault(watches.normalize(_random_keyword(rng)), set()).add(user_id)
+    return by_keyword
+
+
+def make_titles(count, seed=11):
+    with open(FIXTURE, encoding="utf-8") as f:
+        base = [row["title"] for row in parse_board_rows(f.read())]
+    rng = random.Random(seed)
+    return [f"[{rng.choice(['학사공지', '장학공지'])}] {rng.choice(base)} {rng.choice(COMMON_WORDS)}" for _ in range(count)]
+
+
+def naive_match(user_keywords, text):
+    text = watches.normalize(text)
+    return {user for user, keywords in user_keywords.items() if any(k in text for k in keywords)}
+
+
+def _measure(label, build, match, titles):
+    started = time.perf_counter()
+    index = build()
+    build_sec = time.perf_counter() - started
+    started = time.perf_counter()
+    results = [match(index, title) for title in titles]
+    match_sec = time.perf_counter() - started
+    return {
+        "mode": label,
+        "build_ms": round(build_sec * 1000, 1),
+        "match_us_per_title": round(match_sec / len(titles) * 1e6, 1),
+        "recipients_total": sum(len(r) for r in results),
+    }, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filters", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--titles", type=int, default=200)
+    parser.add_argument("--naive-titles", type=int, default=20, help="전수 비교는 느리므로 일부 제목만 측정")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    by_keyword = make_watches(args.filters, args.users)
+    titles = make_titles(args.titles)
+    user_keywords = {}
+    for keyword, users in by_keyword.items():
+        for user in users:
+            user_keywords.setdefault(user, []).append(keyword)
+
+    rows = []
+    naive_row, naive_results = _measure(
+        "전수 비교(사용자 × 키워드)", lambda: user_keywords, naive_match, titles[:args.naive_titles])
+    rows.append(naive_row)
+
+    index_row, index_results = _measure(
+        "Aho-Corasick 색인", lambda: watches.WatchIndex(by_keyword), lambda index, title: index.match(title), titles)
+    rows.append(index_row)
+    consistent = index_results[:args.naive_titles] == naive_results
+
+    report = {"filters": args.filters, "distinct_keywords": len(by_keyword), "users": len(user_keywords),
+              "titles": args.titles, "results": rows, "consistent_with_naive": consistent}
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(f"키워드 {args.filters}개(고유 {len(by_keyword)}개), 사용자 {len(user_keywords)}명, 제목 {args.titles}개")
+    for r in rows:
+        print(f"{r['mode']:<28} 색인 {r['build_ms']:>9.1f}ms  제목당 {r['match_us_per_title']:>11.1f}µs  "
+              f"수신자 합계 {r['recipients_total']}")
+    print(f"전수 비교 결과와 일치: {consistent}")
+
+
+if __name__ == "__main__":
+    main()
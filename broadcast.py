@@ -0,0 +1,169 @@
+# broadcast.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import metrics
+from telegram_utils import send_message_result
+
+# 텔레그램 권장 한도: 전체 약 30건/초, 같은 채팅에는 약 1건/초
+BROADCAST_WORKERS = int(os.environ.get("BROADCAST_WORKERS", "16"))
+TELEGRAM_GLOBAL_RATE = float(os.environ.get("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_PER_CHAT_INTERVAL = float(os.environ.get("TELEGRAM_PER_CHAT_INTERVAL", "1.0"))
+
+
+class TokenBucket:
+    """초당 rate개의 토큰을 채우는 스레드 안전 토큰 버킷입니다."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """토큰 하나를 얻을 때까지 대기하고, 대기한 시간(초)을 반환합니다."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def set_rate(self, rate: float) -> None:
+        """채우는 속도와 최대 보유량을 바꿉니다(클러스터 노드 수가 바뀔 때)."""
+        with self._lock:
+            self.capacity = self.capacity * rate / self.rate
+            self.rate = rate
+            self._tokens = min(self._tokens, self.capacity)
+
+
+class PerChatLimiter:
+    """같은 chat_id로 보내는 메시지 사이에 최소 간격을 보장합니다."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, chat_id) -> float:
+        """다음 전송 슬롯을 예약하고, 그때까지 기다려야 할 시간(초)을 반환합니다."""
+        key = str(chat_id)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(key, 0.0))
+            self._next_slot[key] = slot + self.min_interval
+            if len(self._next_slot) > 10000:
+                # 이미 지난 슬롯은 정리해 메모리가 무한히 늘지 않도록 합니다.
+                self._next_slot = {k: v for k, v in self._next_slot.items() if v > now}
+            return slot - now
+
+
+class Broadcaster:
+    """제한된 워커 풀과 토큰 버킷으로 다수의 수신자에게 메시지를 전송합니다."""
+
+    def __init__(self, send_func=send_message_result, max_workers: int = BROADCAST_WORKERS,
+                 global_rate: float = TELEGRAM_GLOBAL_RATE,
+                 per_chat_interval: float = TELEGRAM_PER_CHAT_INTERVAL):
+        self.send_func = send_func
+        self.max_workers = max(1, max_workers)
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat = PerChatLimiter(per_chat_interval)
+
+    def _deliver(self, chat_id, text: str, disable_web_page_preview: bool) -> dict:
+        throttled = 0.0
+        delay = self.per_chat.reserve(chat_id)
+        if delay > 0:
+            time.sleep(delay)
+            throttled += delay
+        throttled += self.global_bucket.acquire()
+        started = time.monotonic()
+        try:
+            result = self.send_func(chat_id, text, disable_web_page_preview=disable_web_page_preview)
+        except Exception as e:
+            print(f"❌ 브로드캐스트 전송 중 예외 ({chat_id}): {e}")
+            result = {"ok": False, "error": str(e)}
+        if not isinstance(result, dict):
+            result = {"ok": bool(result)}
+        result["latency"] = time.monotonic() - started
+        result["throttled"] = throttled
+        return result
+
+    def send_batch(self, messages) -> dict:
+        """(key, chat_id, text, disable_web_page_preview) 묶음을 전송하고 key별 결과와 처리량을 반환합니다."""
+        started = time.monotonic()
+        results: dict = {}
+        latency_total = 0.0
+        throttled_total = 0.0
+        # 제출 대기 작업 수를 워커 수의 2배로 제한해 수신자가 많아도 메모리가 일정하게 유지됩니다.
+        window = self.max_workers * 2
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="broadcast") as pool:
+            pending = {}
+
+            def collect(futures):
+                nonlocal latency_total, throttled_total
+                for fut in futures:
+                    outcome = fut.result()
+                    results[pending.pop(fut)] = outcome
+                    latency_total += outcome["latency"]
+                    throttled_total += outcome["throttled"]
+
+            for key, chat_id, text, disable_web_page_preview in messages:
+                if len(pending) >= window:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending[pool.submit(self._deliver, chat_id, text, disable_web_page_preview)] = key
+            collect(list(pending))
+
+        elapsed = time.monotonic() - started
+        total = len(results)
+        sent = sum(1 for r in results.values() if r["ok"])
+        metrics.BROADCAST_SECONDS.observe(elapsed)
+        metrics.BROADCAST_MESSAGES.labels(outcome="sent").inc(sent)
+        metrics.BROADCAST_MESSAGES.labels(outcome="failed").inc(total - sent)
+        return {
+            "results": results,
+            "total": total,
+            "sent": sent,
+            "failed": total - sent,
+            "elapsed_sec": round(elapsed, 3),
+            "throughput_per_sec": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+            "avg_latency_ms": round(latency_total / total * 1000, 1) if total else 0.0,
+            "throttled_sec": round(throttled_total, 3),
+        }
+
+    def broadcast(self, recipients, text: str, disable_web_page_preview: bool = False) -> dict:
+        """모든 수신자에게 text를 전송하고 수신자별 결과와 처리량을 반환합니다.
+
+        recipients는 database.iter_subscribers() 같은 제너레이터여도 되며, 제출 창 크기만큼만
+        앞서 읽으므로 구독자 목록 전체를 메모리에 올리지 않습니다.
+        """
+        summary = self.send_batch(
+            (str(chat_id), chat_id, text, disable_web_page_preview) for chat_id in recipients
+        )
+        results = summary.pop("results")
+        summary["outcomes"] = {cid: r["ok"] for cid, r in results.items()}
+        summary["failed_chat_ids"] = [cid for cid, r in results.items() if not r["ok"]]
+        return summary
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster() -> Broadcaster:
+    """프로세스 전역 Broadcaster를 반환합니다. 속도 제한 상태는 요청 간에 공유됩니다."""
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                _broadcaster = Broadcaster()
+    return _broadcaster
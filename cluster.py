@@ -0,0 +1,80 @@
+# cluster.py
+"""
+여러 노드(프로세스)에 걸친 역할 나누기
+
+- 크롤: 작업 큐가 같은 종류의 작업을 하나로 합치고, 실행 중에는 jobs.run_job이 advisory lock을
+  쥐므로 클러스터 전체에서 한 노드만 크롤합니다.
+- 발송: 크롤한 노드가 대기열을 보내는 동안 작업이 없는 다른 노드도 outbox.drain_idle()로 같은
+  대기열을 SKIP LOCKED 배치 단위로 나눠 보냅니다. 한 건은 한 노드만 가져가므로 중복 발송이 없습니다.
+- 전송 한도: 텔레그램 한도(TELEGRAM_GLOBAL_RATE)는 봇 토큰 전체에 걸리므로, 각 노드는
+  worker_leases에 heartbeat를 남기고 살아 있는 노드 수로 한도를 나눠 씁니다.
+  노드를 늘려도 총 전송 속도는 늘지 않고, 응답 대기 시간이 긴 전송을 더 많이 겹쳐 보낼 수 있을 뿐입니다.
+"""
+import atexit
+import os
+import socket
+import threading
+
+import database
+from broadcast import TELEGRAM_GLOBAL_RATE, get_broadcaster
+
+CLUSTER_LEASE_INTERVAL = float(os.environ.get("CLUSTER_LEASE_INTERVAL", "10"))
+# heartbeat가 이보다 오래되면 죽은 노드로 보고 목록에서 지웁니다.
+CLUSTER_LEASE_TTL = float(os.environ.get("CLUSTER_LEASE_TTL", "30"))
+
+_thread = None
+_thread_pid = None
+_thread_lock = threading.Lock()
+_state = {"live_nodes": None, "rate_per_node": None}
+
+
+def node_id() -> str:
+    """이 프로세스의 노드 ID(호스트명:pid). fork된 워커마다 다릅니다."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def renew() -> int:
+    """heartbeat를 갱신하고 전송 한도를 살아 있는 노드 수에 맞춥니다. 노드 수를 반환합니다."""
+    live = max(1, database.renew_lease(node_id(), CLUSTER_LEASE_TTL))
+    rate = TELEGRAM_GLOBAL_RATE / live
+    if live != _state["live_nodes"]:
+        get_broadcaster().global_bucket.set_rate(rate)
+        if _state["live_nodes"] is not None:
+            print(f"ℹ️ 살아 있는 노드 {live}개: 노드당 전송 한도 {rate:.1f}건/초")
+    _state.update(live_nodes=live, rate_per_node=round(rate, 2))
+    return live
+
+
+def _loop() -> None:
+    stop = threading.Event()
+    while True:
+        try:
+            renew()
+        except Exception as e:
+            print(f"노드 heartbeat 갱신 실패: {e}")
+        if stop.wait(CLUSTER_LEASE_INTERVAL):
+            return
+
+
+def _release() -> None:
+    try:
+        database.release_lease(node_id())
+    except Exception as e:
+        print(f"노드 lease 해제 실패: {e}")
+
+
+def start() -> None:
+    """현재 프로세스의 heartbeat 스레드를 시작합니다(이미 실행 중이면 무시)."""
+    global _thread, _thread_pid
+    with _thread_lock:
+        if _thread is not None and _thread.is_alive() and _thread_pid == os.getpid():
+            return
+        _thread = threading.Thread(target=_loop, daemon=True, name="cluster-lease")
+        _thread.start()
+        _thread_pid = os.getpid()
+        atexit.register(_release)
+
+
+def status() -> dict:
+    """이 노드의 ID와 마지막으로 확인한 노드 수, 노드당 전송 한도를 반환합니다."""
+    return {"node_id": node_id(), **_state}
@@ -0,0 +1,129 @@
+# commands.py
+"""
+텔레그램 명령 처리
+
+웹훅(webhook.py)이 업데이트를 받으면 먼저 quick_reply()로 메모리만으로 답할 수 있는지 보고,
+답할 수 있으면 웹훅 응답 본문으로 바로 답장합니다. DB를 거쳐야 하는 명령은 handle()이
+백그라운드 풀에서 처리한 뒤 sendMessage로 답장합니다.
+롱 폴링(polling.py)은 bulk_command()로 구독/해제 명령을 골라 배치 단위로 한꺼번에 반영합니다.
+"""
+import details
+import digest
+import scheduler
+import subscribers
+import watches
+
+HELP_TEXT = (
+    f"이 봇은 학사공지를 {scheduler.CRAWL_INTERVAL_MIN / 60:.0f}분~{scheduler.CRAWL_INTERVAL_MAX / 60:.0f}분 간격으로"
+    " 확인해(밤에는 더 드물게) 새 공지와 수정된 공지를 전송합니다.\n"
+    "필요 시 /subscribe 로 구독, /unsubscribe 로 해제할 수 있습니다.\n"
+    "/search 검색어 로 지난 공지를 찾을 수 있습니다.\n"
+    "/watch 키워드 로 키워드가 들어간 공지만 받고, /unwatch [키워드] 로 해제, /watches 로 목록을 봅니다.\n"
+    "/digest 로 한 번에 올라온 공지를 묶어서, /instant 로 공지마다 따로 받을 수 있습니다."
+)
+SUBSCRIBED_TEXT = "알림 구독이 완료되었습니다."
+UNSUBSCRIBED_TEXT = "알림 구독이 해제되었습니다."
+UNKNOWN_TEXT = "이 봇은 스케줄 알림용입니다. /help 를 참고하세요."
+SEARCH_USAGE_TEXT = "사용법: /search 검색어 (예: /search 수강신청)"
+SEARCH_RESULT_LIMIT = 5
+WATCH_USAGE_TEXT = "사용법: /watch 키워드 (예: /watch 장학)"
+MODE_TEXTS = {
+    "digest": "이제 한 번에 올라온 공지를 묶어서 받습니다.",
+    "instant": "이제 공지마다 따로 받습니다.",
+}
+NOT_SUBSCRIBED_TEXT = "먼저 /subscribe 로 구독해주세요."
+# 여러 업데이트를 모아 한 번에 DB에 반영할 수 있는 명령과 그 답장
+BULK_COMMANDS = {"/subscribe": SUBSCRIBED_TEXT, "/unsubscribe": UNSUBSCRIBED_TEXT}
+
+
+def parse_update(update: dict) -> tuple | None:
+    """업데이트에서 (chat_id, 명령 텍스트)를 꺼냅니다. 처리할 메시지가 아니면 None."""
+    message = update.get("message") or update.get("edited_message") or {}
+    chat_id = (message.get("chat") or {}).get("id")
+    text = (message.get("text") or "").strip()
+    if not chat_id or not text:
+        return None
+    return chat_id, text
+
+
+def _command(text: str) -> str:
+    # "/subscribe@봇이름 인자" 형태도 같은 명령으로 취급합니다.
+    return text.split(maxsplit=1)[0].split("@", 1)[0]
+
+
+def _argument(text: str) -> str:
+    parts = text.split(maxsplit=1)
+    return parts[1].strip() if len(parts) > 1 else ""
+
+
+def bulk_command(text: str) -> str | None:
+    """일괄 반영할 수 있는 구독 명령이면 명령 이름을, 아니면 None을 반환합니다."""
+    command = _command(text)
+    return command if command in BULK_COMMANDS else None
+
+
+def render_search_results(query: str, results: list[dict]) -> str:
+    if not results:
+        return f"'{query}'에 해당하는 공지를 찾지 못했습니다."
+    lines = [f"'{query}' 검색 결과"]
+    for post in results:
+        lines.append(f"\n[{post.get('board') or '공지'}] {post['title']}\n🔗 {post['link']}")
+    return "\n".join(lines)
+
+
+def quick_reply(chat_id, text: str) -> str | None:
+    """I/O 없이 답할 수 있으면 답장 텍스트를, DB 처리가 필요하면 None을 반환합니다."""
+    command = _command(text)
+    if command in ("/start", "/help"):
+        return HELP_TEXT
+    if command == "/subscribe":
+        # 캐시상 이미 구독 중이면 바뀔 것이 없으므로 바로 답합니다.
+        return SUBSCRIBED_TEXT if subscribers.peek(chat_id) is True else None
+    if command == "/unsubscribe":
+        return UNSUBSCRIBED_TEXT if subscribers.peek(chat_id) is False else None
+    if command == "/search":
+        return SEARCH_USAGE_TEXT if not _argument(text) else None
+    if command == "/watch":
+        return WATCH_USAGE_TEXT if not _argument(text) else None
+    if command in ("/unwatch", "/watches", "/digest", "/instant"):
+        return None
+    return UNKNOWN_TEXT
+
+
+def handle(chat_id, text: str) -> str:
+    """명령을 처리하고 답장 텍스트를 반환합니다(DB 접근 가능)."""
+    command = _command(text)
+    if command == "/subscribe":
+        subscribers.subscribe(chat_id)
+        return SUBSCRIBED_TEXT
+    if command == "/unsubscribe":
+        subscribers.unsubscribe(chat_id)
+        return UNSUBSCRIBED_TEXT
+    if command == "/search":
+        query = _argument(text)
+        if not query:
+            return SEARCH_USAGE_TEXT
+        return render_search_results(query, details.search(query, SEARCH_RESULT_LIMIT))
+    if command == "/watch":
+        if not _argument(text):
+            return WATCH_USAGE_TEXT
+        ok, keyword = watches.add(chat_id, _argument(text))
+        if not ok:
+            return keyword
+        subscribers.subscribe(chat_id)
+        return f"'{keyword}' 키워드를 등록했습니다. 이제 키워드가 들어간 공지만 받습니다."
+    if command == "/unwatch":
+        keyword = _argument(text)
+        removed = watches.remove(chat_id, keyword or None)
+        if not keyword:
+            return "모든 키워드를 해제했습니다. 다시 모든 공지를 받습니다."
+        return f"'{watches.normalize(keyword)}' 키워드를 해제했습니다." if removed else "등록되지 않은 키워드입니다."
+    if command in ("/digest", "/instant"):
+        mode = command[1:]
+        return MODE_TEXTS[mode] if digest.set_mode(chat_id, mode) else NOT_SUBSCRIBED_TEXT
+    if command == "/watches":
+        keywords = watches.list_for(chat_id)
+        if not keywords:
+            return "등록한 키워드가 없습니다. 모든 공지를 받습니다."
+        return "등록한 키워드: " + ", ".join(keywords)
+    return quick_reply(chat_id, text) or UNKNOWN_TEXT
@@ -1,26 +1,220 @@
 # crawler.py
 import requests
-from bs4 import BeautifulSoup
+import hashlib
+import json
+import os
 import re
+import threading
 import time
 import random
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
 
-NOTICE_URL = "https://www.hoseo.ac.kr/Home//BBSList.mbz?action=MAPP_1708240139&pageIndex=1"
-NOTICE_VIEW_URL_BASE = "https://www.hoseo.ac.kr/Home//BBSView.mbz"
+import metrics
+from parsers import extract_board_region, parse_board_rows
+
+# 벤치마크 등에서 로컬 스텁 서버로 바꿀 수 있도록 사이트 주소만 환경변수로 받습니다.
+HOSEO_BASE_URL = os.environ.get("HOSEO_BASE_URL", "https://www.hoseo.ac.kr").rstrip("/")
+NOTICE_LIST_URL_BASE = f"{HOSEO_BASE_URL}/Home//BBSList.mbz"
+NOTICE_URL = f"{HOSEO_BASE_URL}/Home//BBSList.mbz?action=MAPP_1708240139&pageIndex=1"
+NOTICE_VIEW_URL_BASE = f"{HOSEO_BASE_URL}/Home//BBSView.mbz"
 BOARD_ACTION_ID = "MAPP_1708240139"
+# 게시판 목록 한 페이지에 나오는 글 수(고정 공지 제외).
+BOARD_PAGE_SIZE = 15
+
+# 크롤링 대상 게시판 목록. CRAWL_BOARDS 환경변수(JSON 배열)로 덮어쓸 수 있습니다.
+# 예: [{"action_id": "MAPP_1708240139", "name": "학사공지", "pages": 3}]
+DEFAULT_BOARDS = [
+    {"action_id": BOARD_ACTION_ID, "name": "학사공지", "pages": 3},
+]
+
+# 같은 호스트에 대한 예의(politeness) 예산: 동시 요청 수와 요청 시작 간 간격(초)
+CRAWL_HOST_CONCURRENCY = int(os.environ.get("CRAWL_HOST_CONCURRENCY", "2"))
+CRAWL_MIN_INTERVAL = float(os.environ.get("CRAWL_MIN_INTERVAL", "2"))
+CRAWL_MAX_INTERVAL = float(os.environ.get("CRAWL_MAX_INTERVAL", "5"))
+# 요청 안에서 기다리는 재시도 간격의 상한(초). 이보다 길게 기다려야 하면 서킷을 열고 바로 포기합니다.
+CRAWL_MAX_INLINE_BACKOFF = float(os.environ.get("CRAWL_MAX_INLINE_BACKOFF", "10"))
+# 429/5xx/네트워크 오류가 연속 N번이면 서킷을 열고 쿨다운 동안 해당 호스트 요청을 막습니다.
+CRAWL_CIRCUIT_THRESHOLD = int(os.environ.get("CRAWL_CIRCUIT_THRESHOLD", "3"))
+CRAWL_CIRCUIT_COOLDOWN = float(os.environ.get("CRAWL_CIRCUIT_COOLDOWN", "300"))
+CRAWL_CIRCUIT_MAX_COOLDOWN = float(os.environ.get("CRAWL_CIRCUIT_MAX_COOLDOWN", "3600"))
+
+
+def load_boards():
+    """게시판 레지스트리를 반환합니다."""
+    raw = os.environ.get("CRAWL_BOARDS", "").strip()
+    if not raw:
+        return [dict(b) for b in DEFAULT_BOARDS]
+    try:
+        boards = json.loads(raw)
+    except ValueError as e:
+        print(f"⚠️ CRAWL_BOARDS 형식 오류({e}) - 기본 게시판만 크롤링합니다.")
+        return [dict(b) for b in DEFAULT_BOARDS]
+    return [
+        {"action_id": b["action_id"], "name": b.get("name", b["action_id"]), "pages": int(b.get("pages", 1))}
+        for b in boards
+    ]
+
+
+def board_list_url(action_id, page=1):
+    return f"{NOTICE_LIST_URL_BASE}?action={action_id}&pageIndex={page}"
+
+
+def board_view_url(action_id, post_id):
+    return f"{NOTICE_VIEW_URL_BASE}?action={action_id}&schIdx={post_id}"
+
+
+class HostBudget:
+    """호스트별 동시 요청 수와 요청 간 최소 간격을 프로세스 전체에서 공유합니다."""
+
+    def __init__(self, max_concurrent, min_interval, max_interval):
+        self.max_concurrent = max(1, max_concurrent)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    @contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            sem = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_concurrent))
+        sem.acquire()
+        try:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, 0.0)) + random.uniform(self.min_interval, self.max_interval)
+                self._next_start[host] = start
+            wait = start - now
+            if wait > 0:
+                print(f"{host} 요청 전 {wait:.2f}초 대기 중...")
+                time.sleep(wait)
+            yield
+        finally:
+            sem.release()
+
+
+_host_budget = HostBudget(CRAWL_HOST_CONCURRENCY, CRAWL_MIN_INTERVAL, CRAWL_MAX_INTERVAL)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """서킷이 열려 있어 요청하지 않았을 때 발생합니다. open_until은 Unix 시각입니다."""
+
+    def __init__(self, host, open_until):
+        super().__init__(f"{host} 서킷 열림 - {max(0, open_until - time.time()):.0f}초 후 재시도 가능")
+        self.host = host
+        self.open_until = open_until
+
+
+class CircuitBreaker:
+    """호스트별 서킷 브레이커입니다.
+
+    연속 실패가 threshold에 이르면 쿨다운 동안 요청을 막고(open), 쿨다운이 지나면 요청 하나만
+    시험 삼아 보냅니다(half-open). 시험 요청이 실패하면 쿨다운을 두 배로 늘려 다시 엽니다.
+    """
+
+    def __init__(self, threshold, cooldown, max_cooldown):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, host):
+        return self._hosts.setdefault(host, {"failures": 0, "trips": 0, "open_until": 0.0, "probing": False})
+
+    def before_request(self, host):
+        with self._lock:
+            state = self._host(host)
+            if not state["open_until"]:
+                return
+            if time.time() < state["open_until"] or state["probing"]:
+                raise CircuitOpenError(host, state["open_until"])
+            state["probing"] = True
+
+    def record_success(self, host):
+        with self._lock:
+            self._hosts[host] = {"failures": 0, "trips": 0, "open_until": 0.0, "probing": False}
+
+    def record_failure(self, host, retry_after=None):
+        """실패를 기록하고, 이번 실패로 서킷이 열렸으면 True를 반환합니다."""
+        with self._lock:
+            state = self._host(host)
+            state["failures"] += 1
+            if not state["probing"] and state["failures"] < self.threshold:
+                return False
+            cooldown = min(self.max_cooldown, self.cooldown * (2 ** state["trips"]))
+            if retry_after:
+                cooldown = max(cooldown, retry_after)
+            state.update(trips=state["trips"] + 1, open_until=time.time() + cooldown, probing=False)
+        print(f"⛔ {host} 서킷 열림 - {cooldown:.0f}초 동안 요청 중단")
+        return True
+
+    def trip_until(self, host, open_until):
+        """다른 프로세스가 기록한 서킷 상태를 반영합니다."""
+        with self._lock:
+            state = self._host(host)
+            if open_until > max(state["open_until"], time.time()):
+                state.update(open_until=open_until, probing=False)
+
+    def snapshot(self):
+        with self._lock:
+            return {host: dict(state) for host, state in self._hosts.items()}
+
+    def open_until(self):
+        """가장 늦게 닫히는 서킷의 시각(Unix 초)을, 열린 서킷이 없으면 None을 반환합니다."""
+        now = time.time()
+        with self._lock:
+            until = [s["open_until"] for s in self._hosts.values() if s["open_until"] > now]
+        return max(until) if until else None
+
+
+_circuit = CircuitBreaker(CRAWL_CIRCUIT_THRESHOLD, CRAWL_CIRCUIT_COOLDOWN, CRAWL_CIRCUIT_MAX_COOLDOWN)
+
+
+def circuit_open_until():
+    return _circuit.open_until()
+
+
+def restore_circuit(open_until, url=NOTICE_URL):
+    """DB에 기록된 서킷 상태(다른 워커 프로세스가 연 것)를 이 프로세스에도 적용합니다."""
+    if open_until:
+        _circuit.trip_until(urlparse(url).netloc, open_until)
+
+
+def _retry_after_seconds(response):
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
 
 _session = None
+_session_lock = threading.Lock()
 
 def _get_session():
     """세션을 생성하고 반환합니다."""
     global _session
     if _session is None:
-        _session = requests.Session()
+        with _session_lock:
+            if _session is None:
+                _session = requests.Session()
     return _session
 
-def _make_request_with_retry(url, max_retries=5, initial_delay=5):
-    """HTTP 요청을 재시도 로직과 함께 실행합니다."""
+def _make_request_with_retry(url, max_retries=5, initial_delay=5, extra_headers=None):
+    """HTTP 요청을 재시도 로직과 함께 실행합니다. 304 응답은 그대로 반환합니다.
+
+    429/5xx/네트워크 오류는 호스트 서킷 브레이커에 기록합니다. 재시도 대기는
+    CRAWL_MAX_INLINE_BACKOFF초를 넘지 않으며, 더 오래 기다려야 하거나 서킷이 열리면
+    기다리지 않고 바로 예외를 올립니다(CircuitOpenError 또는 HTTPError).
+    """
     session = _get_session()
+    host = urlparse(url).netloc
     
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -29,98 +223,198 @@ def _make_request_with_retry(url, max_retries=5, initial_delay=5):
         'Accept-Encoding': 'gzip, deflate, br',
         'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1',
-        'Referer': 'https://www.hoseo.ac.kr/',
-        'Cache-Control': 'max-age=0'
+        'Referer': f'{HOSEO_BASE_URL}/',
     }
+    if extra_headers:
+        headers.update(extra_headers)
     
     for attempt in range(max_retries):
+        _circuit.before_request(host)
+        if attempt > 0:
+            delay = min(CRAWL_MAX_INLINE_BACKOFF, initial_delay * (2 ** (attempt - 1))) + random.uniform(0, 1)
+            print(f"재시도 {attempt}/{max_retries - 1} - {delay:.2f}초 대기 중...")
+            time.sleep(delay)
+        
         try:
-            if attempt == 0:
-                initial_wait = random.uniform(2, 5)
-                print(f"첫 요청 전 {initial_wait:.2f}초 대기 중...")
-                time.sleep(initial_wait)
-            else:
-                delay = initial_delay * (2 ** (attempt - 1)) + random.uniform(1, 3)
-                print(f"재시도 {attempt}/{max_retries - 1} - {delay:.2f}초 대기 중...")
-                time.sleep(delay)
-            
-            response = session.get(url, headers=headers, timeout=20, allow_redirects=True)
-            
-            if response.status_code == 429:
-                retry_after_header = response.headers.get('Retry-After')
-                if retry_after_header:
-                    try:
-                        retry_after = int(retry_after_header)
-                    except ValueError:
-                        retry_after = initial_delay * (2 ** attempt)
-                else:
-                    retry_after = initial_delay * (2 ** attempt) + random.uniform(5, 10)
-                
-                print(f"HTTP 429 발생 (시도 {attempt + 1}/{max_retries}) - {retry_after:.2f}초 후 재시도...")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_after)
-                    continue
-                else:
-                    raise requests.exceptions.HTTPError(f"HTTP 429: 최대 재시도 횟수 초과", response=response)
-            
-            response.raise_for_status()
-            return response
-            
-        except requests.exceptions.HTTPError as e:
-            if e.response and e.response.status_code == 429:
-                if attempt < max_retries - 1:
-                    retry_after_header = e.response.headers.get('Retry-After')
-                    if retry_after_header:
-                        try:
-                            retry_after = int(retry_after_header)
-                        except ValueError:
-                            retry_after = initial_delay * (2 ** attempt)
-                    else:
-                        retry_after = initial_delay * (2 ** attempt) + random.uniform(5, 10)
-                    
-                    print(f"HTTP 429 예외 발생 (시도 {attempt + 1}/{max_retries}) - {retry_after:.2f}초 후 재시도...")
-                    time.sleep(retry_after)
-                    continue
-                else:
-                    print(f"HTTP 429: 최대 재시도 횟수({max_retries}) 초과")
+            # 호스트 예산이 요청 간 2~5초 간격을 보장합니다(여러 게시판을 동시에 돌아도 공유).
+            with _host_budget.slot(url):
+                started = time.perf_counter()
+                try:
+                    response = session.get(url, headers=headers, timeout=20, allow_redirects=True)
+                except requests.exceptions.RequestException:
+                    metrics.CRAWL_FETCH_SECONDS.labels(status="error").observe(time.perf_counter() - started)
                     raise
-            raise
+                metrics.CRAWL_FETCH_SECONDS.labels(status=str(response.status_code)).observe(time.perf_counter() - started)
         except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                print(f"요청 오류 발생: {e} - 재시도 예정...")
-                continue
-            raise
+            opened = _circuit.record_failure(host)
+            if opened or attempt == max_retries - 1:
+                raise
+            print(f"요청 오류 발생: {e} - 재시도 예정...")
+            metrics.CRAWL_RETRIES.labels(reason="error").inc()
+            continue
+        
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = _retry_after_seconds(response)
+            if response.status_code == 429:
+                metrics.RATE_LIMITED.labels(target="school").inc()
+            opened = _circuit.record_failure(host, retry_after)
+            too_long = retry_after is not None and retry_after > CRAWL_MAX_INLINE_BACKOFF
+            print(f"HTTP {response.status_code} 발생 (시도 {attempt + 1}/{max_retries})"
+                  + (f", Retry-After {retry_after:.0f}초" if retry_after else ""))
+            if opened or too_long or attempt == max_retries - 1:
+                if response.status_code == 429:
+                    raise requests.exceptions.HTTPError("HTTP 429: Too Many Requests", response=response)
+                response.raise_for_status()
+            metrics.CRAWL_RETRIES.labels(reason="429" if response.status_code == 429 else "5xx").inc()
+            continue
+        
+        _circuit.record_success(host)
+        response.raise_for_status()
+        return response
     
     raise requests.exceptions.RequestException(f"최대 재시도 횟수({max_retries}) 초과")
 
 
-def get_latest_post():
+_HIT_CELL_RE = re.compile(r"<td[^>]*board-list-hit[^>]*>.*?</td>", re.S | re.I)
+
+
+def _board_content_hash(html: str) -> str:
+    """게시판 목록(.ui-list tbody) 영역을 정규화해 해시합니다.
+
+    요청마다 바뀌는 조회수 칸만 빼고 글 ID, 제목, 작성일, 첨부 표시, 고정 여부는 그대로 두므로,
+    파싱 없이 문자열 처리만으로 "목록이 바뀌었는지"(수정·재게시 포함)를 판단할 수 있습니다.
+    """
+    region = extract_board_region(html) or html
+    normalized = " ".join(_HIT_CELL_RE.sub("", region).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def post_fingerprint(post: dict) -> str:
+    """목록에 보이는 제목·작성일·첨부 수로 게시글 지문을 만듭니다. 조회수와 고정 여부는 넣지 않습니다."""
+    raw = "\t".join((" ".join(post["title"].split()), post.get("posted_on") or "", str(post.get("attachments", 0))))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def classify_post(post: dict, known: dict | None, past_known: bool, first_crawl: bool = False) -> str:
+    """fingerprint_lookup() 결과로 목록 행 하나를 분류합니다.
+
+    new: 처음 보는 일반 글(이미 본 일반 글보다 위에 있을 때만), updated: 보낸 글의 지문이 바뀜,
+    baseline: 알림 없이 지문만 기록(지문이 없는 발송 기록, 처음 크롤하는 게시판의 모든 행,
+    처음 보는 고정 공지, 보내지 않은 글의 지문 변경), repinned: 고정 여부만 바뀜,
+    unchanged: 그대로, skipped: 이미 본 글 아래의 처음 보는 글(예전처럼 무시)
+    """
+    if known is None or (not known["sent"] and known["fingerprint"] is None):
+        # 고정 공지는 오래된 글이 위로 올라온 것일 수 있으므로 새 글로 알리지 않습니다.
+        if first_crawl or post["pinned"]:
+            return "baseline"
+        return "skipped" if past_known else "new"
+    if known["fingerprint"] is None:
+        return "baseline"
+    if known["fingerprint"] != post["fingerprint"]:
+        return "updated" if known["sent"] else "baseline"
+    if known["pinned"] != post["pinned"]:
+        return "repinned"
+    return "unchanged"
+
+
+def _load_fetch_cache(url):
+    import database
+    try:
+        return database.get_fetch_cache(url)
+    except Exception as e:
+        print(f"크롤 캐시 조회 실패(무시하고 전체 요청): {e}")
+        return None
+
+
+def fetch_notice_list(url=NOTICE_URL, use_cache=True):
+    """목록 페이지를 조건부 GET으로 가져옵니다.
+
+    반환값: {"html", "cache_hit", "cache_reason", "etag", "last_modified", "content_hash", "latency_ms"}
+    latency_ms는 예의 대기를 뺀 서버 응답 시간입니다.
+    304 응답이거나 목록 영역 해시가 저장된 값과 같으면 cache_hit=True, html=None 입니다.
+    """
+    cached = _load_fetch_cache(url) if use_cache else None
+    extra_headers = {}
+    if cached:
+        if cached.get("etag"):
+            extra_headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            extra_headers["If-Modified-Since"] = cached["last_modified"]
+
+    response = _make_request_with_retry(url, extra_headers=extra_headers)
+    latency_ms = round(response.elapsed.total_seconds() * 1000, 1)
+
+    if response.status_code == 304:
+        print("목록 페이지 변경 없음(HTTP 304) - 파싱 생략")
+        return {"html": None, "cache_hit": True, "cache_reason": "not_modified",
+                "etag": cached.get("etag"), "last_modified": cached.get("last_modified"),
+                "content_hash": cached.get("content_hash"), "latency_ms": latency_ms}
+
+    html = response.text
+    content_hash = _board_content_hash(html)
+    result = {
+        "html": html,
+        "cache_hit": False,
+        "cache_reason": None,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_hash": content_hash,
+        "latency_ms": latency_ms,
+    }
+    if cached and cached.get("content_hash") == content_hash:
+        print("목록 영역 해시 동일 - 파싱 생략")
+        result.update({"html": None, "cache_hit": True, "cache_reason": "unchanged"})
+    return result
+
+
+def _save_fetch_cache(url, fetched):
+    import database
+    try:
+        database.save_fetch_cache(url, fetched["etag"], fetched["last_modified"], fetched["content_hash"])
+    except Exception as e:
+        print(f"크롤 캐시 저장 실패: {e}")
+
+
+def _parse_recent_posts(html, limit=None, board=None):
+    action_id = board["action_id"] if board else BOARD_ACTION_ID
+    posts = []
+    for row in parse_board_rows(html):
+        match = re.search(r"fn_viewData\('(\d+)'\)", row["href"])
+        if match:
+            post = {"title": row["title"], "link": board_view_url(action_id, match.group(1)),
+                    "posted_on": row["date"], "attachments": row["files"], "pinned": row["pinned"]}
+            post["fingerprint"] = post_fingerprint(post)
+            if board:
+                post["board"] = board["name"]
+            posts.append(post)
+            if limit is not None and len(posts) >= limit:
+                break
+    
+    return posts
+
+
+def get_latest_post(max_retries=5):
     """학사공지 게시판의 최신 게시글 정보를 반환합니다."""
     try:
-        response = _make_request_with_retry(NOTICE_URL)
-        
-        soup = BeautifulSoup(response.text, "html.parser")
+        response = _make_request_with_retry(NOTICE_URL, max_retries=max_retries)
         
-        target_row = soup.select_one(".ui-list tbody tr.board_new")
+        # 상단 고정 글은 최신 글이 아니므로 건너뜁니다(고정 글뿐이면 첫 행 사용).
+        rows = parse_board_rows(response.text)
+        rows = [row for row in rows if not row["pinned"]] or rows
         
-        if target_row:
-            subject_element = target_row.select_one(".board-list-title a")
-            
-            title = subject_element.text.strip()
-            href_value = subject_element.get('href')
-            
-            match = re.search(r"fn_viewData\('(\d+)'\)", href_value)
+        if rows:
+            match = re.search(r"fn_viewData\('(\d+)'\)", rows[0]["href"])
             if match:
                 post_id = match.group(1)
-                full_link = f"{NOTICE_VIEW_URL_BASE}?action={BOARD_ACTION_ID}&schIdx={post_id}"
+                full_link = board_view_url(BOARD_ACTION_ID, post_id)
                 
-                return {"title": title, "link": full_link}
+                return {"title": rows[0]["title"], "link": full_link}
             else:
                 print("링크(href)에서 게시글 ID를 추출하는 데 실패했습니다.")
                 return None
                 
         else:
-            print("최신 공지사항을 찾을 수 없습니다. CSS 선택자('.ui-list tbody tr.board_new')를 확인하세요.")
+            print("최신 공지사항을 찾을 수 없습니다. CSS 선택자('.ui-list tbody tr')를 확인하세요.")
             return None
             
     except requests.exceptions.RequestException as e:
@@ -132,51 +426,115 @@ def get_recent_posts(limit=5):
     """최근 게시글들을 반환합니다."""
     try:
         response = _make_request_with_retry(NOTICE_URL)
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        
-        rows = soup.select(".ui-list tbody tr.board_new")
-        
-        posts = []
-        for row in rows[:limit]:
-            subject_element = row.select_one(".board-list-title a")
-            if subject_element:
-                title = subject_element.text.strip()
-                href_value = subject_element.get('href')
-                
-                match = re.search(r"fn_viewData\('(\d+)'\)", href_value)
-                if match:
-                    post_id = match.group(1)
-                    full_link = f"{NOTICE_VIEW_URL_BASE}?action={BOARD_ACTION_ID}&schIdx={post_id}"
-                    posts.append({"title": title, "link": full_link})
-        
-        return posts
+        return _parse_recent_posts(response.text, limit)
         
     except requests.exceptions.RequestException as e:
         print(f"최근 게시글 크롤링 중 오류 발생: {e}")
         return []
 
 
-def get_new_posts_since_last_check():
-    """DB에 없는 새로운 게시글 목록을 반환합니다."""
+def _crawl_board(board):
+    """한 게시판의 페이지를 차례로 훑어, 이미 보낸 일반 글을 만날 때까지의 새 글과 수정된 글을 반환합니다.
+
+    행마다 지문을 저장된 값과 한 번의 쿼리로 비교해 분류합니다(classify_post). 새 글과 수정된 글은
+    발송 트랜잭션에서 지문이 저장되고, 바뀌지 않은 행은 DB에 쓰지 않습니다.
+    상단 고정 글은 목록 맨 위에 계속 남으므로 "이미 본 글을 만나면 중단" 판단에서 제외하고,
+    처음 보는 고정 글은 새 글로 알리지 않습니다.
+    """
+    import database
+    
+    result = {"board": board["name"], "posts": [], "pages_fetched": 0, "fetch_ms": 0.0, "cache_hit": False,
+              "cache_reason": None, "error": None, "changes": {}}
+    silent, seen = [], set()
+    first_fetch = None
+    first_crawl = False
     try:
-        recent_posts = get_recent_posts(limit=10)
-        
-        if not recent_posts:
-            return []
-        
-        import database
-        
-        new_posts = []
-        for post in recent_posts:
-            if not database.is_post_sent(post["link"]):
-                new_posts.append(post)
-            else:
+        for page in range(1, max(1, board["pages"]) + 1):
+            url = board_list_url(board["action_id"], page)
+            # 첫 페이지가 그대로면 뒤 페이지도 바뀌지 않았으므로 게시판 전체를 건너뜁니다.
+            fetched = fetch_notice_list(url, use_cache=(page == 1))
+            result["fetch_ms"] += fetched["latency_ms"]
+            result["pages_fetched"] += 1
+            if page == 1:
+                first_fetch = fetched
+                if fetched["cache_hit"]:
+                    result["cache_hit"] = True
+                    result["cache_reason"] = fetched["cache_reason"]
+                    return result
+            
+            page_posts = _parse_recent_posts(fetched["html"], board=board)
+            if not page_posts:
+                break
+            if page == 1:
+                # 지문이 하나도 없는 게시판(새 DB, 새로 추가한 게시판, 업그레이드 직후)은 설정된 페이지의
+                # 모든 행을 기준선으로만 기록합니다. 그러지 않으면 목록 전체가 새 글로 발송됩니다.
+                first_crawl = not database.board_has_fingerprints(board["name"])
+            
+            # 페이지 전체를 한 번의 쿼리로 조회해 분류하고, 이미 보낸 일반 글이 있던 페이지에서 멈춥니다.
+            known = database.fingerprint_lookup([post["link"] for post in page_posts])
+            reached_known = False
+            for post in page_posts:
+                # 고정 글은 맨 위와 원래 자리에 두 번 나올 수 있으므로 먼저 나온 행만 봅니다.
+                if post["link"] in seen:
+                    continue
+                seen.add(post["link"])
+                state = known.get(post["link"])
+                change = classify_post(post, state, reached_known, first_crawl)
+                result["changes"][change] = result["changes"].get(change, 0) + 1
+                if change in ("new", "updated"):
+                    result["posts"].append(dict(post, change=change))
+                elif change in ("baseline", "repinned"):
+                    silent.append(post)
+                if change not in ("new", "skipped") and not post["pinned"]:
+                    reached_known = True
+            if reached_known and not first_crawl:
                 break
         
-        return new_posts
-        
+        # 처음 보는 지문과 고정 여부 변경은 알림 없이 기록만 합니다.
+        if silent:
+            database.save_fingerprints(silent)
+        # 새 글이 없을 때만 검증값을 저장합니다. 새 글이 있으면 발송 기록이 끝난 뒤의
+        # 다음 크롤에서 저장되므로, 발송 도중 실패해도 캐시 때문에 글을 놓치지 않습니다.
+        if not result["posts"] and first_fetch is not None:
+            _save_fetch_cache(board_list_url(board["action_id"], 1), first_fetch)
+    
     except Exception as e:
-        print(f"새 게시글 확인 중 오류 발생: {e}")
-        return []
+        print(f"[{board['name']}] 새 게시글 확인 중 오류 발생: {e}")
+        result["error"] = str(e)
+    
+    return result
+
 
+def check_new_posts(boards=None):
+    """등록된 게시판들을 동시에 크롤링해 새 게시글·수정된 게시글과 캐시 적중 여부를 반환합니다.
+
+    반환값: {"posts": [...], "cache_hit": bool, "boards": [...], "changes": {분류: 행 수},
+            "error": str | None, "fetch_ms": float, "circuit_open_until": float | None}
+    각 게시글에는 "board"(게시판 이름), "fingerprint", "change"("new" 또는 "updated")가 붙습니다.
+    모든 게시판의 목록이 바뀌지 않았으면
+    cache_hit=True이며 파싱과 DB 조회를 모두 건너뜁니다.
+    """
+    boards = boards or load_boards()
+    with ThreadPoolExecutor(max_workers=max(1, len(boards)), thread_name_prefix="crawl") as pool:
+        board_results = list(pool.map(_crawl_board, boards))
+    
+    posts = [post for r in board_results for post in r["posts"]]
+    changes = {}
+    for r in board_results:
+        for change, count in r["changes"].items():
+            changes[change] = changes.get(change, 0) + count
+    errors = [f"[{r['board']}] {r['error']}" for r in board_results if r["error"]]
+    return {
+        "posts": posts,
+        "cache_hit": all(r["cache_hit"] for r in board_results),
+        "boards": [{k: v for k, v in r.items() if k != "posts"} | {"new_posts": len(r["posts"])} for r in board_results],
+        "changes": changes,
+        "error": "; ".join(errors) or None,
+        "fetch_ms": round(sum(r["fetch_ms"] for r in board_results), 1),
+        "circuit_open_until": _circuit.open_until(),
+    }
+
+
+def get_new_posts_since_last_check():
+    """DB에 없는 새로운 게시글 목록을 반환합니다."""
+    return check_new_posts()["posts"]
@@ -4,6 +4,23 @@ Cron Job용 실행 스크립트
 import os
 import requests
 import sys
+import time
+
+
+def wait_for_job(service_url, headers, job_id, timeout):
+    """작업이 끝날 때까지 /jobs/<id>를 짧은 요청으로 조회합니다."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(5)
+        response = requests.get(f"{service_url}/jobs/{job_id}", headers=headers, timeout=15)
+        if response.status_code != 200:
+            print(f"⚠️ 작업 상태 조회 실패: HTTP {response.status_code}")
+            continue
+        job = response.json().get('job', {})
+        if job.get('status') in ('succeeded', 'failed'):
+            return job
+        print(f"⏳ 작업 {job_id} 진행 중: {job.get('progress')}")
+    return None
 
 def main():
     try:
@@ -26,7 +43,22 @@ def main():
         
         response = requests.post(url, headers=headers, timeout=60)
         
-        if response.status_code == 200:
+        if response.status_code == 202:
+            result = response.json()
+            print(f"📥 {result.get('message')} (job_id={result.get('job_id')})")
+            wait_timeout = float(os.environ.get('CRON_WAIT_TIMEOUT', '600'))
+            if wait_timeout <= 0:
+                sys.exit(0)
+            job = wait_for_job(service_url, headers, result['job_id'], wait_timeout)
+            if job is None:
+                print(f"⚠️ {wait_timeout:.0f}초 안에 작업이 끝나지 않았습니다. 작업은 서버에서 계속 진행됩니다.")
+                sys.exit(0)
+            if job['status'] == 'succeeded':
+                print(f"✅ 성공: {(job.get('result') or {}).get('message', '작업 완료')}")
+                sys.exit(0)
+            print(f"❌ 작업 실패: {job.get('error')}")
+            sys.exit(1)
+        elif response.status_code == 200:
             result = response.json()
             print(f"✅ 성공: {result.get('message', '작업 완료')}")
             sys.exit(0)
@@ -1,6 +1,13 @@
+import gzip
 import os
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import Json, RealDictCursor, execute_values
+
+import metrics
 
 DATABASE_URL = os.environ.get("DATABASE_URL", "")
 
@@ -10,121 +17,1747 @@ if DATABASE_URL and "sslmode=" not in DATABASE_URL:
 
 POSTS_TABLE = "sent_posts"
 SUBSCRIBERS_TABLE = "subscribers"
+FETCH_CACHE_TABLE = "fetch_cache"
+JOBS_TABLE = "jobs"
+OUTBOX_TABLE = "outbox_messages"
+DELIVERIES_TABLE = "deliveries"
+CONTENTS_TABLE = "post_contents"
+WATCHES_TABLE = "watches"
+CRAWL_HISTORY_TABLE = "crawl_history"
+SCHEMA_MIGRATIONS_TABLE = "schema_migrations"
+WORKER_LEASES_TABLE = "worker_leases"
+FINGERPRINTS_TABLE = "post_fingerprints"
+TELEGRAM_OFFSETS_TABLE = "telegram_offsets"
+
+# 구독자 테이블이 바뀔 때마다 이 채널로 NOTIFY가 발행됩니다(subscribers.py 캐시 무효화용).
+SUBSCRIBERS_CHANNEL = "subscribers_changed"
 
+# gunicorn gthread 워커(--threads 8)의 스레드 수에 맞춘 기본 풀 최대 크기
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "8"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# 오래된 연결은 재생성하고, 일정 시간 놀던 연결은 빌려주기 전에 상태를 확인합니다.
+DB_CONN_MAX_AGE = float(os.environ.get("DB_CONN_MAX_AGE", "1800"))
+DB_HEALTHCHECK_IDLE = float(os.environ.get("DB_HEALTHCHECK_IDLE", "30"))
+# 배포 단계(migrate.py)에서 스키마를 올리지 못했을 때 워커가 첫 DB 사용 시 대신 적용할지 여부
+DB_AUTO_MIGRATE = os.environ.get("DB_AUTO_MIGRATE", "1") != "0"
 
-def _get_connection():
+
+def _get_connection(**options):
     if not DATABASE_URL:
         raise RuntimeError("DATABASE_URL 환경변수가 설정되지 않았습니다. Render PostgreSQL 연결 정보가 필요합니다.")
-    return psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    return psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor, **options)
 
 
-def init_db():
-    """필요한 테이블을 생성합니다."""
+class PoolTimeout(RuntimeError):
+    """풀에서 제한 시간 안에 연결을 얻지 못했을 때 발생합니다."""
+
+
+class ConnectionPool:
+    """스레드 안전한 PostgreSQL 연결 풀입니다. 연결 재활용·상태 확인·지표 수집을 담당합니다."""
+
+    def __init__(self, connect, maxconn: int, timeout: float,
+                 max_age: float, healthcheck_idle: float):
+        self._connect = connect
+        self.maxconn = max(1, maxconn)
+        self.timeout = timeout
+        self.max_age = max_age
+        self.healthcheck_idle = healthcheck_idle
+        self._cond = threading.Condition()
+        self._idle = []  # (conn, created_at, last_used)
+        self._created_at = {}  # id(conn) -> created_at
+        self._in_use = 0
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "recycled": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total_sec": 0.0,
+            "wait_time_max_sec": 0.0,
+            "healthcheck_failures": 0,
+            "timeouts": 0,
+        }
+
+    def _close(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.healthcheck_idle:
+            return True
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except Exception:
+            with self._cond:
+                self._stats["healthcheck_failures"] += 1
+            return False
+
+    def _drop(self, conn, recycled: bool = False) -> None:
+        """빌려간 자리(slot)를 반납하고 연결을 닫습니다."""
+        with self._cond:
+            self._in_use -= 1
+            self._created_at.pop(id(conn), None)
+            self._stats["closed"] += 1
+            if recycled:
+                self._stats["recycled"] += 1
+            self._cond.notify()
+        self._close(conn)
+
+    def getconn(self):
+        """유휴 연결을 빌려주거나, 한도 안에서 새 연결을 만듭니다. 한도에 도달하면 대기합니다."""
+        started = time.monotonic()
+        waited = False
+        while True:
+            candidate = None
+            with self._cond:
+                while True:
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._in_use < self.maxconn:
+                        # 연결을 만드는 동안에도 자리를 잡아 두어 최대 연결 수를 넘지 않도록 합니다.
+                        self._in_use += 1
+                        break
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"DB 연결 풀 대기 시간 초과({self.timeout}초, 최대 {self.maxconn}개 사용 중)")
+                    waited = True
+                    self._cond.wait(remaining)
+
+            # TLS 핸드셰이크와 상태 확인은 락 밖에서 수행해 다른 스레드의 반납을 막지 않습니다.
+            if candidate is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created_at[id(conn)] = time.monotonic()
+                    self._stats["created"] += 1
+                return self._checkout(conn, started, waited)
+
+            conn, created_at, last_used = candidate
+            if time.monotonic() - created_at > self.max_age:
+                self._drop(conn, recycled=True)
+                continue
+            if not self._is_healthy(conn, last_used):
+                self._drop(conn)
+                continue
+            return self._checkout(conn, started, waited)
+
+    def _checkout(self, conn, started: float, waited: bool):
+        elapsed = time.monotonic() - started
+        metrics.DB_POOL_WAIT_SECONDS.observe(elapsed)
+        with self._cond:
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+            self._stats["wait_time_total_sec"] += elapsed
+            self._stats["wait_time_max_sec"] = max(self._stats["wait_time_max_sec"], elapsed)
+        return conn
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        """연결을 풀에 반납합니다. 끊어졌거나 오래되었거나 discard=True이면 닫습니다."""
+        created_at = self._created_at.get(id(conn), 0.0)
+        expired = time.monotonic() - created_at > self.max_age
+        if discard or conn.closed or expired:
+            self._drop(conn, recycled=expired and not discard and not conn.closed)
+            return
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            for conn, _, _ in idle:
+                self._created_at.pop(id(conn), None)
+                self._stats["closed"] += 1
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            data = dict(self._stats)
+            data["in_use"] = self._in_use
+            data["idle"] = len(self._idle)
+            data["max_size"] = self.maxconn
+            data["avg_wait_ms"] = round(data["wait_time_total_sec"] / data["checkouts"] * 1000, 3) if data["checkouts"] else 0.0
+            data["wait_time_total_sec"] = round(data["wait_time_total_sec"], 4)
+            data["wait_time_max_sec"] = round(data["wait_time_max_sec"], 4)
+            return data
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ConnectionPool:
+    """프로세스 전역 연결 풀을 반환합니다. fork 이후에는 자식 프로세스에서 새로 만듭니다."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(
+                    _get_connection,
+                    maxconn=DB_POOL_MAX,
+                    timeout=DB_POOL_TIMEOUT,
+                    max_age=DB_CONN_MAX_AGE,
+                    healthcheck_idle=DB_HEALTHCHECK_IDLE,
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+
+@contextmanager
+def get_cursor(transaction: bool = False):
+    """풀에서 연결을 빌려 커서를 제공합니다.
+
+    transaction=True이면 블록 전체를 한 트랜잭션으로 묶어 정상 종료 시 커밋하고,
+    예외 시 롤백합니다. 기본값은 autocommit으로, 단일 조회에 추가 왕복이 없습니다.
+    프로세스에서 처음 호출될 때 스키마 버전을 한 번 확인합니다(ensure_schema).
+    """
+    if not _schema_ready:
+        ensure_schema()
+    with _cursor(transaction) as cur:
+        yield cur
+
+
+@contextmanager
+def _cursor(transaction: bool = False):
+    pool = _get_pool()
+    conn = pool.getconn()
+    discard = False
+    try:
+        conn.autocommit = not transaction
+        with conn.cursor() as cur:
+            yield cur
+        if transaction:
+            conn.commit()
+    except Exception:
+        if conn.closed:
+            discard = True
+        else:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        raise
+    finally:
+        pool.putconn(conn, discard=discard)
+
+
+class LockLost(RuntimeError):
+    """advisory lock을 쥔 연결이 끊겨 잠금이 풀렸을 때 발생합니다."""
+
+
+class AdvisoryLock:
+    """advisory_lock()이 넘겨주는 잠금 상태입니다. bool로 획득 여부를 확인합니다."""
+
+    def __init__(self, conn, name: str, locked: bool):
+        self._conn = conn
+        self.name = name
+        self.locked = locked
+
+    def __bool__(self) -> bool:
+        return self.locked
+
+    def held(self) -> bool:
+        """잠금을 쥔 연결이 아직 살아 있는지 확인합니다(왕복 1회). 세션이 살아 있으면 잠금도 유지됩니다."""
+        if not self.locked or self._conn.closed:
+            return False
+        try:
+            with self._conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except psycopg2.Error:
+            self.locked = False
+            return False
+
+    def ensure(self) -> None:
+        """잠금이 풀렸으면 LockLost를 올립니다. 부수 효과(발송 예약 등) 직전에 호출합니다."""
+        if not self.held():
+            raise LockLost(f"advisory lock '{self.name}'을 쥔 연결이 끊겼습니다.")
+
+
+@contextmanager
+def advisory_lock(name: str):
+    """세션 수준 pg_try_advisory_lock을 시도하고 AdvisoryLock(획득 여부는 bool)을 넘겨줍니다.
+
+    잠금은 풀과 별개인 전용 연결에 쥐고, 블록이 끝나면 그 연결을 닫습니다. 해제 쿼리가 실패해도
+    연결을 닫으므로 Postgres가 잠금을 풀고, 잠금을 쥔 연결이 풀로 돌아가 남는 일이 없습니다.
+    연결이 도중에 끊기면 잠금도 풀리므로 오래 쥐는 쪽은 held()/ensure()로 확인해야 합니다.
+    """
+    # 끊긴 연결을 TCP keepalive로 빨리 알아채도록 합니다.
+    conn = _get_connection(keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(hashtext(%s)) AS locked", (name,))
+            lock = AdvisoryLock(conn, name, cur.fetchone()["locked"])
+        yield lock
+        if lock.locked:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (name,))
+            except psycopg2.Error as e:
+                print(f"advisory lock '{name}' 해제 실패(연결을 닫아 해제): {e}")
+    finally:
+        conn.close()
+
+
+def listen_connection(channel: str):
+    """풀과 별개인 LISTEN 전용 연결을 엽니다. 호출한 쪽이 닫아야 합니다."""
     conn = _get_connection()
-    cur = conn.cursor()
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {channel}")
+    return conn
+
+
+def pool_stats() -> dict:
+    """연결 풀 지표(대기 시간, 사용 중 연결 수, 생성 수 등)를 반환합니다."""
+    return _get_pool().stats()
+
+
+def _migrate_baseline(cur) -> None:
+    """버전 1: 마이그레이션 도입 전 init_db()가 만들던 스키마 전체(모두 IF NOT EXISTS라 기존 DB에도 안전)."""
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {POSTS_TABLE} (
+            id SERIAL PRIMARY KEY,
+            link TEXT NOT NULL UNIQUE,
+            title TEXT NOT NULL,
+            sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cur.execute(f"ALTER TABLE {POSTS_TABLE} ADD COLUMN IF NOT EXISTS board TEXT")
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {SUBSCRIBERS_TABLE} (
+            id SERIAL PRIMARY KEY,
+            user_id TEXT NOT NULL UNIQUE,
+            subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    # 발송 방식: 'instant'(글마다 한 통) / 'digest'(한 번의 크롤에서 나온 새 글을 묶어서). NULL이면 서버 기본값
+    cur.execute(f"ALTER TABLE {SUBSCRIBERS_TABLE} ADD COLUMN IF NOT EXISTS delivery_mode TEXT")
+    cur.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION {SUBSCRIBERS_TABLE}_notify() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{SUBSCRIBERS_CHANNEL}', TG_OP);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # 문장 단위 트리거이므로 대량 삭제도 알림 한 번으로 끝나고, 알림은 커밋 시점에만 전달됩니다.
+    cur.execute(f"DROP TRIGGER IF EXISTS {SUBSCRIBERS_TABLE}_notify_trg ON {SUBSCRIBERS_TABLE}")
+    cur.execute(
+        f"""
+        CREATE TRIGGER {SUBSCRIBERS_TABLE}_notify_trg
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {SUBSCRIBERS_TABLE}
+        FOR EACH STATEMENT EXECUTE FUNCTION {SUBSCRIBERS_TABLE}_notify()
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {FETCH_CACHE_TABLE} (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {JOBS_TABLE} (
+            id SERIAL PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress JSONB NOT NULL DEFAULT '{{}}'::jsonb,
+            result JSONB,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+        """
+    )
+    # 종류(kind)별로 대기/실행 중인 작업은 하나뿐이므로 중복 트리거가 자연스럽게 합쳐집니다.
+    cur.execute(
+        f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS {JOBS_TABLE}_active_kind_idx
+        ON {JOBS_TABLE} (kind) WHERE status IN ('queued', 'running')
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {OUTBOX_TABLE} (
+            id SERIAL PRIMARY KEY,
+            message_key TEXT NOT NULL UNIQUE,
+            text TEXT NOT NULL,
+            disable_web_page_preview BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    # 게시글 x 수신자 단위의 발송 상태: pending → sending → sent / failed / blocked
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {DELIVERIES_TABLE} (
+            id BIGSERIAL PRIMARY KEY,
+            message_id INTEGER NOT NULL REFERENCES {OUTBOX_TABLE}(id) ON DELETE CASCADE,
+            chat_id TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            locked_until TIMESTAMP,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP,
+            UNIQUE (message_id, chat_id)
+        )
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE INDEX IF NOT EXISTS {DELIVERIES_TABLE}_due_idx
+        ON {DELIVERIES_TABLE} (next_attempt_at, id) WHERE status = 'pending'
+        """
+    )
+    # 사용자별 키워드 알림. 키워드가 하나라도 있는 구독자는 일치하는 공지만 받습니다.
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {WATCHES_TABLE} (
+            id SERIAL PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            keyword TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (user_id, keyword)
+        )
+        """
+    )
+    # 크롤 실행 기록. 적응형 스케줄러가 변경 빈도와 서킷 상태를 여기서 읽습니다.
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {CRAWL_HISTORY_TABLE} (
+            id BIGSERIAL PRIMARY KEY,
+            started_at TIMESTAMPTZ NOT NULL,
+            finished_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            status TEXT NOT NULL,
+            new_posts INTEGER NOT NULL DEFAULT 0,
+            pages_fetched INTEGER NOT NULL DEFAULT 0,
+            cache_hit BOOLEAN NOT NULL DEFAULT FALSE,
+            fetch_ms DOUBLE PRECISION,
+            duration_ms DOUBLE PRECISION,
+            circuit_open_until TIMESTAMPTZ,
+            error TEXT
+        )
+        """
+    )
+    cur.execute(f"ALTER TABLE {CRAWL_HISTORY_TABLE} ADD COLUMN IF NOT EXISTS timings JSONB")
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS {CRAWL_HISTORY_TABLE}_started_idx ON {CRAWL_HISTORY_TABLE} (started_at)"
+    )
+    # 상세 페이지 본문과 검색 색인. 한국어 형태소 사전이 없으므로 'simple' 설정의 단어 색인과
+    # 부분 일치용 trigram 색인(pg_trgm)을 함께 씁니다.
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {CONTENTS_TABLE} (
+            link TEXT PRIMARY KEY,
+            board TEXT,
+            title TEXT NOT NULL,
+            body TEXT,
+            attachments JSONB NOT NULL DEFAULT '[]'::jsonb,
+            fetch_attempts INTEGER NOT NULL DEFAULT 0,
+            fetch_error TEXT,
+            fetched_at TIMESTAMP,
+            search_text TEXT GENERATED ALWAYS AS (title || ' ' || coalesce(body, '')) STORED,
+            search_vector TSVECTOR GENERATED ALWAYS AS
+                (to_tsvector('simple', title || ' ' || coalesce(body, ''))) STORED
+        )
+        """
+    )
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS {CONTENTS_TABLE}_search_idx ON {CONTENTS_TABLE} USING GIN (search_vector)"
+    )
+    _create_trigram_index(cur)
+
+
+def _create_trigram_index(cur) -> None:
+    """pg_trgm을 쓸 수 있으면 부분 일치 검색용 trigram 색인을 만듭니다. 권한이 없으면 건너뜁니다."""
+    # 실패해도 마이그레이션 트랜잭션 전체가 취소되지 않도록 세이브포인트 안에서 시도합니다.
+    cur.execute("SAVEPOINT trigram_index")
     try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
         cur.execute(
             f"""
-            CREATE TABLE IF NOT EXISTS {POSTS_TABLE} (
-                id SERIAL PRIMARY KEY,
-                link TEXT NOT NULL UNIQUE,
-                title TEXT NOT NULL,
-                sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            CREATE INDEX IF NOT EXISTS {CONTENTS_TABLE}_trgm_idx
+            ON {CONTENTS_TABLE} USING GIN (search_text gin_trgm_ops)
+            """
+        )
+        cur.execute("RELEASE SAVEPOINT trigram_index")
+    except psycopg2.Error as e:
+        cur.execute("ROLLBACK TO SAVEPOINT trigram_index")
+        print(f"ℹ️ pg_trgm 색인 생성 생략(부분 일치 검색은 순차 탐색): {e}")
+
+
+def _migrate_worker_leases(cur) -> None:
+    """버전 2: 살아 있는 워커 프로세스(노드) 목록. cluster.py가 heartbeat를 남깁니다."""
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {WORKER_LEASES_TABLE} (
+            node_id TEXT PRIMARY KEY,
+            started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            heartbeat_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+
+
+def _migrate_post_fingerprints(cur) -> None:
+    """버전 3: 게시글 지문(목록의 제목·작성일·첨부 수, 상세 본문 해시). 수정·재게시 감지에 씁니다."""
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {FINGERPRINTS_TABLE} (
+            link TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            title TEXT NOT NULL,
+            posted_on TEXT,
+            attachments INTEGER NOT NULL DEFAULT 0,
+            pinned BOOLEAN NOT NULL DEFAULT FALSE,
+            body_hash TEXT,
+            revision INTEGER NOT NULL DEFAULT 1,
+            first_seen_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+
+
+def _migrate_telegram_offsets(cur) -> None:
+    """버전 4: 봇별 getUpdates offset(다음에 받을 update_id). 롱 폴링 모드가 배치마다 기록합니다."""
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {TELEGRAM_OFFSETS_TABLE} (
+            bot_id TEXT PRIMARY KEY,
+            next_offset BIGINT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+
+
+def _migrate_history_indexes(cur) -> None:
+    """버전 5: 보존 기간 정리와 게시판별 최근 글 조회에 맞춘 색인."""
+    # 게시판별 최근 글(보존 정리 때 게시판마다 남길 최신 글 계산)과 보존 기간 기준 정리
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {POSTS_TABLE}_board_recent_idx ON {POSTS_TABLE} (board, sent_at DESC)")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {POSTS_TABLE}_sent_at_idx ON {POSTS_TABLE} (sent_at)")
+    # 끝난 발송 기록만 정리 대상이므로 대기 중인 행은 색인에 넣지 않습니다.
+    cur.execute(
+        f"""
+        CREATE INDEX IF NOT EXISTS {DELIVERIES_TABLE}_done_idx
+        ON {DELIVERIES_TABLE} (created_at) WHERE status IN ('sent', 'failed', 'blocked')
+        """
+    )
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {OUTBOX_TABLE}_created_idx ON {OUTBOX_TABLE} (created_at)")
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS {FINGERPRINTS_TABLE}_pinned_idx ON {FINGERPRINTS_TABLE} (link) WHERE pinned"
+    )
+
+
+def _migrate_fingerprint_board(cur) -> None:
+    """버전 6: 지문에 게시판 이름을 기록합니다. 지문이 하나도 없는 게시판은 첫 크롤을 기준선으로만 저장합니다."""
+    cur.execute(f"ALTER TABLE {FINGERPRINTS_TABLE} ADD COLUMN IF NOT EXISTS board TEXT")
+    cur.execute(
+        f"UPDATE {FINGERPRINTS_TABLE} f SET board = p.board FROM {POSTS_TABLE} p "
+        "WHERE p.link = f.link AND f.board IS NULL"
+    )
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {FINGERPRINTS_TABLE}_board_idx ON {FINGERPRINTS_TABLE} (board)")
+
+
+# (버전, 이름, 적용 함수). 스키마를 바꿀 때는 기존 항목을 고치지 말고 끝에 새 버전을 추가합니다.
+MIGRATIONS = [
+    (1, "baseline", _migrate_baseline),
+    (2, "worker_leases", _migrate_worker_leases),
+    (3, "post_fingerprints", _migrate_post_fingerprints),
+    (4, "telegram_offsets", _migrate_telegram_offsets),
+    (5, "history_indexes", _migrate_history_indexes),
+    (6, "fingerprint_board", _migrate_fingerprint_board),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def schema_version() -> int:
+    """DB에 적용된 스키마 버전을 반환합니다. 마이그레이션 기록이 없으면 0입니다."""
+    with _cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL AS present", (SCHEMA_MIGRATIONS_TABLE,))
+        if not cur.fetchone()["present"]:
+            return 0
+        cur.execute(f"SELECT coalesce(max(version), 0) AS version FROM {SCHEMA_MIGRATIONS_TABLE}")
+        return cur.fetchone()["version"]
+
+
+def migrate() -> list[int]:
+    """적용되지 않은 마이그레이션을 순서대로 한 트랜잭션에서 적용하고 적용한 버전 목록을 반환합니다.
+
+    advisory lock으로 여러 프로세스가 동시에 호출해도 한 곳에서만 실행되고,
+    나머지는 잠금이 풀린 뒤 이미 적용된 것을 확인하고 끝납니다.
+    """
+    global _schema_ready
+    applied = []
+    with _cursor(transaction=True) as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (SCHEMA_MIGRATIONS_TABLE,))
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {SCHEMA_MIGRATIONS_TABLE} (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
             )
             """
         )
+        cur.execute(f"SELECT coalesce(max(version), 0) AS version FROM {SCHEMA_MIGRATIONS_TABLE}")
+        current = cur.fetchone()["version"]
+        for version, name, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            started = time.monotonic()
+            apply(cur)
+            cur.execute(f"INSERT INTO {SCHEMA_MIGRATIONS_TABLE} (version, name) VALUES (%s, %s)", (version, name))
+            applied.append(version)
+            print(f"✅ 스키마 마이그레이션 {version}({name}) 적용: {time.monotonic() - started:.2f}초")
+    _schema_ready = True
+    return applied
+
+
+def ensure_schema() -> None:
+    """프로세스당 한 번 스키마 버전을 확인하고, 뒤처져 있으면(DB_AUTO_MIGRATE) 마이그레이션합니다.
+
+    확인에 실패하면(DB 장애 등) 예외를 그대로 올리고 다음 DB 사용 때 다시 확인합니다.
+    """
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        version = schema_version()
+        if version < SCHEMA_VERSION:
+            if not DB_AUTO_MIGRATE:
+                raise RuntimeError(f"DB 스키마 버전 {version} < {SCHEMA_VERSION}: 먼저 python migrate.py를 실행하세요.")
+            migrate()
+        _schema_ready = True
+
+
+def init_db():
+    """스키마를 최신 버전으로 맞춥니다(이전 호출부와 벤치마크 호환용)."""
+    migrate()
+
+
+def _insert_sent_posts(cur, posts: list[dict]) -> list[str]:
+    """발송 기록을 저장하고, 이번에 새로 기록된 링크 목록을 반환합니다."""
+    rows = [(p["link"], p["title"], p.get("board")) for p in posts]
+    inserted = execute_values(
+        cur,
+        f"INSERT INTO {POSTS_TABLE} (link, title, board) VALUES %s ON CONFLICT (link) DO NOTHING RETURNING link",
+        rows,
+        fetch=True,
+    )
+    return [r["link"] for r in inserted]
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="fingerprint_lookup")
+def fingerprint_lookup(links: list[str]) -> dict:
+    """링크별 발송 여부와 저장된 지문을 한 번의 쿼리로 조회합니다.
+
+    반환값: {link: {"sent": bool, "fingerprint": str | None, "pinned": bool | None}}
+    """
+    if not links:
+        return {}
+    with get_cursor() as cur:
         cur.execute(
             f"""
-            CREATE TABLE IF NOT EXISTS {SUBSCRIBERS_TABLE} (
-                id SERIAL PRIMARY KEY,
-                user_id TEXT NOT NULL UNIQUE,
-                subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            SELECT l.link, p.link IS NOT NULL AS sent, f.fingerprint, f.pinned
+            FROM unnest(%s::text[]) AS l(link)
+            LEFT JOIN {POSTS_TABLE} p ON p.link = l.link
+            LEFT JOIN {FINGERPRINTS_TABLE} f ON f.link = l.link
+            """,
+            (list(links),),
+        )
+        return {r["link"]: {"sent": r["sent"], "fingerprint": r["fingerprint"], "pinned": r["pinned"]}
+                for r in cur.fetchall()}
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="board_has_fingerprints")
+def board_has_fingerprints(board: str) -> bool:
+    """게시판에 저장된 지문이 하나라도 있는지 반환합니다(없으면 처음 크롤하는 게시판)."""
+    with get_cursor() as cur:
+        cur.execute(f"SELECT 1 FROM {FINGERPRINTS_TABLE} WHERE board = %s LIMIT 1", (board,))
+        return cur.fetchone() is not None
+
+
+def _upsert_fingerprints(cur, posts: list[dict], include_pin: bool = False) -> dict:
+    """지문을 저장하고, 새로 저장되었거나 지문이 바뀐 행의 {link: revision}을 반환합니다.
+
+    지문이 같은 행은 건드리지 않습니다(include_pin이면 고정 여부가 바뀐 행도 갱신).
+    바뀐 행만 RETURNING되므로 같은 수정을 두 번 크롤링해도 한 번만 반환됩니다.
+    """
+    changed = f"{FINGERPRINTS_TABLE}.fingerprint <> EXCLUDED.fingerprint"
+    inserted = execute_values(
+        cur,
+        f"""
+        INSERT INTO {FINGERPRINTS_TABLE} (link, fingerprint, title, posted_on, attachments, pinned, board)
+        VALUES %s
+        ON CONFLICT (link) DO UPDATE SET
+            fingerprint = EXCLUDED.fingerprint, title = EXCLUDED.title, posted_on = EXCLUDED.posted_on,
+            attachments = EXCLUDED.attachments, pinned = EXCLUDED.pinned,
+            board = coalesce(EXCLUDED.board, {FINGERPRINTS_TABLE}.board),
+            revision = {FINGERPRINTS_TABLE}.revision + ({changed})::int,
+            changed_at = CASE WHEN {changed} THEN now() ELSE {FINGERPRINTS_TABLE}.changed_at END
+        WHERE {changed}{f" OR {FINGERPRINTS_TABLE}.pinned <> EXCLUDED.pinned" if include_pin else ""}
+        RETURNING link, revision
+        """,
+        [(p["link"], p["fingerprint"], p["title"], p.get("posted_on"), p.get("attachments", 0),
+          bool(p.get("pinned")), p.get("board")) for p in posts],
+        fetch=True,
+    )
+    return {r["link"]: r["revision"] for r in inserted}
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="save_fingerprints")
+def save_fingerprints(posts: list[dict]) -> int:
+    """알림 없이 지문만 기록합니다(처음 보는 지문, 고정 여부 변경). 갱신한 행 수를 반환합니다."""
+    if not posts:
+        return 0
+    with get_cursor() as cur:
+        return len(_upsert_fingerprints(cur, posts, include_pin=True))
+
+
+def _mark_posts_updated(cur, posts: list[dict]) -> None:
+    """수정된 글의 발송 기록 제목을 바꾸고 상세 본문을 다시 색인하도록 표시합니다."""
+    execute_values(
+        cur,
+        f"UPDATE {POSTS_TABLE} p SET title = v.title FROM (VALUES %s) AS v(link, title) WHERE p.link = v.link",
+        [(p["link"], p["title"]) for p in posts],
+    )
+    cur.execute(
+        f"UPDATE {CONTENTS_TABLE} SET fetched_at = NULL, fetch_attempts = 0 WHERE link = ANY(%s)",
+        ([p["link"] for p in posts],),
+    )
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="add_sent_posts")
+def add_sent_posts(posts: list[dict]) -> int:
+    """여러 게시글의 발송 기록을 한 트랜잭션으로 저장하고 새로 기록된 수를 반환합니다."""
+    if not posts:
+        return 0
+    with get_cursor(transaction=True) as cur:
+        inserted = len(_insert_sent_posts(cur, posts))
+    print(f"✅ DB에 공지 {inserted}/{len(posts)}개 기록 완료")
+    return inserted
+
+
+def _insert_messages(cur, rows: list[tuple]) -> dict:
+    """(message_key, text, disable_web_page_preview) 행을 저장하고 {message_key: id}를 반환합니다.
+
+    재시도나 동시 크롤로 이미 있는 키도 기존 id를 돌려주도록 DO UPDATE로 RETURNING에 포함시킵니다
+    (DO NOTHING은 충돌한 행을 반환하지 않습니다). 기존 메시지 내용은 바꾸지 않습니다.
+    """
+    # 한 문장에서 같은 행을 두 번 갱신할 수 없으므로 키 중복을 먼저 없앱니다.
+    rows = list({row[0]: row for row in rows}.values())
+    inserted = execute_values(
+        cur,
+        f"""
+        INSERT INTO {OUTBOX_TABLE} (message_key, text, disable_web_page_preview) VALUES %s
+        ON CONFLICT (message_key) DO UPDATE SET message_key = EXCLUDED.message_key
+        RETURNING id, message_key
+        """,
+        rows,
+        fetch=True,
+    )
+    return {m["message_key"]: m["id"] for m in inserted}
+
+
+def _record_changed_posts(cur, posts: list[dict]) -> tuple[list[dict], list[dict]]:
+    """발송 기록과 지문을 저장하고 (알림을 보낼 글, 그중 수정된 글)을 반환합니다.
+
+    이미 기록된 게시글은 빠지므로 같은 글이 두 번 크롤링되어도 한 번만 반환됩니다. change="updated"인
+    글은 저장된 지문이 이번 트랜잭션에서 실제로 바뀐 경우에만 message_key link#r<revision>으로 포함됩니다.
+    """
+    new_links = set(_insert_sent_posts(cur, posts))
+    revisions = _upsert_fingerprints(cur, [p for p in posts if p.get("fingerprint")])
+    fresh, updated = [], []
+    for p in posts:
+        if p["link"] in new_links:
+            fresh.append(dict(p, message_key=p["link"]))
+        elif p.get("change") == "updated" and p["link"] in revisions:
+            updated.append(dict(p, message_key=f"{p['link']}#r{revisions[p['link']]}"))
+    if updated:
+        _mark_posts_updated(cur, updated)
+    return fresh + updated, updated
+
+
+def _delivery_audience(cur) -> list[dict]:
+    """발송 계획에 쓸 구독자 목록(가입 순)을 반환합니다: user_id, delivery_mode, has_watch."""
+    cur.execute(
+        f"""
+        SELECT s.user_id, s.delivery_mode,
+               EXISTS (SELECT 1 FROM {WATCHES_TABLE} w WHERE w.user_id = s.user_id) AS has_watch
+        FROM {SUBSCRIBERS_TABLE} s ORDER BY s.id
+        """
+    )
+    return [dict(r) for r in cur.fetchall()]
+
+
+def _insert_deliveries(cur, rows: list[tuple]) -> int:
+    """(message_id, chat_id) 행을 대기열에 넣고 새로 들어간 수를 반환합니다. 이미 있는 쌍은 건너뜁니다."""
+    if not rows:
+        return 0
+    inserted = execute_values(
+        cur,
+        f"""
+        INSERT INTO {DELIVERIES_TABLE} (message_id, chat_id) VALUES %s
+        ON CONFLICT (message_id, chat_id) DO NOTHING
+        RETURNING id
+        """,
+        sorted(rows, key=lambda row: row[0]),
+        page_size=1000,
+        fetch=True,
+    )
+    return len(inserted)
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="enqueue_post_deliveries")
+def enqueue_post_deliveries(posts: list[dict], plan, with_subscribers: bool = True) -> dict:
+    """게시글 발송 기록과 수신자별 발송 대기열(outbox)을 한 트랜잭션으로 만듭니다.
+
+    각 post에는 "text"(렌더링된 메시지)가 있어야 하고, "fingerprint"가 있는 글은 지문도 함께 저장합니다.
+    누구에게 어떤 메시지를 보낼지는 plan(fresh, subscribers)이 정해
+    {"messages": [(message_key, text, disable_web_page_preview)], "pairs": [(message_key, chat_id)],
+    "saved_calls": int}로 돌려주고(outbox.plan_deliveries), 여기서는 그 행을 그대로 저장합니다.
+    fresh는 이번에 처음 기록된 글과 실제로 수정된 글이고, subscribers는 같은 트랜잭션에서 읽은
+    구독자 목록입니다(with_subscribers=False이면 None).
+    """
+    if not posts:
+        return {"posts": 0, "updated": 0, "deliveries": 0, "saved_calls": 0}
+    with get_cursor(transaction=True) as cur:
+        fresh, updated = _record_changed_posts(cur, posts)
+        if not fresh:
+            return {"posts": 0, "updated": 0, "deliveries": 0, "saved_calls": 0}
+        planned = plan(fresh, _delivery_audience(cur) if with_subscribers else None)
+        message_ids = _insert_messages(cur, planned["messages"])
+        deliveries = _insert_deliveries(cur, [(message_ids[key], chat_id) for key, chat_id in planned["pairs"]])
+    saved = planned["saved_calls"]
+    print(f"✅ DB에 공지 {len(fresh)}개 기록(수정 {len(updated)}개), 발송 대기 {deliveries}건 등록"
+          + (f" (다이제스트로 {saved}건 절약)" if saved else ""))
+    return {"posts": len(fresh), "updated": len(updated), "deliveries": deliveries, "saved_calls": saved}
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="set_delivery_mode")
+def set_delivery_mode(user_id: str, mode: str) -> bool:
+    """구독자의 발송 방식을 바꿉니다. 구독 중이 아니면 False를 반환합니다."""
+    with get_cursor() as cur:
+        cur.execute(f"UPDATE {SUBSCRIBERS_TABLE} SET delivery_mode = %s WHERE user_id = %s", (mode, user_id))
+        return cur.rowcount > 0
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="claim_deliveries")
+def claim_deliveries(limit: int, lease_sec: float) -> list[dict]:
+    """발송할 차례가 된 대기 건을 최대 limit개 가져와 'sending'으로 표시합니다.
+
+    lease_sec 안에 결과가 기록되지 않으면(워커 강제 종료 등) release_stale_deliveries()가
+    다시 대기 상태로 돌립니다.
+    """
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {DELIVERIES_TABLE} d
+            SET status = 'sending', attempts = d.attempts + 1,
+                locked_until = CURRENT_TIMESTAMP + make_interval(secs => %s)
+            FROM {OUTBOX_TABLE} m
+            WHERE d.id IN (
+                SELECT id FROM {DELIVERIES_TABLE}
+                WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+                ORDER BY next_attempt_at, id
+                FOR UPDATE SKIP LOCKED
+                LIMIT %s
             )
+            AND m.id = d.message_id
+            RETURNING d.id, d.chat_id, d.attempts, m.text, m.disable_web_page_preview
+            """,
+            (lease_sec, limit),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="complete_deliveries")
+def complete_deliveries(sent_ids: list[int], retries: list[tuple], failures: list[tuple],
+                        blocked: list[tuple]) -> None:
+    """한 배치의 발송 결과를 한 트랜잭션으로 기록합니다(체크포인트).
+
+    retries: (id, 재시도까지 초, 오류), failures: (id, 오류), blocked: (id, chat_id, 오류)
+    봇을 차단한 사용자(blocked)는 구독 목록에서도 제거합니다.
+    """
+    with get_cursor(transaction=True) as cur:
+        if sent_ids:
+            cur.execute(
+                f"""
+                UPDATE {DELIVERIES_TABLE}
+                SET status = 'sent', sent_at = CURRENT_TIMESTAMP, locked_until = NULL, last_error = NULL
+                WHERE id = ANY(%s)
+                """,
+                (list(sent_ids),),
+            )
+        if retries:
+            execute_values(
+                cur,
+                f"""
+                UPDATE {DELIVERIES_TABLE} AS d
+                SET status = 'pending', locked_until = NULL, last_error = v.error,
+                    next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => v.delay)
+                FROM (VALUES %s) AS v(id, delay, error)
+                WHERE d.id = v.id
+                """,
+                retries,
+                template="(%s::bigint, %s::double precision, %s)",
+            )
+        if failures:
+            execute_values(
+                cur,
+                f"""
+                UPDATE {DELIVERIES_TABLE} AS d
+                SET status = 'failed', locked_until = NULL, last_error = v.error
+                FROM (VALUES %s) AS v(id, error)
+                WHERE d.id = v.id
+                """,
+                failures,
+                template="(%s::bigint, %s)",
+            )
+        if blocked:
+            execute_values(
+                cur,
+                f"""
+                UPDATE {DELIVERIES_TABLE} AS d
+                SET status = 'blocked', locked_until = NULL, last_error = v.error
+                FROM (VALUES %s) AS v(id, error)
+                WHERE d.id = v.id
+                """,
+                [(delivery_id, error) for delivery_id, _, error in blocked],
+                template="(%s::bigint, %s)",
+            )
+            chat_ids = sorted({chat_id for _, chat_id, _ in blocked})
+            cur.execute(f"DELETE FROM {SUBSCRIBERS_TABLE} WHERE user_id = ANY(%s)", (chat_ids,))
+            # 차단한 사용자에게 남은 다른 대기 건도 보내지 않습니다.
+            cur.execute(
+                f"""
+                UPDATE {DELIVERIES_TABLE} SET status = 'blocked', last_error = '구독 자동 해제'
+                WHERE status = 'pending' AND chat_id = ANY(%s)
+                """,
+                (chat_ids,),
+            )
+            print(f"ℹ️ 봇 차단 사용자 {len(chat_ids)}명 구독 자동 해제")
+
+
+def release_stale_deliveries() -> int:
+    """lease가 만료된 'sending' 건을 다시 대기 상태로 돌립니다."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {DELIVERIES_TABLE}
+            SET status = 'pending', locked_until = NULL
+            WHERE status = 'sending' AND locked_until < CURRENT_TIMESTAMP
             """
         )
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+        return cur.rowcount
 
 
-def add_sent_post(link: str, title: str) -> None:
-    conn = _get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute(f"INSERT INTO {POSTS_TABLE} (link, title) VALUES (%s, %s) ON CONFLICT (link) DO NOTHING", (link, title))
-        conn.commit()
-        print(f"✅ DB에 공지 기록 완료: {title[:30]}...")
-    finally:
-        cur.close()
-        conn.close()
+def has_due_deliveries() -> bool:
+    """지금 보낼 차례인 대기 건이 있는지 확인합니다(부분 색인만 조회)."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT EXISTS (
+                SELECT 1 FROM {DELIVERIES_TABLE}
+                WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+            ) OR EXISTS (
+                SELECT 1 FROM {DELIVERIES_TABLE} WHERE status = 'sending' AND locked_until < CURRENT_TIMESTAMP
+            ) AS due
+            """
+        )
+        return cur.fetchone()["due"]
 
 
-def is_post_sent(link: str) -> bool:
-    conn = _get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute(f"SELECT id FROM {POSTS_TABLE} WHERE link = %s LIMIT 1", (link,))
+def renew_lease(node_id: str, ttl_sec: float) -> int:
+    """노드 heartbeat를 갱신하고 만료된 노드를 정리한 뒤, 자신을 포함한 살아 있는 노드 수를 반환합니다."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            WITH renewed AS (
+                INSERT INTO {WORKER_LEASES_TABLE} (node_id) VALUES (%s)
+                ON CONFLICT (node_id) DO UPDATE SET heartbeat_at = now()
+                RETURNING node_id
+            ), expired AS (
+                DELETE FROM {WORKER_LEASES_TABLE}
+                WHERE heartbeat_at < now() - make_interval(secs => %s)
+                RETURNING node_id
+            )
+            SELECT count(*) + 1 AS live FROM {WORKER_LEASES_TABLE}
+            WHERE node_id <> %s AND heartbeat_at >= now() - make_interval(secs => %s)
+            """,
+            (node_id, ttl_sec, node_id, ttl_sec),
+        )
+        return cur.fetchone()["live"]
+
+
+def release_lease(node_id: str) -> None:
+    with get_cursor() as cur:
+        cur.execute(f"DELETE FROM {WORKER_LEASES_TABLE} WHERE node_id = %s", (node_id,))
+
+
+def list_leases() -> list[dict]:
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT node_id, started_at, heartbeat_at FROM {WORKER_LEASES_TABLE}
+            ORDER BY started_at
+            """
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="posts_missing_content")
+def posts_missing_content(limit: int, max_attempts: int) -> list[dict]:
+    """상세 본문이 아직 없는 발송 기록을 최근 것부터 반환합니다(실패는 max_attempts회까지 재시도)."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT p.link, p.title, p.board
+            FROM {POSTS_TABLE} p
+            LEFT JOIN {CONTENTS_TABLE} c ON c.link = p.link
+            WHERE c.link IS NULL OR (c.fetched_at IS NULL AND c.fetch_attempts < %s)
+            ORDER BY p.id DESC
+            LIMIT %s
+            """,
+            (max_attempts, limit),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="save_post_contents")
+def save_post_contents(fetched: list[dict], failed: list[dict]) -> None:
+    """상세 본문 수집 결과를 저장합니다. failed 항목은 시도 횟수와 오류만 기록합니다."""
+    with get_cursor(transaction=True) as cur:
+        if fetched:
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO {CONTENTS_TABLE} (link, board, title, body, attachments, fetch_attempts, fetched_at)
+                VALUES %s
+                ON CONFLICT (link) DO UPDATE SET
+                    board = EXCLUDED.board, title = EXCLUDED.title, body = EXCLUDED.body,
+                    attachments = EXCLUDED.attachments, fetch_error = NULL,
+                    fetch_attempts = {CONTENTS_TABLE}.fetch_attempts + 1, fetched_at = CURRENT_TIMESTAMP
+                """,
+                [(p["link"], p.get("board"), p["title"], p["body"], Json(p["attachments"])) for p in fetched],
+                template="(%s, %s, %s, %s, %s, 1, CURRENT_TIMESTAMP)",
+            )
+            cur.execute(
+                f"""
+                UPDATE {FINGERPRINTS_TABLE} f SET body_hash = md5(c.body)
+                FROM {CONTENTS_TABLE} c
+                WHERE c.link = f.link AND c.link = ANY(%s) AND f.body_hash IS DISTINCT FROM md5(c.body)
+                """,
+                ([p["link"] for p in fetched],),
+            )
+        if failed:
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO {CONTENTS_TABLE} (link, board, title, fetch_attempts, fetch_error)
+                VALUES %s
+                ON CONFLICT (link) DO UPDATE SET
+                    fetch_attempts = {CONTENTS_TABLE}.fetch_attempts + 1, fetch_error = EXCLUDED.fetch_error
+                """,
+                [(p["link"], p.get("board"), p["title"], p["error"][:500]) for p in failed],
+                template="(%s, %s, %s, 1, %s)",
+            )
+
+
+def _like_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="search_posts")
+def search_posts(query: str, limit: int = 10) -> list[dict]:
+    """제목·본문에서 query를 찾아 관련도 순으로 반환합니다.
+
+    먼저 단어 접두사 일치(예: "계절" → "계절학기")를 tsvector 색인으로 찾고, 결과가 limit보다
+    적을 때만 부분 문자열 일치(ILIKE, pg_trgm 색인)로 나머지를 채웁니다.
+    """
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            WITH q AS MATERIALIZED (
+                SELECT to_tsquery('simple', (
+                    SELECT string_agg(quote_literal(lexeme) || ':*', ' & ')
+                    FROM unnest(to_tsvector('simple', %(query)s))
+                )) AS tsq
+            ),
+            hits AS (
+                (SELECT c.link, c.board, c.title, c.body, c.attachments, c.fetched_at,
+                        ts_rank(c.search_vector, q.tsq) AS rank
+                 FROM {CONTENTS_TABLE} c, q
+                 WHERE c.search_vector @@ q.tsq
+                 ORDER BY rank DESC, c.fetched_at DESC NULLS LAST
+                 LIMIT %(limit)s)
+                UNION ALL
+                (SELECT c.link, c.board, c.title, c.body, c.attachments, c.fetched_at, 0 AS rank
+                 FROM {CONTENTS_TABLE} c, q
+                 WHERE c.search_text ILIKE %(pattern)s AND NOT coalesce(c.search_vector @@ q.tsq, false)
+                 ORDER BY c.fetched_at DESC NULLS LAST
+                 LIMIT %(limit)s)
+                LIMIT %(limit)s
+            )
+            SELECT h.link, h.board, h.title, h.attachments, h.rank, p.sent_at,
+                   left(coalesce(h.body, ''), 200) AS snippet
+            FROM hits h
+            LEFT JOIN {POSTS_TABLE} p ON p.link = h.link
+            ORDER BY h.rank DESC, p.sent_at DESC NULLS LAST
+            """,
+            {"query": query, "pattern": _like_pattern(query), "limit": limit},
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="get_fetch_cache")
+def get_fetch_cache(url: str) -> dict | None:
+    """목록 페이지의 조건부 GET 검증값(ETag/Last-Modified)과 목록 해시를 반환합니다."""
+    with get_cursor() as cur:
+        cur.execute(f"SELECT etag, last_modified, content_hash FROM {FETCH_CACHE_TABLE} WHERE url = %s", (url,))
         row = cur.fetchone()
-        return row is not None
-    finally:
-        cur.close()
-        conn.close()
+        return dict(row) if row else None
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="save_fetch_cache")
+def save_fetch_cache(url: str, etag: str | None, last_modified: str | None, content_hash: str) -> None:
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO {FETCH_CACHE_TABLE} (url, etag, last_modified, content_hash, updated_at)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (url) DO UPDATE SET
+                etag = EXCLUDED.etag,
+                last_modified = EXCLUDED.last_modified,
+                content_hash = EXCLUDED.content_hash,
+                updated_at = EXCLUDED.updated_at
+            """,
+            (url, etag, last_modified, content_hash),
+        )
+
+
+_JOB_COLUMNS = "id, kind, status, progress, result, error, attempts, created_at, started_at, heartbeat_at, finished_at"
+
+
+def enqueue_job(kind: str) -> tuple[dict, bool]:
+    """작업을 큐에 넣습니다. 같은 종류의 작업이 대기/실행 중이면 그 작업을 반환합니다.
+
+    반환값: (작업 정보, 새로 만들었는지 여부)
+    """
+    for _ in range(3):
+        with get_cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO {JOBS_TABLE} (kind) VALUES (%s)
+                ON CONFLICT (kind) WHERE status IN ('queued', 'running') DO NOTHING
+                RETURNING {_JOB_COLUMNS}
+                """,
+                (kind,),
+            )
+            row = cur.fetchone()
+            if row:
+                return dict(row), True
+            cur.execute(
+                f"""
+                SELECT {_JOB_COLUMNS} FROM {JOBS_TABLE}
+                WHERE kind = %s AND status IN ('queued', 'running')
+                """,
+                (kind,),
+            )
+            row = cur.fetchone()
+            if row:
+                return dict(row), False
+        # INSERT와 SELECT 사이에 기존 작업이 끝난 경우 다시 시도합니다.
+    raise RuntimeError(f"작업 등록 실패: {kind}")
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="claim_job")
+def claim_job() -> dict | None:
+    """대기 중인 작업 하나를 실행 상태로 가져옵니다(SKIP LOCKED로 워커 간 경합 없음)."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {JOBS_TABLE}
+            SET status = 'running', started_at = CURRENT_TIMESTAMP,
+                heartbeat_at = CURRENT_TIMESTAMP, attempts = attempts + 1
+            WHERE id = (
+                SELECT id FROM {JOBS_TABLE}
+                WHERE status = 'queued'
+                ORDER BY id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING {_JOB_COLUMNS}
+            """
+        )
+        row = cur.fetchone()
+        return dict(row) if row else None
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="update_job_progress")
+def update_job_progress(job_id: int, progress: dict | None = None) -> None:
+    """진행 상황을 기록하고 heartbeat를 갱신합니다. progress가 None이면 heartbeat만 갱신합니다."""
+    with get_cursor() as cur:
+        if progress is None:
+            cur.execute(f"UPDATE {JOBS_TABLE} SET heartbeat_at = CURRENT_TIMESTAMP WHERE id = %s", (job_id,))
+        else:
+            cur.execute(
+                f"UPDATE {JOBS_TABLE} SET progress = %s, heartbeat_at = CURRENT_TIMESTAMP WHERE id = %s",
+                (Json(progress), job_id),
+            )
+
+
+def finish_job(job_id: int, status: str, result: dict | None = None, error: str | None = None) -> None:
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {JOBS_TABLE}
+            SET status = %s, result = %s, error = %s, finished_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+            """,
+            (status, Json(result) if result is not None else None, error, job_id),
+        )
+
+
+def get_job(job_id: int) -> dict | None:
+    with get_cursor() as cur:
+        cur.execute(f"SELECT {_JOB_COLUMNS} FROM {JOBS_TABLE} WHERE id = %s", (job_id,))
+        row = cur.fetchone()
+        return dict(row) if row else None
+
+
+def seconds_since_job_finished(kind: str) -> float | None:
+    """해당 종류의 작업이 마지막으로 끝난 뒤 지난 초를 반환합니다. 끝난 적이 없으면 None."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - MAX(finished_at)) AS elapsed
+            FROM {JOBS_TABLE} WHERE kind = %s
+            """,
+            (kind,),
+        )
+        elapsed = cur.fetchone()["elapsed"]
+        return float(elapsed) if elapsed is not None else None
+
+
+def requeue_stale_jobs(stale_after_sec: float, max_attempts: int) -> int:
+    """heartbeat가 끊긴 실행 중 작업(워커 강제 종료 등)을 다시 대기 상태로 돌리거나 실패 처리합니다."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            UPDATE {JOBS_TABLE}
+            SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+                error = CASE WHEN attempts >= %s THEN 'heartbeat 중단(최대 시도 초과)' ELSE error END,
+                finished_at = CASE WHEN attempts >= %s THEN CURRENT_TIMESTAMP ELSE NULL END
+            WHERE status = 'running'
+              AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+            """,
+            (max_attempts, max_attempts, max_attempts, stale_after_sec),
+        )
+        return cur.rowcount
+
+
+def record_crawl_run(run: dict) -> int:
+    """크롤 실행 결과 한 건을 기록하고 id를 반환합니다. 시각 값은 Unix 초입니다."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO {CRAWL_HISTORY_TABLE}
+                (started_at, status, new_posts, pages_fetched, cache_hit, fetch_ms, duration_ms,
+                 circuit_open_until, error, timings)
+            VALUES (to_timestamp(%s), %s, %s, %s, %s, %s, %s, to_timestamp(%s), %s, %s)
+            RETURNING id
+            """,
+            (run["started_at"], run["status"], run.get("new_posts", 0), run.get("pages_fetched", 0),
+             bool(run.get("cache_hit")), run.get("fetch_ms"), run.get("duration_ms"),
+             run.get("circuit_open_until"), (run.get("error") or "")[:500] or None,
+             Json(run["timings"]) if run.get("timings") else None),
+        )
+        return cur.fetchone()["id"]
+
+
+def finish_crawl_run(run_id: int, timings: dict) -> None:
+    """발송·색인까지 끝난 실행의 단계별 소요 시간(ms)과 종료 시각을 기록합니다."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"UPDATE {CRAWL_HISTORY_TABLE} SET timings = %s, finished_at = now() WHERE id = %s",
+            (Json(timings), run_id),
+        )
+
+
+def crawl_status_snapshot() -> dict:
+    """/status 응답용 요약을 한 번의 쿼리로 반환합니다.
+
+    last_run: 마지막 실행, age_sec: 마지막 실행 시작 후 경과 초, last_success_at: 마지막 정상 실행 시각,
+    last_error: 마지막 실패 실행, latest_post: 마지막으로 저장(발송)된 게시글.
+    """
+    columns = ("id, started_at, finished_at, status, new_posts, pages_fetched, cache_hit, fetch_ms, duration_ms, "
+               "circuit_open_until, error, timings")
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT
+                (SELECT row_to_json(r) FROM (SELECT {columns} FROM {CRAWL_HISTORY_TABLE}
+                                             ORDER BY id DESC LIMIT 1) r) AS last_run,
+                (SELECT EXTRACT(EPOCH FROM now() - started_at) FROM {CRAWL_HISTORY_TABLE}
+                 ORDER BY id DESC LIMIT 1) AS age_sec,
+                (SELECT max(started_at) FROM {CRAWL_HISTORY_TABLE} WHERE status = 'ok') AS last_success_at,
+                (SELECT row_to_json(r) FROM (SELECT id, started_at, status, error FROM {CRAWL_HISTORY_TABLE}
+                                             WHERE status <> 'ok' ORDER BY id DESC LIMIT 1) r) AS last_error,
+                (SELECT row_to_json(p) FROM (SELECT title, link, board, sent_at FROM {POSTS_TABLE}
+                                             ORDER BY id DESC LIMIT 1) p) AS latest_post,
+                now() AS checked_at
+            """
+        )
+        return dict(cur.fetchone())
+
+
+def latest_circuit_open_until() -> float | None:
+    """아직 닫히지 않은 서킷의 종료 시각(Unix 초)을 반환합니다."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT EXTRACT(EPOCH FROM max(circuit_open_until)) AS until FROM {CRAWL_HISTORY_TABLE}
+            WHERE started_at > now() - INTERVAL '1 day' AND circuit_open_until > now()
+            """
+        )
+        until = cur.fetchone()["until"]
+        return float(until) if until is not None else None
+
+
+def crawl_schedule_state(timezone: str, recent_runs: int, history_days: int) -> dict:
+    """스케줄러가 다음 실행 시각을 정하는 데 필요한 값을 한 번의 쿼리로 반환합니다.
+
+    since_last_sec: 마지막 실행 시작 후 경과 초, circuit_open_until: 열린 서킷이 닫히는 Unix 시각,
+    p_recent: 최근 recent_runs번 중 새 글이 있던 비율, p_hour: 지난 history_days일 동안 현재와
+    같은 시간대(timezone 기준)에 새 글이 있던 비율, local_hour: timezone 기준 현재 시.
+    """
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT
+                (SELECT EXTRACT(EPOCH FROM now() - max(started_at)) FROM {CRAWL_HISTORY_TABLE}) AS since_last_sec,
+                (SELECT EXTRACT(EPOCH FROM max(circuit_open_until)) FROM {CRAWL_HISTORY_TABLE}
+                 WHERE started_at > now() - INTERVAL '1 day' AND circuit_open_until > now()) AS circuit_open_until,
+                (SELECT avg((new_posts > 0)::int) FROM (
+                    SELECT new_posts FROM {CRAWL_HISTORY_TABLE} WHERE status = 'ok'
+                    ORDER BY id DESC LIMIT %(recent)s) r) AS p_recent,
+                (SELECT avg((new_posts > 0)::int) FROM {CRAWL_HISTORY_TABLE}
+                 WHERE status = 'ok' AND started_at > now() - make_interval(days => %(days)s)
+                   AND EXTRACT(HOUR FROM started_at AT TIME ZONE %(tz)s)
+                       = EXTRACT(HOUR FROM now() AT TIME ZONE %(tz)s)) AS p_hour,
+                EXTRACT(HOUR FROM now() AT TIME ZONE %(tz)s) AS local_hour
+            """,
+            {"recent": recent_runs, "days": history_days, "tz": timezone},
+        )
+        row = cur.fetchone()
+        return {key: (float(value) if value is not None else None) for key, value in row.items()}
+
+
+def recent_crawl_history(limit: int = 20) -> list[dict]:
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT id, started_at, status, new_posts, pages_fetched, cache_hit, fetch_ms, duration_ms,
+                   circuit_open_until, error, timings
+            FROM {CRAWL_HISTORY_TABLE} ORDER BY id DESC LIMIT %s
+            """,
+            (limit,),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="load_watches")
+def load_watches() -> list[tuple[str, list[str]]]:
+    """현재 구독 중인 사용자의 키워드를 (키워드, [user_id]) 목록으로 반환합니다."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT w.keyword, array_agg(w.user_id) AS user_ids
+            FROM {WATCHES_TABLE} w JOIN {SUBSCRIBERS_TABLE} s ON s.user_id = w.user_id
+            GROUP BY w.keyword
+            """
+        )
+        return [(r["keyword"], r["user_ids"]) for r in cur.fetchall()]
+
+
+def add_watch(user_id: str, keyword: str, max_per_user: int) -> bool:
+    """키워드를 등록합니다. 이미 등록된 키워드면 True, 사용자별 개수 제한을 넘으면 False."""
+    with get_cursor(transaction=True) as cur:
+        # 같은 사용자의 동시 등록이 개수 제한을 함께 넘지 않도록 사용자 단위로 잠급니다.
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"{WATCHES_TABLE}:{user_id}",))
+        cur.execute(
+            f"""
+            INSERT INTO {WATCHES_TABLE} (user_id, keyword)
+            SELECT %s, %s
+            WHERE (SELECT COUNT(*) FROM {WATCHES_TABLE} WHERE user_id = %s) < %s
+            ON CONFLICT (user_id, keyword) DO NOTHING
+            RETURNING id
+            """,
+            (user_id, keyword, user_id, max_per_user),
+        )
+        if cur.fetchone() is not None:
+            return True
+        # 개수 제한에 걸렸거나 이미 등록된 키워드입니다.
+        cur.execute(f"SELECT 1 FROM {WATCHES_TABLE} WHERE user_id = %s AND keyword = %s", (user_id, keyword))
+        return cur.fetchone() is not None
+
+
+def remove_watches(user_id: str, keyword: str | None = None) -> int:
+    """키워드를 해제하고 삭제된 수를 반환합니다. keyword가 None이면 모두 해제합니다."""
+    with get_cursor() as cur:
+        if keyword is None:
+            cur.execute(f"DELETE FROM {WATCHES_TABLE} WHERE user_id = %s", (user_id,))
+        else:
+            cur.execute(f"DELETE FROM {WATCHES_TABLE} WHERE user_id = %s AND keyword = %s", (user_id, keyword))
+        return cur.rowcount
 
 
+def list_watches(user_id: str) -> list[str]:
+    with get_cursor() as cur:
+        cur.execute(f"SELECT keyword FROM {WATCHES_TABLE} WHERE user_id = %s ORDER BY id", (user_id,))
+        return [r["keyword"] for r in cur.fetchall()]
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="add_subscriber")
 def add_subscriber(user_id: str) -> bool:
-    conn = _get_connection()
-    cur = conn.cursor()
-    try:
+    with get_cursor() as cur:
         cur.execute(f"INSERT INTO {SUBSCRIBERS_TABLE} (user_id) VALUES (%s) ON CONFLICT (user_id) DO NOTHING", (user_id,))
         changed = cur.rowcount
-        conn.commit()
-        if changed:
-            print(f"✅ 구독자 추가: {user_id}")
-            return True
-        print(f"ℹ️ 이미 구독 중인 사용자: {user_id}")
-        return False
-    finally:
-        cur.close()
-        conn.close()
+    if changed:
+        print(f"✅ 구독자 추가: {user_id}")
+        return True
+    print(f"ℹ️ 이미 구독 중인 사용자: {user_id}")
+    return False
 
 
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="remove_subscriber")
 def remove_subscriber(user_id: str) -> bool:
-    conn = _get_connection()
-    cur = conn.cursor()
-    try:
+    with get_cursor() as cur:
         cur.execute(f"DELETE FROM {SUBSCRIBERS_TABLE} WHERE user_id = %s", (user_id,))
         deleted = cur.rowcount
-        conn.commit()
-        if deleted:
-            print(f"✅ 구독자 제거: {user_id}")
-            return True
-        print(f"ℹ️ 구독자 없음: {user_id}")
-        return False
-    finally:
-        cur.close()
-        conn.close()
+    if deleted:
+        print(f"✅ 구독자 제거: {user_id}")
+        return True
+    print(f"ℹ️ 구독자 없음: {user_id}")
+    return False
 
 
-def list_subscribers() -> list[str]:
-    conn = _get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute(f"SELECT user_id FROM {SUBSCRIBERS_TABLE} ORDER BY id ASC")
-        rows = cur.fetchall()
-        return [r["user_id"] for r in rows]
-    finally:
-        cur.close()
-        conn.close()
+def get_update_offset(bot_id: str) -> int | None:
+    """저장된 getUpdates offset을 반환합니다. 없으면 None."""
+    with get_cursor() as cur:
+        cur.execute(f"SELECT next_offset FROM {TELEGRAM_OFFSETS_TABLE} WHERE bot_id = %s", (bot_id,))
+        row = cur.fetchone()
+        return row["next_offset"] if row else None
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="commit_update_batch")
+def commit_update_batch(bot_id: str, next_offset: int, subscribe: list[str], unsubscribe: list[str]) -> dict:
+    """getUpdates 배치의 구독/해제를 일괄 반영하고 offset을 같은 트랜잭션으로 기록합니다.
+
+    구독자 수와 관계없이 왕복은 한 번의 연결 대여 안의 쿼리 세 개로 고정됩니다.
+    offset이 뒤로 가지 않도록 더 큰 값일 때만 갱신합니다.
+    """
+    with get_cursor(transaction=True) as cur:
+        cur.execute(
+            f"""
+            WITH added AS (
+                INSERT INTO {SUBSCRIBERS_TABLE} (user_id)
+                SELECT u FROM unnest(%s::text[]) AS u ORDER BY u
+                ON CONFLICT (user_id) DO NOTHING
+                RETURNING 1
+            )
+            SELECT count(*) AS added FROM added
+            """,
+            (subscribe,),
+        )
+        added = cur.fetchone()["added"]
+        cur.execute(f"DELETE FROM {SUBSCRIBERS_TABLE} WHERE user_id = ANY(%s::text[])", (unsubscribe,))
+        removed = cur.rowcount
+        cur.execute(
+            f"""
+            INSERT INTO {TELEGRAM_OFFSETS_TABLE} (bot_id, next_offset) VALUES (%s, %s)
+            ON CONFLICT (bot_id) DO UPDATE SET next_offset = EXCLUDED.next_offset, updated_at = now()
+            WHERE {TELEGRAM_OFFSETS_TABLE}.next_offset < EXCLUDED.next_offset
+            """,
+            (bot_id, next_offset),
+        )
+    if added or removed:
+        print(f"✅ 구독 일괄 반영: 추가 {added}명, 해제 {removed}명")
+    return {"subscribed": added, "unsubscribed": removed}
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="list_subscribers_page")
+def list_subscribers_page(after_id: int = 0, limit: int = 100) -> list[dict]:
+    """id가 after_id보다 큰 구독자를 id 순으로 최대 limit명 반환합니다(키셋 페이지네이션)."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT id, user_id, subscribed_at FROM {SUBSCRIBERS_TABLE}
+            WHERE id > %s ORDER BY id ASC LIMIT %s
+            """,
+            (after_id, limit),
+        )
+        return [dict(r) for r in cur.fetchall()]
+
 
+def iter_subscriber_pages(chunk_size: int = 1000):
+    """구독자를 chunk_size명씩 페이지(list[dict]) 단위로 내보냅니다.
 
+    페이지마다 연결을 빌렸다 돌려주므로 소비하는 쪽이 느려도 연결을 붙잡지 않고,
+    메모리에는 한 페이지만 유지됩니다.
+    """
+    after_id = 0
+    while True:
+        page = list_subscribers_page(after_id, chunk_size)
+        if not page:
+            return
+        yield page
+        if len(page) < chunk_size:
+            return
+        after_id = page[-1]["id"]
+
+
+def iter_subscribers(chunk_size: int = 1000):
+    """구독자 user_id를 구독 순서대로 하나씩 내보냅니다."""
+    for page in iter_subscriber_pages(chunk_size):
+        for row in page:
+            yield row["user_id"]
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="count_subscribers")
+def count_subscribers() -> int:
+    with get_cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) AS count FROM {SUBSCRIBERS_TABLE}")
+        return cur.fetchone()["count"]
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="subscriber_counts")
+def subscriber_counts() -> dict:
+    """전체 구독자 수와 최근 1일/7일 신규 구독자 수를 반환합니다."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE subscribed_at > CURRENT_TIMESTAMP - INTERVAL '1 day') AS new_1d,
+                   COUNT(*) FILTER (WHERE subscribed_at > CURRENT_TIMESTAMP - INTERVAL '7 days') AS new_7d
+            FROM {SUBSCRIBERS_TABLE}
+            """
+        )
+        return dict(cur.fetchone())
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="is_subscribed")
 def is_subscribed(user_id: str) -> bool:
-    conn = _get_connection()
-    cur = conn.cursor()
-    try:
+    with get_cursor() as cur:
         cur.execute(f"SELECT id FROM {SUBSCRIBERS_TABLE} WHERE user_id = %s LIMIT 1", (user_id,))
-        row = cur.fetchone()
-        return row is not None
-    finally:
-        cur.close()
-        conn.close()
+        return cur.fetchone() is not None
+
+
+def clear_subscribers() -> int:
+    """모든 구독자를 삭제하고 삭제된 행 수를 반환합니다."""
+    with get_cursor() as cur:
+        cur.execute(f"DELETE FROM {SUBSCRIBERS_TABLE}")
+        return cur.rowcount
+
+
+def _archive_path(archive_dir: str, table: str, first_id: int) -> str:
+    directory = os.path.join(archive_dir, table)
+    os.makedirs(directory, exist_ok=True)
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    return os.path.join(directory, f"{table}-{stamp}-{first_id}.csv.gz")
+
+
+def _prune_rows(table: str, candidates_sql: str, params: dict, archive_dir: str | None, batch_size: int) -> dict:
+    """candidates_sql(id를 고르는 SELECT)에 걸린 행을 batch_size개씩 보관 후 삭제합니다.
+
+    배치마다 한 트랜잭션에서 id를 임시 테이블에 고정하고, archive_dir가 있으면 그 행들을
+    COPY ... TO STDOUT으로 gzip CSV 파일에 내보낸 뒤 삭제합니다. 파일은 삭제를 커밋하기 전에
+    완성되므로, 중간에 실패하면 행이 남아 다음 실행 때 다시 보관됩니다(보관 파일 중복은 가능, 유실은 없음).
+    반환값: {"deleted": n, "files": [경로, ...]}
+    """
+    deleted, files = 0, []
+    while True:
+        path = None
+        try:
+            with get_cursor(transaction=True) as cur:
+                cur.execute(
+                    f"CREATE TEMP TABLE prune_ids ON COMMIT DROP AS {candidates_sql} ORDER BY id LIMIT %(batch)s",
+                    dict(params, batch=batch_size),
+                )
+                if not cur.rowcount:
+                    break
+                count = cur.rowcount
+                if archive_dir:
+                    cur.execute("SELECT min(id) AS first_id FROM prune_ids")
+                    path = _archive_path(archive_dir, table, cur.fetchone()["first_id"])
+                    with gzip.open(path + ".part", "wb") as f:
+                        cur.copy_expert(
+                            f"COPY (SELECT t.* FROM {table} t JOIN prune_ids USING (id) ORDER BY t.id) "
+                            "TO STDOUT WITH (FORMAT csv, HEADER)",
+                            f,
+                        )
+                cur.execute(f"DELETE FROM {table} t USING prune_ids p WHERE t.id = p.id")
+                if path:
+                    os.replace(path + ".part", path)
+                    files.append(path)
+        except Exception:
+            if path and os.path.exists(path + ".part"):
+                os.remove(path + ".part")
+            raise
+        deleted += count
+        if count < batch_size:
+            break
+    return {"deleted": deleted, "files": files}
+
+
+def _sent_posts_keep_from(keep_per_board: int) -> list[tuple]:
+    """게시판별로 최신 keep_per_board개 글 중 가장 오래된 발송 시각을 반환합니다([(board, sent_at)])."""
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT board, min(sent_at) AS keep_from
+            FROM (SELECT board, sent_at,
+                         row_number() OVER (PARTITION BY board ORDER BY sent_at DESC) AS rank
+                  FROM {POSTS_TABLE}) r
+            WHERE rank <= %s
+            GROUP BY board
+            """,
+            (keep_per_board,),
+        )
+        return [(r["board"], r["keep_from"]) for r in cur.fetchall()]
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="prune_sent_posts")
+def prune_sent_posts(older_than_days: float, keep_per_board: int, archive_dir: str | None,
+                     batch_size: int = 10000) -> dict:
+    """오래된 발송 기록과 그 지문을 보관 후 삭제합니다.
+
+    발송 기록은 중복 발송을 막는 기준이므로, 게시판마다 최신 keep_per_board개와 고정 공지는
+    기간과 상관없이 남깁니다. 크롤러는 이미 보낸 일반 글 아래의 미발송 글을 무시하므로,
+    목록 위쪽의 글만 남아 있으면 오래된 기록을 지워도 다시 발송되지 않습니다.
+    """
+    keep_from = _sent_posts_keep_from(keep_per_board)
+    if not keep_from:
+        return {"deleted": 0, "files": [], "fingerprints_deleted": 0}
+    # 발송 시각이 같은 글(한 번에 기록된 글)은 모두 남도록 최신 글 경계보다 엄격히 오래된 것만 고릅니다.
+    # 보존 정리 도중 새로 기록된 글은 경계보다 새로우므로 대상이 아닙니다.
+    candidates = f"""
+        SELECT p.id FROM {POSTS_TABLE} p
+        JOIN unnest(%(boards)s::text[], %(keep_from)s::timestamp[]) AS k(board, keep_from)
+          ON k.board IS NOT DISTINCT FROM p.board
+        WHERE p.sent_at < LOCALTIMESTAMP - %(days)s * interval '1 day' AND p.sent_at < k.keep_from
+          AND NOT EXISTS (SELECT 1 FROM {FINGERPRINTS_TABLE} f WHERE f.link = p.link AND f.pinned)
+    """
+    params = {"boards": [board for board, _ in keep_from], "keep_from": [ts for _, ts in keep_from],
+              "days": older_than_days}
+    result = _prune_rows(POSTS_TABLE, candidates, params, archive_dir, batch_size)
+    # 발송 기록이 지워진 글의 지문(고정 공지 제외)도 함께 정리합니다.
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            DELETE FROM {FINGERPRINTS_TABLE} f
+            WHERE NOT f.pinned AND f.changed_at < now() - %s * interval '1 day'
+              AND NOT EXISTS (SELECT 1 FROM {POSTS_TABLE} p WHERE p.link = f.link)
+            """,
+            (older_than_days,),
+        )
+        result["fingerprints_deleted"] = cur.rowcount
+    return result
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="prune_deliveries")
+def prune_deliveries(older_than_days: float, archive_dir: str | None, batch_size: int = 10000) -> dict:
+    """끝난(sent/failed/blocked) 발송 기록과, 발송 기록이 모두 지워진 오래된 outbox 메시지를 보관 후 삭제합니다.
+
+    대기·전송 중인 행은 기간과 상관없이 남깁니다. 중복 대기열 등록은 발송 기록(sent_posts)이 막으므로
+    오래된 outbox 메시지를 지워도 같은 글이 다시 예약되지 않습니다.
+    """
+    params = {"days": older_than_days}
+    deliveries = _prune_rows(
+        DELIVERIES_TABLE,
+        f"""
+        SELECT id FROM {DELIVERIES_TABLE}
+        WHERE status IN ('sent', 'failed', 'blocked') AND created_at < LOCALTIMESTAMP - %(days)s * interval '1 day'
+        """,
+        params, archive_dir, batch_size,
+    )
+    messages = _prune_rows(
+        OUTBOX_TABLE,
+        f"""
+        SELECT id FROM {OUTBOX_TABLE} m
+        WHERE m.created_at < LOCALTIMESTAMP - %(days)s * interval '1 day'
+          AND NOT EXISTS (SELECT 1 FROM {DELIVERIES_TABLE} d WHERE d.message_id = m.id)
+        """,
+        params, archive_dir, batch_size,
+    )
+    return {"deliveries_deleted": deliveries["deleted"], "messages_deleted": messages["deleted"],
+            "files": deliveries["files"] + messages["files"]}
+
+
+@metrics.timed(metrics.DB_QUERY_SECONDS, query="prune_crawl_history")
+def prune_crawl_history(older_than_days: float, archive_dir: str | None, batch_size: int = 10000) -> dict:
+    """오래된 크롤 실행 기록을 보관 후 삭제합니다. 가장 최근 기록(서킷 상태)은 항상 남깁니다."""
+    return _prune_rows(
+        CRAWL_HISTORY_TABLE,
+        f"""
+        SELECT id FROM {CRAWL_HISTORY_TABLE}
+        WHERE started_at < now() - %(days)s * interval '1 day'
+          AND id < (SELECT max(id) FROM {CRAWL_HISTORY_TABLE})
+        """,
+        {"days": older_than_days}, archive_dir, batch_size,
+    )
+
+
+def history_sizes() -> dict:
+    """기록 테이블별 대략적인 행 수(통계 기준)를 반환합니다."""
+    tables = [POSTS_TABLE, FINGERPRINTS_TABLE, OUTBOX_TABLE, DELIVERIES_TABLE, CRAWL_HISTORY_TABLE]
+    with get_cursor() as cur:
+        cur.execute(
+            "SELECT relname, greatest(reltuples, 0)::bigint AS rows FROM pg_class WHERE relname = ANY(%s)",
+            (tables,),
+        )
+        return {r["relname"]: r["rows"] for r in cur.fetchall()}
@@ -0,0 +1,55 @@
+# details.py
+"""
+게시글 상세 페이지 수집과 검색 색인
+
+발송 기록(sent_posts) 중 본문이 아직 없는 글만 골라 상세(BBSView) 페이지를 가져오고,
+본문과 첨부파일 목록을 post_contents에 저장합니다. 저장된 글은 다시 요청하지 않으므로
+새 글 색인과 과거 글 백필이 같은 경로로 조금씩 진행됩니다.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import database
+from crawler import CRAWL_HOST_CONCURRENCY, _make_request_with_retry
+from parsers import parse_post_detail
+
+# 한 번의 크롤 작업에서 가져올 상세 페이지 수. 호스트 예산(요청 간 2~5초) 안에서 처리됩니다.
+DETAIL_BATCH_SIZE = int(os.environ.get("DETAIL_BATCH_SIZE", "10"))
+DETAIL_MAX_ATTEMPTS = int(os.environ.get("DETAIL_MAX_ATTEMPTS", "3"))
+
+
+def _fetch(post: dict) -> dict:
+    try:
+        response = _make_request_with_retry(post["link"], max_retries=2)
+        detail = parse_post_detail(response.text)
+        for attachment in detail["attachments"]:
+            attachment["href"] = urljoin(post["link"], attachment["href"])
+        return dict(post, **detail)
+    except Exception as e:
+        print(f"상세 페이지 수집 실패({post['link']}): {e}")
+        return dict(post, error=str(e))
+
+
+def index_pending(limit: int = DETAIL_BATCH_SIZE) -> dict:
+    """본문이 없는 글을 최근 것부터 limit개까지 수집해 색인합니다."""
+    started = time.monotonic()
+    pending = database.posts_missing_content(limit, DETAIL_MAX_ATTEMPTS)
+    if not pending:
+        return {"fetched": 0, "failed": 0, "elapsed_sec": 0.0}
+    with ThreadPoolExecutor(max_workers=max(1, CRAWL_HOST_CONCURRENCY), thread_name_prefix="detail") as pool:
+        results = list(pool.map(_fetch, pending))
+    fetched = [r for r in results if "error" not in r]
+    failed = [r for r in results if "error" in r]
+    database.save_post_contents(fetched, failed)
+    print(f"상세 본문 색인: {len(fetched)}개 저장, {len(failed)}개 실패")
+    return {"fetched": len(fetched), "failed": len(failed), "elapsed_sec": round(time.monotonic() - started, 3)}
+
+
+def search(query: str, limit: int = 10) -> list[dict]:
+    """색인된 공지를 검색합니다. 빈 검색어는 빈 목록을 반환합니다."""
+    query = " ".join(query.split())
+    if not query:
+        return []
+    return database.search_posts(query, limit)
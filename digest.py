@@ -0,0 +1,74 @@
+# digest.py
+"""
+다이제스트(묶음) 발송
+
+공지가 한꺼번에 여러 개 올라온 날에는 글마다 한 통씩 보내는 대신, 한 번의 크롤에서 나온 새 글을
+텔레그램 메시지 길이 한도(4096자) 안에서 가능한 적은 수의 메시지로 묶어 보냅니다.
+묶음 텍스트는 글 묶음마다 한 번만 렌더링되어 같은 글을 받는 수신자끼리 공유되므로,
+발송 건수는 글 수 × 수신자 수에서 대략 수신자 수로 줄어듭니다.
+
+사용자는 /digest, /instant 명령으로 방식을 고르고, 고르지 않은 사용자는 DELIVERY_MODE_DEFAULT를 따릅니다.
+새 글이 하나뿐이면 두 방식의 메시지가 같으므로 항상 글별 메시지를 씁니다.
+"""
+import os
+
+import database
+
+DELIVERY_MODES = ("instant", "digest")
+# 방식을 고르지 않은 사용자의 기본값. 기존 사용자가 모르는 사이 묶음 발송으로 바뀌지 않도록 instant입니다.
+DELIVERY_MODE_DEFAULT = os.environ.get("DELIVERY_MODE_DEFAULT", "instant")
+if DELIVERY_MODE_DEFAULT not in DELIVERY_MODES:
+    print(f"⚠️ DELIVERY_MODE_DEFAULT 값 오류({DELIVERY_MODE_DEFAULT}) - instant로 발송합니다.")
+    DELIVERY_MODE_DEFAULT = "instant"
+TELEGRAM_MESSAGE_LIMIT = 4096
+# 메시지 머리말("📢 새 공지 12개 (1/3)")에 남겨 둘 길이
+_HEADER_RESERVE = 40
+
+
+def telegram_length(text: str) -> int:
+    """텔레그램이 세는 길이(UTF-16 코드 단위)를 반환합니다. 이모지는 2로 셉니다."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _block(post: dict) -> str:
+    mark = "(수정) " if post.get("change") == "updated" else ""
+    return f"[{post.get('board', '학사공지')}] {mark}{post['title']}\n🔗 {post['link']}"
+
+
+def _truncate(text: str, limit: int) -> str:
+    while telegram_length(text) > limit:
+        text = text[:-(telegram_length(text) - limit) or -1]
+    return text
+
+
+def render_digest(posts: list[dict]) -> list[str]:
+    """게시글들을 순서대로 TELEGRAM_MESSAGE_LIMIT 안에 들어가는 최소 개수의 메시지로 묶습니다."""
+    budget = TELEGRAM_MESSAGE_LIMIT - _HEADER_RESERVE
+    chunks, current = [], []
+    used = 0
+    for post in posts:
+        block = _truncate(_block(post), budget)
+        size = telegram_length(block) + (2 if current else 0)
+        if current and used + size > budget:
+            chunks.append(current)
+            current, used = [], 0
+            size = telegram_length(block)
+        current.append(block)
+        used += size
+    if current:
+        chunks.append(current)
+    updated = sum(1 for post in posts if post.get("change") == "updated")
+    counts = [f"새 공지 {len(posts) - updated}개"] if updated < len(posts) else []
+    if updated:
+        counts.append(f"수정된 공지 {updated}개")
+    header = "📢 " + ", ".join(counts)
+    if len(chunks) == 1:
+        return [f"{header}\n\n" + "\n\n".join(chunks[0])]
+    return [f"{header} ({i}/{len(chunks)})\n\n" + "\n\n".join(blocks) for i, blocks in enumerate(chunks, 1)]
+
+
+def set_mode(user_id, mode: str) -> bool:
+    """발송 방식을 바꿉니다. 구독 중이 아니면 False를 반환합니다."""
+    if mode not in DELIVERY_MODES:
+        raise ValueError(f"알 수 없는 발송 방식: {mode}")
+    return database.set_delivery_mode(str(user_id), mode)
@@ -0,0 +1,147 @@
+# jobs.py
+"""
+Postgres 기반 작업 큐와 백그라운드 워커
+
+요청 스레드는 enqueue()로 작업만 등록하고 바로 응답합니다. 각 gunicorn 워커 프로세스는
+워커 스레드 하나를 띄워 `FOR UPDATE SKIP LOCKED`로 작업을 가져가므로, 여러 프로세스가
+떠 있어도 한 작업은 한 번만 실행됩니다.
+
+실행 중에는 작업 종류별 advisory lock(`job:<kind>`)을 풀과 별개인 전용 연결에 쥐고, 진행을 보고할
+때마다 그 연결이 살아 있는지 확인해 잠금을 잃었으면 중단합니다. heartbeat가 끊겨 다시 대기열로
+돌아간 작업을 다른 노드가 가져가더라도, 원래 실행이 아직 살아 있으면 잠금을 얻지 못해 건너뜁니다.
+작업이 없을 때는 register_idle()로 등록한 처리(남은 발송 대기열 나눠 보내기 등)를 실행합니다.
+"""
+import os
+import threading
+import traceback
+
+import database
+
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "5"))
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", "30"))
+JOB_STALE_AFTER = float(os.environ.get("JOB_STALE_AFTER", "600"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+
+_handlers = {}
+_idle_handlers = []
+_wakeup = threading.Event()
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def register(kind: str, handler) -> None:
+    """작업 종류별 처리 함수를 등록합니다. handler(report)는 결과 dict를 반환해야 합니다."""
+    _handlers[kind] = handler
+
+
+def register_idle(handler) -> None:
+    """가져올 작업이 없을 때 실행할 처리를 등록합니다. handler()는 처리한 일이 있으면 참을 반환합니다."""
+    _idle_handlers.append(handler)
+
+
+def enqueue(kind: str) -> tuple[dict, bool]:
+    """작업을 등록하고 워커를 깨웁니다. 이미 대기/실행 중이면 기존 작업을 반환합니다."""
+    job, created = database.enqueue_job(kind)
+    _wakeup.set()
+    return job, created
+
+
+def _heartbeat_loop(job_id: int, stop: threading.Event) -> None:
+    while not stop.wait(JOB_HEARTBEAT_INTERVAL):
+        try:
+            database.update_job_progress(job_id)
+        except Exception as e:
+            print(f"작업 {job_id} heartbeat 갱신 실패: {e}")
+
+
+def run_job(job: dict) -> None:
+    """가져온 작업 하나를 실행하고 결과를 기록합니다."""
+    job_id = job["id"]
+    handler = _handlers.get(job["kind"])
+    if handler is None:
+        database.finish_job(job_id, "failed", error=f"등록되지 않은 작업 종류: {job['kind']}")
+        return
+
+    lock = None
+
+    def report(**progress):
+        # 진행 보고는 다음 부수 효과(발송 예약, 전송) 직전에 오므로, 여기서 잠금이 살아 있는지 확인합니다.
+        # 연결이 끊겨 잠금이 풀렸으면 다른 노드가 같은 작업을 시작할 수 있으므로 LockLost로 중단합니다.
+        if lock is not None:
+            lock.ensure()
+        try:
+            database.update_job_progress(job_id, progress)
+        except Exception as e:
+            print(f"작업 {job_id} 진행 상황 기록 실패: {e}")
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(job_id, stop), daemon=True,
+                                 name=f"job-{job_id}-heartbeat")
+    heartbeat.start()
+    try:
+        with database.advisory_lock(f"job:{job['kind']}") as lock:
+            if not lock:
+                print(f"작업 {job_id}({job['kind']}) 건너뜀: 다른 노드에서 실행 중")
+                database.finish_job(job_id, "succeeded",
+                                    result={"status": "skipped", "message": "다른 노드에서 같은 작업이 실행 중입니다."})
+                return
+            print(f"작업 {job_id}({job['kind']}) 실행 시작")
+            result = handler(report)
+            status = "failed" if result.get("status") == "error" else "succeeded"
+            database.finish_job(job_id, status, result=result,
+                                error=result.get("message") if status == "failed" else None)
+            print(f"작업 {job_id} 완료: {status}")
+    except Exception as e:
+        traceback.print_exc()
+        database.finish_job(job_id, "failed", error=str(e))
+        print(f"작업 {job_id} 실패: {e}")
+    finally:
+        stop.set()
+
+
+def _run_idle() -> bool:
+    busy = False
+    for handler in _idle_handlers:
+        try:
+            busy = bool(handler()) or busy
+        except Exception as e:
+            print(f"유휴 작업 실패: {e}")
+    return busy
+
+
+def _worker_loop() -> None:
+    while True:
+        try:
+            database.requeue_stale_jobs(JOB_STALE_AFTER, JOB_MAX_ATTEMPTS)
+            job = database.claim_job()
+        except Exception as e:
+            print(f"작업 큐 조회 실패: {e}")
+            job = None
+        if job is None:
+            if _run_idle():
+                continue
+            _wakeup.wait(JOB_POLL_INTERVAL)
+            _wakeup.clear()
+            continue
+        run_job(job)
+
+
+def start_worker() -> None:
+    """현재 프로세스의 작업 워커 스레드를 시작합니다(이미 실행 중이면 무시)."""
+    global _worker, _worker_pid
+    with _worker_lock:
+        if _worker is not None and _worker.is_alive() and _worker_pid == os.getpid():
+            return
+        _worker = threading.Thread(target=_worker_loop, daemon=True, name="job-worker")
+        _worker.start()
+        _worker_pid = os.getpid()
+
+
+def job_to_dict(job: dict) -> dict:
+    """API 응답용으로 작업 정보를 직렬화합니다."""
+    data = dict(job)
+    for key in ("created_at", "started_at", "heartbeat_at", "finished_at", "circuit_open_until"):
+        if data.get(key) is not None:
+            data[key] = data[key].isoformat()
+    return data
@@ -1,9 +1,31 @@
 # main.py
-from flask import Flask, request, jsonify
-from crawler import get_latest_post, get_new_posts_since_last_check
-from telegram_utils import send_message as tg_send_message
+import time
+
+# 부팅 시간 측정 기준(/proc을 읽을 수 없을 때). 무거운 import보다 먼저 기록합니다.
+_IMPORT_STARTED = time.time()
+
+from flask import Flask, Response, request, jsonify, stream_with_context
+from telegram_utils import latency_stats as tg_latency_stats
+from pipeline import run_crawl_and_notify
+import cluster
 import database
+import details
+import jobs
+import metrics
+import outbox
+import polling
+import retention
+import scheduler
+import status as crawl_status
+import subscribers
+import webhook
+import json
 import os
+import threading
+
+CRAWL_JOB_KIND = "crawl_and_notify"
+ADMIN_PAGE_SIZE = 100
+ADMIN_PAGE_MAX = 1000
 
 app = Flask(__name__)
 
@@ -13,154 +35,213 @@ def root():
 
 @app.route('/healthz', methods=['GET'])
 def healthz():
+    if "first_healthy" not in startup.phases:
+        elapsed = startup.mark("first_healthy")
+        if elapsed is not None:
+            print(f"🚀 첫 헬스체크 응답: 프로세스 시작 후 {elapsed:.2f}초")
     return "ok", 200
 
-database.init_db()
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus 지표를 노출합니다."""
+    try:
+        metrics.SUBSCRIBERS.set(database.count_subscribers())
+    except Exception as e:
+        print(f"구독자 수 지표 갱신 실패: {e}")
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
 
-@app.route('/crawl-and-notify', methods=['POST'])
-def crawl_and_notify():
-    """
-    웹사이트를 크롤링하여 새로운 게시글이 있으면 텔레그램으로 알림을 보냅니다.
-    """
-    print("크롤링 및 알림 작업을 시작합니다...")
-    
+# DB 스키마는 배포 단계(python migrate.py)에서 올리고, 워커는 첫 DB 사용 시 버전만 확인합니다.
+jobs.register(CRAWL_JOB_KIND, run_crawl_and_notify)
+jobs.register(retention.RETENTION_JOB_KIND, retention.run)
+jobs.register_idle(outbox.drain_idle)
+jobs.register_idle(retention.maybe_enqueue)
+startup = metrics.StartupTimer(_IMPORT_STARTED)
+
+# 백그라운드 스레드(작업 큐, 스케줄러, 클러스터, 폴링)는 import 때가 아니라 프로세스의 첫 요청에서 시작합니다.
+# 이 스레드들은 곧바로 Postgres에 접속하므로, import만으로는 DB에 연결하지 않게 합니다.
+_background_pid = None
+_background_lock = threading.Lock()
+
+def _start_background():
+    global _background_pid
+    if _background_pid == os.getpid():
+        return
+    with _background_lock:
+        if _background_pid == os.getpid():
+            return
+        jobs.start_worker()
+        scheduler.start(CRAWL_JOB_KIND)
+        cluster.start()
+        if polling.TELEGRAM_INGEST == "polling":
+            polling.start()
+        _background_pid = os.getpid()
+
+@app.before_request
+def _ensure_background():
+    _start_background()
+
+startup.mark("imported")
+
+def _check_scheduler_token():
     # 스케줄러 보안: 환경변수 SCHEDULER_TOKEN이 설정된 경우 헤더 검증
     expected_token = os.environ.get('SCHEDULER_TOKEN')
     if expected_token:
         incoming = request.headers.get('X-CRON-TOKEN')
         if incoming != expected_token:
             return jsonify({"status": "error", "message": "unauthorized"}), 401
+    return None
+
+@app.route('/crawl-and-notify', methods=['POST'])
+def crawl_and_notify():
+    """
+    크롤링 및 알림 작업을 작업 큐에 등록하고 즉시 응답합니다(202).
+    이미 대기/실행 중인 작업이 있으면 그 작업으로 합쳐집니다.
+    """
+    denied = _check_scheduler_token()
+    if denied:
+        return denied
     
     try:
-        try:
-            new_posts = get_new_posts_since_last_check()
-        except Exception as crawl_error:
-            error_msg = str(crawl_error)
-            print(f"크롤링 중 오류 발생: {error_msg}")
-            
-            if "429" in error_msg or "Too Many Requests" in error_msg:
-                return jsonify({
-                    "status": "error",
-                    "message": "HTTP 429: 웹사이트에서 요청이 너무 많다고 응답했습니다. 잠시 후 다시 시도해주세요.",
-                    "error_type": "rate_limit"
-                }), 429
-            
-            raise
-        
-        if not new_posts:
-            print("새로운 공지가 없습니다.")
-            return jsonify({"status": "success", "message": "새 공지 없음"}), 200
-        
-        print(f"새로운 공지 {len(new_posts)}개 발견")
-        
-        target_chat_ids_env = os.environ.get('TARGET_CHAT_IDS', '').strip()
-        if target_chat_ids_env:
-            recipients = [cid.strip() for cid in target_chat_ids_env.split(',') if cid.strip()]
-        else:
-            recipients = database.list_subscribers()
-        
-        total_sent = 0
-        
-        for post in new_posts:
-            title = post['title']
-            link = post['link']
-            text = f"[새 학사공지]\n{title}\n\n🔗 {link}"
-            
-            print(f"공지 발송 중: {title}")
-            
-            success_count = 0
-            for chat_id in recipients:
-                if tg_send_message(chat_id, text, disable_web_page_preview=False):
-                    success_count += 1
-            
-            print(f"텔레그램 전송 완료: {success_count}/{len(recipients)}")
-            total_sent += success_count
-            
-            # DB에 발송 완료 기록(중복 방지)
-            database.add_sent_post(link, title)
-        
+        job, created = jobs.enqueue(CRAWL_JOB_KIND)
+        print(f"크롤링 작업 {'등록' if created else '병합'}: job_id={job['id']}")
         return jsonify({
-            "status": "success",
-            "message": f"새 공지 {len(new_posts)}개 발송 완료",
-            "posts_count": len(new_posts),
-            "total_sent": total_sent,
-            "recipients_count": len(recipients)
-        }), 200
+            "status": "accepted",
+            "message": "크롤링 작업을 등록했습니다." if created else "이미 진행 중인 크롤링 작업에 합쳐졌습니다.",
+            "job_id": job["id"],
+            "job_status": job["status"],
+            "coalesced": not created,
+            "status_url": f"/jobs/{job['id']}"
+        }), 202
     except Exception as e:
-        print(f"크롤링 및 알림 작업 중 오류 발생: {e}")
+        print(f"크롤링 작업 등록 중 오류 발생: {e}")
         return jsonify({"status": "error", "message": f"작업 오류: {str(e)}"}), 500
 
+@app.route('/jobs/<int:job_id>', methods=['GET'])
+def job_status(job_id):
+    """작업 진행 상황과 결과를 반환합니다."""
+    denied = _check_scheduler_token()
+    if denied:
+        return denied
+    
+    try:
+        job = database.get_job(job_id)
+        if job is None:
+            return jsonify({"status": "error", "message": "작업을 찾을 수 없습니다."}), 404
+        return jsonify({"status": "success", "job": jobs.job_to_dict(job)}), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"작업 조회 중 오류: {str(e)}"}), 500
+
 @app.route('/telegram/webhook', methods=['POST'])
 def telegram_webhook():
+    """업데이트를 접수만 하고 즉시 응답합니다. 명령 처리는 webhook.py를 참고하세요."""
+    secret = os.environ.get('TELEGRAM_WEBHOOK_SECRET')
+    if secret and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != secret:
+        return jsonify({"ok": False}), 401
     try:
         update = request.get_json(force=True, silent=True) or {}
-        message = update.get('message') or update.get('edited_message') or {}
-        chat = message.get('chat') or {}
-        chat_id = chat.get('id')
-        text = (message.get('text') or '').strip()
-        print(f"Telegram webhook: chat_id={chat_id}, text='{text}'")
-        if not chat_id or not text:
-            return jsonify({"ok": True})
-
-        # 간단 응답만 유지(필요 없으면 웹훅 비활성화 가능)
-        if text in ('/start', '/help'):
-            help_text = (
-                "이 봇은 매일 12시 30분에 새로운 학사공지를 전송합니다.\n"
-                "필요 시 /subscribe 로 구독, /unsubscribe 로 해제할 수 있습니다."
-            )
-            tg_send_message(chat_id, help_text)
-        elif text == '/subscribe':
-            database.add_subscriber(str(chat_id))
-            tg_send_message(chat_id, '알림 구독이 완료되었습니다.')
-        elif text == '/unsubscribe':
-            database.remove_subscriber(str(chat_id))
-            tg_send_message(chat_id, '알림 구독이 해제되었습니다.')
-        else:
-            tg_send_message(chat_id, "이 봇은 스케줄 알림용입니다. /help 를 참고하세요.")
-
-        return jsonify({"ok": True})
+        body, status_code = webhook.accept(update)
+        return jsonify(body), status_code
     except Exception as e:
         print(f"텔레그램 웹훅 처리 오류: {e}")
         return jsonify({"ok": False}), 200
 
+@app.route('/search', methods=['GET'])
+def search():
+    """색인된 공지를 제목·본문으로 검색합니다(?q=검색어&limit=10)."""
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({"status": "error", "message": "검색어(q)가 필요합니다."}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    try:
+        results = details.search(query, limit)
+        for post in results:
+            post["sent_at"] = post["sent_at"].isoformat() if post["sent_at"] else None
+        return jsonify({"status": "success", "query": query, "count": len(results), "results": results}), 200
+    except Exception as e:
+        print(f"검색 중 오류 발생: {e}")
+        return jsonify({"status": "error", "message": f"검색 중 오류: {str(e)}"}), 500
+
 @app.route('/status', methods=['GET'])
 def status():
+    """
+    마지막 크롤 결과 스냅샷을 반환합니다(학교 사이트에 요청하지 않음).
+    refresh=1이면 사이트 첫 페이지를 직접 확인한 결과(live)를 함께 반환합니다(SCHEDULER_TOKEN 필요).
+    """
     try:
-        print("상태 확인 요청을 받았습니다...")
-        latest_post = get_latest_post()
-        if latest_post is None:
-            return jsonify({"status": "error", "message": "크롤링에 실패했습니다.", "crawler_status": "failed"}), 500
-        is_sent = database.is_post_sent(latest_post["link"])
+        body = crawl_status.snapshot()
+        if request.args.get('refresh') == '1':
+            denied = _check_scheduler_token()
+            if denied:
+                return denied
+            body["live"] = crawl_status.refresh()
+        failed = body["crawler_status"] == "failed"
         return jsonify({
-            "status": "success",
-            "crawler_status": "working",
-            "latest_post": {
-                "title": latest_post["title"],
-                "link": latest_post["link"],
-                "is_sent": is_sent
-            },
-            "message": "크롤러가 정상적으로 작동하고 있습니다."
-        }), 200
+            "status": "error" if failed else "success",
+            **body,
+            "message": "마지막 크롤링이 실패했습니다." if failed else "마지막 크롤링 결과입니다."
+        }), 500 if failed else 200
     except Exception as e:
         print(f"상태 확인 중 오류 발생: {e}")
         return jsonify({"status": "error", "message": f"상태 확인 중 오류가 발생했습니다: {str(e)}", "crawler_status": "error"}), 500
 
-@app.route('/admin/db', methods=['GET', 'POST'])
-def admin_db():
-    """데이터베이스 관리 (GET: 조회, POST: 수정)"""
+def _check_admin_token():
     admin_token = os.environ.get('ADMIN_TOKEN')
     if admin_token:
         incoming_token = request.headers.get('X-ADMIN-TOKEN')
         if incoming_token != admin_token:
             return jsonify({"status": "error", "message": "unauthorized"}), 401
+    return None
+
+def _subscriber_to_dict(row):
+    return {"id": row["id"], "user_id": row["user_id"],
+            "subscribed_at": row["subscribed_at"].isoformat() if row["subscribed_at"] else None}
+
+@app.route('/admin/subscribers', methods=['GET'])
+def admin_subscribers():
+    """전체 구독자를 NDJSON(한 줄에 한 명)으로 스트리밍합니다. 메모리에는 한 페이지만 올라갑니다."""
+    denied = _check_admin_token()
+    if denied:
+        return denied
+
+    def generate():
+        for page in database.iter_subscriber_pages(ADMIN_PAGE_MAX):
+            yield "".join(json.dumps(_subscriber_to_dict(row), ensure_ascii=False) + "\n" for row in page)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route('/admin/db', methods=['GET', 'POST'])
+def admin_db():
+    """데이터베이스 관리 (GET: 조회, POST: 수정)
+
+    GET은 구독자를 ?after=<id>&limit=<n> 키셋 페이지로 반환하며, 다음 페이지는
+    응답의 next_after를 after로 넘겨 조회합니다.
+    """
+    denied = _check_admin_token()
+    if denied:
+        return denied
     
     try:
         if request.method == 'GET':
-            subscribers = database.list_subscribers()
+            after_id = request.args.get('after', 0, type=int)
+            limit = min(max(request.args.get('limit', ADMIN_PAGE_SIZE, type=int), 1), ADMIN_PAGE_MAX)
+            page = database.list_subscribers_page(after_id, limit)
+            counts = database.subscriber_counts()
             return jsonify({
                 "status": "success",
-                "subscribers": subscribers,
-                "subscribers_count": len(subscribers)
+                "subscribers": [_subscriber_to_dict(row) for row in page],
+                "next_after": page[-1]["id"] if len(page) == limit else None,
+                "subscribers_count": counts["total"],
+                "subscriber_counts": counts,
+                "subscriber_cache": subscribers.cache_stats(),
+                "pool": database.pool_stats(),
+                "startup": startup.phases,
+                "scheduler": scheduler.status(),
+                "telegram_ingest": polling.status(),
+                "cluster": dict(cluster.status(), leases=[jobs.job_to_dict(lease) for lease in database.list_leases()]),
+                "crawl_history": [jobs.job_to_dict(run) for run in database.recent_crawl_history()],
+                "history_rows": database.history_sizes(),
+                "telegram_latency": tg_latency_stats()
             }), 200
             
         elif request.method == 'POST':
@@ -170,34 +251,28 @@ def admin_db():
             if action == 'add_subscriber':
                 chat_id = data.get('chat_id')
                 if chat_id:
-                    database.add_subscriber(str(chat_id))
+                    subscribers.subscribe(chat_id)
                     return jsonify({"status": "success", "message": f"구독자 {chat_id} 추가됨"}), 200
                     
             elif action == 'remove_subscriber':
                 chat_id = data.get('chat_id')
                 if chat_id:
-                    database.remove_subscriber(str(chat_id))
+                    subscribers.unsubscribe(chat_id)
                     return jsonify({"status": "success", "message": f"구독자 {chat_id} 제거됨"}), 200
                     
             elif action == 'clear_subscribers':
-                import psycopg2
-                conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM subscribers")
-                conn.commit()
-                cursor.close()
-                conn.close()
+                subscribers.clear()
                 return jsonify({"status": "success", "message": "모든 구독자 제거됨"}), 200
                 
             elif action == 'clear_sent_posts':
-                import psycopg2
-                conn = psycopg2.connect(os.environ.get('DATABASE_URL'))
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM sent_posts")
-                conn.commit()
-                cursor.close()
-                conn.close()
-                return jsonify({"status": "success", "message": "발송된 게시글 기록 제거됨"}), 200
+                # 전체 삭제는 중복 발송 기준까지 지우므로, 게시판별 최신 글과 고정 공지를 남기고 보관 후 삭제합니다.
+                result = retention.prune_sent_posts(float(data.get('older_than_days', 0)))
+                return jsonify({"status": "success", "message": f"발송된 게시글 기록 {result['deleted']}개 보관 후 제거됨",
+                                "archive_files": result['files']}), 200
+
+            elif action == 'prune_history':
+                job, created = jobs.enqueue(retention.RETENTION_JOB_KIND)
+                return jsonify({"status": "success", "job_id": job["id"], "created": created}), 202
                 
             else:
                 return jsonify({"status": "error", "message": "알 수 없는 액션"}), 400
@@ -0,0 +1,119 @@
+# metrics.py
+"""
+Prometheus 지표 정의와 타이밍 데코레이터
+
+gunicorn 워커가 여러 개이면 PROMETHEUS_MULTIPROC_DIR(비어 있는 디렉터리)을 지정해
+프로세스별 지표를 합산해서 노출합니다. 지정하지 않으면 응답한 워커의 지표만 보입니다.
+"""
+import functools
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# 네트워크/DB 호출 지연에 맞춘 버킷(초)
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_PARSE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+_BROADCAST_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+CRAWL_FETCH_SECONDS = Histogram(
+    "hoseo_crawl_fetch_seconds", "학교 게시판 HTTP 요청 시간", ["status"], buckets=_LATENCY_BUCKETS)
+CRAWL_RETRIES = Counter(
+    "hoseo_crawl_retries_total", "학교 게시판 요청 재시도 횟수", ["reason"])
+PARSE_SECONDS = Histogram(
+    "hoseo_parse_seconds", "게시판 목록 파싱 시간", ["backend"], buckets=_PARSE_BUCKETS)
+DB_QUERY_SECONDS = Histogram(
+    "hoseo_db_query_seconds", "DB 함수 실행 시간(연결 대기 포함)", ["query"], buckets=_LATENCY_BUCKETS)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "hoseo_db_pool_wait_seconds", "연결 풀에서 연결을 얻기까지 걸린 시간", buckets=_LATENCY_BUCKETS)
+TELEGRAM_REQUEST_SECONDS = Histogram(
+    "hoseo_telegram_request_seconds", "텔레그램 Bot API 호출 시간", ["method"], buckets=_LATENCY_BUCKETS)
+TELEGRAM_FAILURES = Counter(
+    "hoseo_telegram_failures_total", "텔레그램 전송 실패 수", ["reason"])
+RATE_LIMITED = Counter(
+    "hoseo_rate_limited_total", "HTTP 429 응답 수", ["target"])
+BROADCAST_SECONDS = Histogram(
+    "hoseo_broadcast_seconds", "전송 배치 하나를 보내는 데 걸린 시간", buckets=_BROADCAST_BUCKETS)
+BROADCAST_MESSAGES = Counter(
+    "hoseo_broadcast_messages_total", "전송 시도한 메시지 수", ["outcome"])
+DIGEST_SAVED_CALLS = Counter(
+    "hoseo_digest_saved_calls_total", "다이제스트로 묶어 줄어든 발송(sendMessage) 건수")
+WEBHOOK_UPDATES = Counter(
+    "hoseo_webhook_updates_total", "웹훅 업데이트 처리 결과", ["result"])
+POLLED_UPDATES = Counter(
+    "hoseo_polled_updates_total", "getUpdates 롱 폴링으로 받은 업데이트 처리 결과", ["result"])
+SUBSCRIBER_CACHE = Counter(
+    "hoseo_subscriber_cache_total", "구독자 캐시 조회 결과", ["result"])
+CRAWL_INTERVAL_SECONDS = Gauge(
+    "hoseo_crawl_interval_seconds", "적응형 스케줄러가 정한 크롤 간격", multiprocess_mode="max")
+SUBSCRIBERS = Gauge(
+    "hoseo_subscribers", "현재 구독자 수", multiprocess_mode="max")
+LAST_SUCCESSFUL_CRAWL = Gauge(
+    "hoseo_last_successful_crawl_timestamp_seconds", "마지막으로 성공한 크롤링 시각(Unix 초)",
+    multiprocess_mode="max")
+STARTUP_SECONDS = Gauge(
+    "hoseo_startup_seconds", "프로세스(워커) 시작부터 단계별 경과 시간", ["phase"], multiprocess_mode="max")
+
+
+def process_started_at() -> float | None:
+    """현재 프로세스가 시작(fork)된 Unix 시각을 /proc에서 읽습니다. 리눅스가 아니면 None."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, StopIteration):
+        return None
+
+
+class StartupTimer:
+    """프로세스 시작부터 단계(phase)별 도달 시간을 한 번씩 기록합니다."""
+
+    def __init__(self, fallback_started_at: float):
+        self.started_at = process_started_at() or fallback_started_at
+        self.phases = {}
+
+    def mark(self, phase: str) -> float | None:
+        """처음 도달한 단계면 경과 초를 기록해 반환하고, 이미 기록된 단계면 None을 반환합니다."""
+        if phase in self.phases:
+            return None
+        elapsed = round(time.time() - self.started_at, 3)
+        self.phases[phase] = elapsed
+        STARTUP_SECONDS.labels(phase=phase).set(elapsed)
+        return elapsed
+
+
+def timed(histogram, **labels):
+    """함수 실행 시간을 histogram에 기록하는 데코레이터입니다. 예외가 나도 기록합니다."""
+    child = histogram.labels(**labels) if labels else histogram
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def render() -> tuple[bytes, str]:
+    """/metrics 응답 본문과 Content-Type을 반환합니다."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
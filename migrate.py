@@ -0,0 +1,35 @@
+# migrate.py
+"""
+DB 스키마 마이그레이션(배포 시 한 번 실행)
+
+    python migrate.py            # 적용되지 않은 마이그레이션 적용
+    python migrate.py --status   # 현재 버전만 확인
+
+Render에서는 render.yaml의 preDeployCommand로 실행됩니다. 이 단계가 실패하거나 생략되어도
+워커가 첫 DB 사용 시 버전을 확인해 같은 마이그레이션을 한 번만 적용합니다(DB_AUTO_MIGRATE).
+"""
+import sys
+import time
+
+import database
+
+
+def main() -> int:
+    try:
+        if "--status" in sys.argv[1:]:
+            print(f"DB 스키마 버전: {database.schema_version()} (코드: {database.SCHEMA_VERSION})")
+            return 0
+        started = time.monotonic()
+        applied = database.migrate()
+    except Exception as e:
+        print(f"❌ 스키마 마이그레이션 실패: {e}")
+        return 1
+    if applied:
+        print(f"✅ 마이그레이션 {applied} 적용 완료 ({time.monotonic() - started:.2f}초)")
+    else:
+        print(f"ℹ️ 이미 최신 스키마입니다(버전 {database.SCHEMA_VERSION}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# outbox.py
+"""
+수신자별 발송 대기열(outbox) 처리
+
+새 게시글은 database.enqueue_post_deliveries()로 발송 기록과 대기열이 한 트랜잭션에
+함께 저장됩니다. 수신자별로 어떤 메시지(글별/다이제스트)를 받을지는 plan_deliveries()가 정합니다. drain()은 대기열을 배치 단위로 가져와 전송하고, 배치마다 결과를
+기록(체크포인트)하므로 워커가 중간에 죽어도 다음 실행에서 남은 건부터 이어서 보냅니다.
+중복 전송 가능 범위는 결과를 기록하지 못한 마지막 한 배치로 한정됩니다.
+"""
+import hashlib
+import os
+import time
+
+import database
+from broadcast import get_broadcaster
+
+DELIVERY_BATCH_SIZE = int(os.environ.get("DELIVERY_BATCH_SIZE", "50"))
+DELIVERY_LEASE_SEC = float(os.environ.get("DELIVERY_LEASE_SEC", "300"))
+DELIVERY_MAX_ATTEMPTS = int(os.environ.get("DELIVERY_MAX_ATTEMPTS", "5"))
+DELIVERY_RETRY_BASE = float(os.environ.get("DELIVERY_RETRY_BASE", "30"))
+DELIVERY_RETRY_MAX = float(os.environ.get("DELIVERY_RETRY_MAX", "3600"))
+# 작업이 없는 워커가 남은 대기열을 나눠 보낼지, 한 번에 가져갈 최대 배치 수
+OUTBOX_IDLE_DRAIN = os.environ.get("OUTBOX_IDLE_DRAIN", "1") != "0"
+OUTBOX_IDLE_BATCHES = int(os.environ.get("OUTBOX_IDLE_BATCHES", "20"))
+
+
+def _noop_report(**progress):
+    pass
+
+
+def retry_delay(attempts: int, retry_after=None) -> float:
+    """지수 백오프 지연(초)을 계산합니다. 텔레그램이 retry_after를 주면 그 이상 기다립니다."""
+    delay = min(DELIVERY_RETRY_MAX, DELIVERY_RETRY_BASE * (2 ** max(0, attempts - 1)))
+    if retry_after:
+        delay = max(delay, float(retry_after))
+    return delay
+
+
+def classify(rows: list[dict], results: dict) -> tuple[list, list, list, list]:
+    """전송 결과를 성공/재시도/실패/차단으로 나눕니다."""
+    sent, retries, failures, blocked = [], [], [], []
+    for row in rows:
+        result = results.get(row["id"]) or {"ok": False, "error": "결과 없음"}
+        if result["ok"]:
+            sent.append(row["id"])
+            continue
+        error = str(result.get("error") or result.get("status") or "알 수 없는 오류")[:500]
+        if result.get("permanent"):
+            if result.get("status") == 403:
+                blocked.append((row["id"], row["chat_id"], error))
+            else:
+                failures.append((row["id"], error))
+        elif row["attempts"] >= DELIVERY_MAX_ATTEMPTS:
+            failures.append((row["id"], error))
+        else:
+            retries.append((row["id"], retry_delay(row["attempts"], result.get("retry_after")), error))
+    return sent, retries, failures, blocked
+
+
+def plan_deliveries(posts: list[dict], subscribers: list[dict] | None, recipients: list[str] | None = None,
+                    watch_matches: dict | None = None, render_digest=None, default_mode: str = "instant") -> dict:
+    """새 글(각각 message_key, text 포함)을 누구에게 어떤 메시지로 보낼지 정합니다.
+
+    recipients가 있으면 그 채팅 전체에, 없으면 subscribers(가입 순) 중 키워드를 등록하지 않은
+    구독자에게는 모든 글을, 등록한 구독자에게는 watch_matches({link: [chat_id]})로 일치한 글만
+    보냅니다. render_digest(posts) -> [text, ...]가 있고 받을 글이 2개 이상이면 다이제스트 모드
+    수신자(delivery_mode, 없으면 default_mode)는 묶음 메시지를 받으며, 같은 글 묶음의 메시지는
+    한 번만 렌더링해 수신자끼리 공유합니다.
+
+    반환값: {"messages": [(message_key, text, disable_web_page_preview)], "pairs": [(message_key, chat_id)],
+    "saved_calls": 다이제스트로 줄어든 발송 건수}
+    """
+    messages = {p["message_key"]: (p["message_key"], p["text"], bool(p.get("disable_web_page_preview", False)))
+                for p in posts}
+    digests = {}
+
+    def digest_keys(chat_posts):
+        links = tuple(sorted(p["message_key"] for p in chat_posts))
+        if links not in digests:
+            digest_key = "digest:" + hashlib.sha1("\n".join(links).encode()).hexdigest()[:16]
+            texts = render_digest(chat_posts)
+            keys = [f"{digest_key}:{i}" for i in range(1, len(texts) + 1)]
+            messages.update((key, (key, text, True)) for key, text in zip(keys, texts))
+            digests[links] = keys
+        return digests[links]
+
+    def keys_for(chat_posts, mode):
+        if render_digest is not None and len(chat_posts) > 1 and mode == "digest":
+            return digest_keys(chat_posts)
+        return [p["message_key"] for p in chat_posts]
+
+    pairs, saved = [], 0
+    if recipients is not None:
+        chats = list(dict.fromkeys(str(r) for r in recipients))
+        keys = keys_for(posts, default_mode)
+        pairs = [(key, chat_id) for key in keys for chat_id in chats]
+        saved = len(chats) * (len(posts) - len(keys))
+    else:
+        matched = {}
+        for post in posts:
+            for chat_id in (watch_matches or {}).get(post["link"], ()):
+                matched.setdefault(str(chat_id), []).append(post)
+        for subscriber in subscribers or ():
+            chat_id = subscriber["user_id"]
+            chat_posts = matched.get(chat_id, []) if subscriber["has_watch"] else posts
+            if not chat_posts:
+                continue
+            keys = keys_for(chat_posts, subscriber["delivery_mode"] or default_mode)
+            pairs.extend((key, chat_id) for key in keys)
+            saved += len(chat_posts) - len(keys)
+    return {"messages": list(messages.values()), "pairs": pairs, "saved_calls": saved}
+
+
+def drain(report=_noop_report, max_batches: int | None = None) -> dict:
+    """발송할 차례가 된 대기 건을 모두 보낼 때까지 배치 단위로 전송합니다."""
+    started = time.monotonic()
+    totals = {"sent": 0, "retry_scheduled": 0, "failed": 0, "blocked": 0, "batches": 0}
+
+    released = database.release_stale_deliveries()
+    if released:
+        print(f"ℹ️ 중단된 발송 {released}건을 다시 대기열로 돌렸습니다.")
+
+    broadcaster = get_broadcaster()
+    while max_batches is None or totals["batches"] < max_batches:
+        rows = database.claim_deliveries(DELIVERY_BATCH_SIZE, DELIVERY_LEASE_SEC)
+        if not rows:
+            break
+        summary = broadcaster.send_batch(
+            (row["id"], row["chat_id"], row["text"], row["disable_web_page_preview"]) for row in rows
+        )
+        sent, retries, failures, blocked = classify(rows, summary["results"])
+        database.complete_deliveries(sent, retries, failures, blocked)
+
+        totals["sent"] += len(sent)
+        totals["retry_scheduled"] += len(retries)
+        totals["failed"] += len(failures)
+        totals["blocked"] += len(blocked)
+        totals["batches"] += 1
+        print(f"발송 배치 {totals['batches']}: 성공 {len(sent)}, 재시도 예약 {len(retries)}, "
+              f"실패 {len(failures)}, 차단 {len(blocked)} ({summary['throughput_per_sec']}건/초)")
+        report(stage="delivering", **totals)
+
+    elapsed = time.monotonic() - started
+    attempted = totals["sent"] + totals["retry_scheduled"] + totals["failed"] + totals["blocked"]
+    totals["elapsed_sec"] = round(elapsed, 3)
+    totals["throughput_per_sec"] = round(attempted / elapsed, 2) if elapsed > 0 else 0.0
+    return totals
+
+
+def drain_idle() -> int:
+    """유휴 워커용: 보낼 차례인 대기 건이 있으면 최대 OUTBOX_IDLE_BATCHES 배치를 보내고 배치 수를 반환합니다.
+
+    배치는 SKIP LOCKED로 가져가므로 크롤을 맡은 노드와 다른 노드들이 대기열을 겹치지 않게 나눠 보냅니다.
+    """
+    if not OUTBOX_IDLE_DRAIN or not database.has_due_deliveries():
+        return 0
+    return drain(max_batches=OUTBOX_IDLE_BATCHES)["batches"]
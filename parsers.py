@@ -0,0 +1,257 @@
+# parsers.py
+"""
+게시판 목록 HTML 파서 모음
+
+목록 페이지 전체가 아니라 `.ui-list` 표의 tbody 영역만 잘라 파싱합니다.
+행마다 제목·링크와 함께 번호, 작성일, 첨부 수, 상단 고정 여부를 뽑아 변경 감지(지문)에 씁니다.
+기본 백엔드는 설치된 것 중 가장 빠른 것(selectolax > lxml)이며,
+둘 다 없으면 BeautifulSoup(html.parser)로 대체합니다.
+"""
+import os
+import re
+import time
+
+import metrics
+
+PARSER_BACKEND = os.environ.get("PARSER_BACKEND", "auto")
+
+ROW_SELECTOR = ".ui-list tbody tr"
+TITLE_SELECTOR = ".board-list-title a"
+NUM_CLASS = "board-list-num"
+DATE_CLASS = "board-list-date"
+FILE_CLASS = "board-list-file"
+# 번호 칸이 숫자가 아니거나(예: "공지", 아이콘) 행 클래스에 이 문자열이 있으면 상단 고정 글로 봅니다.
+PINNED_ROW_CLASS = "notice"
+
+_TBODY_RE = re.compile(r"<tbody[^>]*>.*?</tbody>", re.S | re.I)
+
+# 상세(BBSView) 페이지: 본문 컨테이너와 첨부파일 영역 후보(앞에서부터 처음 찾은 것을 사용)
+DETAIL_BODY_CLASSES = ("board-view-contents", "board-view-con", "board-contents", "view-con", "bbs-view-content")
+DETAIL_FILE_CLASSES = ("board-view-file", "board-file", "file-list", "attach")
+DETAIL_MAX_CHARS = 20000
+_DOWNLOAD_RE = re.compile(r"download|filedown|downfile", re.I)
+
+
+def extract_board_region(html: str) -> str | None:
+    """`.ui-list` 이후 첫 tbody 영역을 문자열 검색으로 잘라 반환합니다. 없으면 None."""
+    start = html.find("ui-list")
+    if start < 0:
+        return None
+    match = _TBODY_RE.search(html, start)
+    return match.group(0) if match else None
+
+
+def _text(value) -> str:
+    return " ".join((value or "").split())
+
+
+def _row(title: str, href: str | None, row_class: str | None = None, num: str | None = None,
+         date: str | None = None, files: int = 0) -> dict:
+    num = _text(num)
+    pinned = (bool(num) and not num.isdigit()) or PINNED_ROW_CLASS in (row_class or "")
+    return {"title": title.strip(), "href": href or "", "num": num, "date": _text(date), "files": files,
+            "pinned": pinned}
+
+
+def _detail(body: str, anchors) -> dict:
+    """본문 텍스트를 줄 단위로 정리하고 (이름, href) 목록에서 첨부파일을 추립니다."""
+    lines = (" ".join(line.split()) for line in body.splitlines())
+    text = "\n".join(line for line in lines if line)[:DETAIL_MAX_CHARS]
+    attachments, seen = [], set()
+    for name, href in anchors:
+        name = " ".join((name or "").split())
+        if href and name and href not in seen:
+            seen.add(href)
+            attachments.append({"name": name, "href": href})
+    return {"body": text, "attachments": attachments}
+
+
+def _class_xpath(cls: str) -> str:
+    return f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')]"
+
+
+class SoupParser:
+    """BeautifulSoup(html.parser) 기반 대체 백엔드입니다."""
+
+    name = "bs4"
+
+    def parse_rows(self, html: str) -> list[dict]:
+        from bs4 import BeautifulSoup
+
+        region = extract_board_region(html)
+        if region is not None:
+            soup = BeautifulSoup(f"<table>{region}</table>", "html.parser")
+            rows = soup.select("tbody tr")
+        else:
+            soup = BeautifulSoup(html, "html.parser")
+            rows = soup.select(ROW_SELECTOR)
+        result = []
+        for row in rows:
+            anchor = row.select_one(TITLE_SELECTOR)
+            if anchor is None:
+                continue
+            num, date, files = (row.select_one(f".{cls}") for cls in (NUM_CLASS, DATE_CLASS, FILE_CLASS))
+            # 고정 글은 번호 대신 아이콘만 있는 경우가 있어 글자가 없으면 alt를 씁니다.
+            num_text = (num.get_text().strip() or " ".join(i.get("alt", "") for i in num.select("img"))
+                        if num is not None else None)
+            result.append(_row(
+                anchor.text, anchor.get("href"), " ".join(row.get("class") or []),
+                num_text, date.get_text() if date is not None else None,
+                (len(files.select("a")) or len(files.select("img"))) if files is not None else 0,
+            ))
+        return result
+
+    def parse_detail(self, html: str) -> dict:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, "html.parser")
+        body = next((node for cls in DETAIL_BODY_CLASSES if (node := soup.select_one(f".{cls}")) is not None), None)
+        anchors = [a for cls in DETAIL_FILE_CLASSES for a in soup.select(f".{cls} a")]
+        anchors += soup.find_all("a", href=_DOWNLOAD_RE)
+        return _detail(body.get_text("\n") if body is not None else "",
+                       ((a.get_text(" "), a.get("href")) for a in anchors))
+
+
+class LxmlParser:
+    """lxml.html 기반 백엔드입니다."""
+
+    name = "lxml"
+
+    _TITLE_XPATH = "." + _class_xpath("board-list-title") + "//a"
+
+    def __init__(self):
+        import lxml.html
+
+        self._lxml_html = lxml.html
+
+    @staticmethod
+    def _cell(row, cls: str):
+        cells = row.xpath("." + _class_xpath(cls))
+        return cells[0] if cells else None
+
+    def parse_rows(self, html: str) -> list[dict]:
+        region = extract_board_region(html)
+        if region is not None:
+            tree = self._lxml_html.fromstring(f"<table>{region}</table>")
+            rows = tree.xpath("//tbody/tr")
+        else:
+            tree = self._lxml_html.fromstring(html)
+            rows = tree.xpath(_class_xpath("ui-list") + "//tbody/tr")
+        result = []
+        for row in rows:
+            anchors = row.xpath(self._TITLE_XPATH)
+            if not anchors:
+                continue
+            num, date, files = (self._cell(row, cls) for cls in (NUM_CLASS, DATE_CLASS, FILE_CLASS))
+            num_text = (num.text_content().strip() or " ".join(num.xpath(".//img/@alt"))
+                        if num is not None else None)
+            result.append(_row(
+                anchors[0].text_content(), anchors[0].get("href"), row.get("class"),
+                num_text, date.text_content() if date is not None else None,
+                (len(files.xpath(".//a")) or len(files.xpath(".//img"))) if files is not None else 0,
+            ))
+        return result
+
+    def parse_detail(self, html: str) -> dict:
+        tree = self._lxml_html.fromstring(html)
+        body = next((nodes[0] for cls in DETAIL_BODY_CLASSES if (nodes := tree.xpath(_class_xpath(cls)))), None)
+        anchors = [a for cls in DETAIL_FILE_CLASSES for a in tree.xpath(_class_xpath(cls) + "//a")]
+        anchors += [a for a in tree.xpath("//a[@href]") if _DOWNLOAD_RE.search(a.get("href"))]
+        return _detail("\n".join(body.itertext()) if body is not None else "",
+                       ((a.text_content(), a.get("href")) for a in anchors))
+
+
+class SelectolaxParser:
+    """selectolax(Lexbor) 기반 백엔드입니다."""
+
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+
+        self._parser_cls = LexborHTMLParser
+
+    def parse_rows(self, html: str) -> list[dict]:
+        region = extract_board_region(html)
+        if region is not None:
+            rows = self._parser_cls(f"<table>{region}</table>").css("tbody tr")
+        else:
+            rows = self._parser_cls(html).css(ROW_SELECTOR)
+        result = []
+        for row in rows:
+            anchor = row.css_first(TITLE_SELECTOR)
+            if anchor is None:
+                continue
+            num, date, files = (row.css_first(f".{cls}") for cls in (NUM_CLASS, DATE_CLASS, FILE_CLASS))
+            num_text = (num.text().strip() or " ".join(i.attributes.get("alt") or "" for i in num.css("img"))
+                        if num is not None else None)
+            result.append(_row(
+                anchor.text(), anchor.attributes.get("href"), row.attributes.get("class"),
+                num_text, date.text() if date is not None else None,
+                (len(files.css("a")) or len(files.css("img"))) if files is not None else 0,
+            ))
+        return result
+
+    def parse_detail(self, html: str) -> dict:
+        tree = self._parser_cls(html)
+        body = next((node for cls in DETAIL_BODY_CLASSES if (node := tree.css_first(f".{cls}")) is not None), None)
+        anchors = [a for cls in DETAIL_FILE_CLASSES for a in tree.css(f".{cls} a")]
+        anchors += [a for a in tree.css("a[href]") if _DOWNLOAD_RE.search(a.attributes.get("href") or "")]
+        return _detail(body.text(separator="\n") if body is not None else "",
+                       ((a.text(separator=" "), a.attributes.get("href")) for a in anchors))
+
+
+BACKENDS = {
+    "selectolax": SelectolaxParser,
+    "lxml": LxmlParser,
+    "bs4": SoupParser,
+}
+
+_parsers = {}
+
+
+def get_parser(name: str | None = None):
+    """이름으로 파서를 반환합니다. "auto"이면 설치된 백엔드 중 가장 빠른 것을 고릅니다."""
+    name = name or PARSER_BACKEND
+    if name in _parsers:
+        return _parsers[name]
+    candidates = list(BACKENDS) if name == "auto" else [name]
+    for candidate in candidates:
+        if candidate not in BACKENDS:
+            raise ValueError(f"알 수 없는 파서 백엔드: {candidate}")
+        try:
+            parser = BACKENDS[candidate]()
+        except ImportError:
+            print(f"ℹ️ 파서 백엔드 {candidate} 미설치 - 다음 후보로 대체")
+            continue
+        _parsers[name] = parser
+        return parser
+    parser = SoupParser()
+    _parsers[name] = parser
+    return parser
+
+
+def parse_board_rows(html: str, backend: str | None = None) -> list[dict]:
+    """목록 HTML에서 게시글 행(상단 고정 글 포함)을 추출합니다.
+
+    반환값: [{"title", "href", "num", "date", "files", "pinned"}]
+    """
+    parser = get_parser(backend)
+    started = time.perf_counter()
+    try:
+        return parser.parse_rows(html)
+    finally:
+        metrics.PARSE_SECONDS.labels(backend=parser.name).observe(time.perf_counter() - started)
+
+
+def parse_post_detail(html: str, backend: str | None = None) -> dict:
+    """상세 페이지 HTML에서 본문 텍스트와 첨부파일 목록을 추출합니다.
+
+    반환값: {"body": str, "attachments": [{"name", "href"}]}
+    """
+    parser = get_parser(backend)
+    started = time.perf_counter()
+    try:
+        return parser.parse_detail(html)
+    finally:
+        metrics.PARSE_SECONDS.labels(backend=f"{parser.name}_detail").observe(time.perf_counter() - started)
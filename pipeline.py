@@ -0,0 +1,164 @@
+# pipeline.py
+import functools
+import os
+import time
+
+import database
+import details
+import digest
+import metrics
+import outbox
+import watches
+from crawler import check_new_posts, restore_circuit
+
+
+def _noop_report(**progress):
+    pass
+
+
+def _recipients():
+    """TARGET_CHAT_IDS가 있으면 그 목록을, 없으면 None(현재 구독자 전체)을 반환합니다."""
+    target_chat_ids_env = os.environ.get('TARGET_CHAT_IDS', '').strip()
+    if target_chat_ids_env:
+        return [cid.strip() for cid in target_chat_ids_env.split(',') if cid.strip()]
+    return None
+
+
+def render_post(post) -> str:
+    label = "수정된" if post.get("change") == "updated" else "새"
+    return f"[{label} {post.get('board', '학사공지')}]\n{post['title']}\n\n🔗 {post['link']}"
+
+
+def _crawl_status(crawl) -> str:
+    if crawl["circuit_open_until"]:
+        return "circuit_open"
+    if crawl["error"] and ("429" in crawl["error"] or "Too Many Requests" in crawl["error"]):
+        return "rate_limited"
+    return "error" if crawl["error"] else "ok"
+
+
+def _record_run(started_at, crawl, status):
+    """크롤 실행 기록을 남기고 id를 반환합니다. 적응형 스케줄러와 /status가 여기서 읽습니다."""
+    try:
+        return database.record_crawl_run({
+            "started_at": started_at,
+            "status": status,
+            "new_posts": len(crawl["posts"]),
+            "pages_fetched": sum(b["pages_fetched"] for b in crawl["boards"]),
+            "cache_hit": crawl["cache_hit"],
+            "fetch_ms": crawl["fetch_ms"],
+            "duration_ms": round((time.time() - started_at) * 1000, 1),
+            "circuit_open_until": crawl["circuit_open_until"],
+            "error": crawl["error"],
+        })
+    except Exception as e:
+        print(f"크롤 실행 기록 실패: {e}")
+        return None
+
+
+def _finish_run(run_id, started_at, timings) -> None:
+    if run_id is None:
+        return
+    timings["total_ms"] = round((time.time() - started_at) * 1000, 1)
+    try:
+        database.finish_crawl_run(run_id, timings)
+    except Exception as e:
+        print(f"크롤 실행 기록 갱신 실패: {e}")
+
+
+def run_crawl_and_notify(report=_noop_report) -> dict:
+    """
+    웹사이트를 크롤링하여 새로운 게시글이 있으면 텔레그램으로 알림을 보냅니다.
+    report(**progress)로 진행 상황을 알리며, 결과 요약 dict를 반환합니다.
+    """
+    print("크롤링 및 알림 작업을 시작합니다...")
+    report(stage="crawling")
+    started_at = time.time()
+
+    # 다른 워커 프로세스가 연 서킷도 따르도록 마지막 기록을 반영합니다.
+    try:
+        restore_circuit(database.latest_circuit_open_until())
+    except Exception as e:
+        print(f"서킷 상태 조회 실패: {e}")
+    crawl = check_new_posts()
+    status = _crawl_status(crawl)
+    timings = {"fetch_ms": crawl["fetch_ms"], "crawl_ms": round((time.time() - started_at) * 1000, 1)}
+    run_id = _record_run(started_at, crawl, status)
+    if crawl["error"]:
+        error_msg = crawl["error"]
+        print(f"크롤링 중 오류 발생: {error_msg}")
+
+        if status == "circuit_open":
+            return {
+                "status": "error",
+                "message": f"학교 사이트 요청이 일시 중단되었습니다(서킷 열림). {error_msg}",
+                "error_type": "circuit_open"
+            }
+        if status == "rate_limited":
+            return {
+                "status": "error",
+                "message": "HTTP 429: 웹사이트에서 요청이 너무 많다고 응답했습니다. 잠시 후 다시 시도해주세요.",
+                "error_type": "rate_limit"
+            }
+    else:
+        metrics.LAST_SUCCESSFUL_CRAWL.set(time.time())
+
+    new_posts = crawl["posts"]
+    enqueued = {"posts": 0, "deliveries": 0}
+    stage_started = time.time()
+    if new_posts:
+        updated = sum(1 for post in new_posts if post.get("change") == "updated")
+        print(f"새로운 공지 {len(new_posts) - updated}개, 수정된 공지 {updated}개 발견")
+        # 발송 기록과 수신자별 대기열을 한 트랜잭션으로 저장한 뒤 대기열을 비웁니다.
+        report(stage="enqueueing", posts_total=len(new_posts))
+        recipients = _recipients()
+        # 키워드 알림: 모든 키워드로 색인을 한 번 만들고 제목마다 한 번씩만 훑습니다.
+        watch_matches = watches.match_posts(new_posts) if recipients is None else None
+        # 다이제스트 모드 수신자는 새 글을 묶은 메시지를 받습니다(묶음은 한 번만 렌더링해 공유).
+        plan = functools.partial(outbox.plan_deliveries, recipients=recipients, watch_matches=watch_matches,
+                                 render_digest=digest.render_digest, default_mode=digest.DELIVERY_MODE_DEFAULT)
+        enqueued = database.enqueue_post_deliveries(
+            [dict(post, text=render_post(post)) for post in new_posts], plan, with_subscribers=recipients is None
+        )
+        if enqueued["saved_calls"]:
+            metrics.DIGEST_SAVED_CALLS.inc(enqueued["saved_calls"])
+        report(stage="enqueued", posts_total=len(new_posts), **enqueued)
+    timings["enqueue_ms"] = round((time.time() - stage_started) * 1000, 1)
+    
+    # 새 글이 없어도 이전 실행에서 남은 대기 건과 재시도 건을 보냅니다.
+    stage_started = time.time()
+    delivery = outbox.drain(report)
+    timings["delivery_ms"] = round((time.time() - stage_started) * 1000, 1)
+    
+    # 알림을 보낸 뒤 본문이 없는 글(새 글 우선, 이어서 과거 글)의 상세 페이지를 조금씩 색인합니다.
+    report(stage="indexing")
+    stage_started = time.time()
+    try:
+        indexed = details.index_pending()
+    except Exception as e:
+        print(f"상세 본문 색인 중 오류 발생: {e}")
+        indexed = {"error": str(e)}
+    timings["indexing_ms"] = round((time.time() - stage_started) * 1000, 1)
+    _finish_run(run_id, started_at, timings)
+    
+    if not new_posts:
+        print("새로운 공지가 없습니다.")
+        return {"status": "success", "message": "새 공지 없음", "cache_hit": crawl["cache_hit"],
+                "boards": crawl["boards"], "changes": crawl["changes"], "delivery": delivery, "indexed": indexed}
+    
+    return {
+        "status": "success",
+        "message": f"새 공지 {len(new_posts)}개 발송 완료",
+        "posts_count": len(new_posts),
+        "posts_updated": enqueued.get("updated", 0),
+        "cache_hit": crawl["cache_hit"],
+        "boards": crawl["boards"],
+        "changes": crawl["changes"],
+        "deliveries_enqueued": enqueued["deliveries"],
+        "digest_saved_calls": enqueued["saved_calls"],
+        "total_sent": delivery["sent"],
+        "total_failed": delivery["failed"] + delivery["blocked"],
+        "retry_scheduled": delivery["retry_scheduled"],
+        "delivery": delivery,
+        "indexed": indexed
+    }
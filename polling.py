@@ -0,0 +1,185 @@
+# polling.py
+"""
+getUpdates 롱 폴링 수신 경로(웹훅 대신)
+
+공개 HTTPS 주소가 없는 로컬 실행이나 NAT 뒤에서는 TELEGRAM_INGEST=polling으로 이 모드를 씁니다.
+getUpdates 한 번으로 받은 업데이트를 한 배치로 처리합니다.
+- /subscribe, /unsubscribe와 메모리만으로 답하는 명령만 보낸 채팅은 채팅별 마지막 구독 명령으로
+  최종 상태를 정하고, 배치 전체를 한 트랜잭션으로 반영합니다. 그 트랜잭션에서 offset도 함께
+  기록하므로 구독 요청이 몰려도 배치당 DB 왕복 수는 일정합니다.
+- 그 밖의 DB 명령(/search, /watch 등)이 섞인 채팅은 명령 순서대로 commands.handle()로 처리하고,
+  채팅끼리는 TELEGRAM_POLL_WORKERS개 스레드에서 동시에 처리합니다.
+- 답장은 Broadcaster로 동시에 보냅니다(전체·채팅별 전송 한도 적용).
+
+offset은 명령을 처리한 뒤, 답장을 보내기 전에 기록합니다. 기록 전에 죽으면 같은 배치를 다시 받아
+처리하고(구독 반영은 멱등), 기록 뒤에 죽으면 그 배치의 답장만 빠집니다.
+여러 프로세스가 떠 있어도 advisory lock을 얻은 한 곳만 폴링합니다(텔레그램은 동시 getUpdates를 409로 거절).
+잠금은 전용 연결에 쥐고 배치마다 그 연결이 살아 있는지 확인해, 끊겼으면 폴링을 멈추고 잠금을 다시 얻습니다.
+
+    TELEGRAM_INGEST=polling python main.py   # 서버와 함께
+    python polling.py                        # 명령 수신만 단독 실행
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import commands
+import database
+import metrics
+import subscribers
+import telegram_utils
+from broadcast import get_broadcaster
+
+TELEGRAM_INGEST = os.environ.get("TELEGRAM_INGEST", "webhook")
+TELEGRAM_POLL_TIMEOUT = int(os.environ.get("TELEGRAM_POLL_TIMEOUT", "50"))
+TELEGRAM_POLL_LIMIT = int(os.environ.get("TELEGRAM_POLL_LIMIT", "100"))
+TELEGRAM_POLL_WORKERS = int(os.environ.get("TELEGRAM_POLL_WORKERS", "4"))
+# 오류 뒤 재시도 간격(초). 다른 프로세스가 폴링 중일 때 잠금을 다시 시도하는 간격이기도 합니다.
+TELEGRAM_POLL_RETRY = float(os.environ.get("TELEGRAM_POLL_RETRY", "5"))
+POLL_LOCK_NAME = "telegram:getUpdates"
+
+_thread = None
+_thread_pid = None
+_thread_lock = threading.Lock()
+_stats = {"polling": False, "offset": None, "batches": 0, "updates": 0, "last_batch": None}
+
+
+def plan_batch(updates: list[dict]) -> dict:
+    """업데이트 배치를 처리 계획으로 나눕니다(DB·네트워크 없음).
+
+    반환값: {"next_offset", "replies": [(chat_id, text)], "subscribe": [...], "unsubscribe": [...],
+            "sequential": {chat_id: [text, ...]}, "bulk": n, "quick": n, "ignored": n}
+    """
+    plan = {"next_offset": None, "replies": [], "subscribe": [], "unsubscribe": [], "sequential": {},
+            "bulk": 0, "quick": 0, "ignored": 0}
+    by_chat = {}
+    for update in updates:
+        if update.get("update_id") is not None:
+            plan["next_offset"] = max(plan["next_offset"] or 0, update["update_id"] + 1)
+        parsed = commands.parse_update(update)
+        if parsed is None:
+            plan["ignored"] += 1
+            continue
+        chat_id, text = parsed
+        by_chat.setdefault(str(chat_id), []).append(text)
+
+    for chat_id, texts in by_chat.items():
+        replies, final, bulk = [], None, 0
+        for text in texts:
+            command = commands.bulk_command(text)
+            reply = commands.BULK_COMMANDS[command] if command else commands.quick_reply(chat_id, text)
+            if reply is None:
+                # 순서가 중요한 DB 명령이 섞여 있으면 이 채팅은 통째로 순서대로 처리합니다.
+                plan["sequential"][chat_id] = texts
+                break
+            if command:
+                final, bulk = command, bulk + 1
+            replies.append((chat_id, reply))
+        else:
+            plan["replies"] += replies
+            plan["bulk"] += bulk
+            plan["quick"] += len(replies) - bulk
+            if final == "/subscribe":
+                plan["subscribe"].append(chat_id)
+            elif final == "/unsubscribe":
+                plan["unsubscribe"].append(chat_id)
+    return plan
+
+
+def _handle_chat(item) -> list[tuple]:
+    chat_id, texts = item
+    replies = []
+    for text in texts:
+        try:
+            replies.append((chat_id, commands.handle(chat_id, text)))
+        except Exception as e:
+            print(f"텔레그램 명령 처리 오류(chat_id={chat_id}): {e}")
+    return replies
+
+
+def process_batch(updates: list[dict], bot_id: str) -> dict:
+    """배치 하나를 처리하고 offset을 기록한 뒤 답장을 보냅니다. 처리 요약을 반환합니다."""
+    started = time.monotonic()
+    plan = plan_batch(updates)
+    replies = list(plan["replies"])
+    if plan["sequential"]:
+        with ThreadPoolExecutor(max_workers=max(1, TELEGRAM_POLL_WORKERS), thread_name_prefix="poll") as pool:
+            for chat_replies in pool.map(_handle_chat, plan["sequential"].items()):
+                replies += chat_replies
+    changed = {"subscribed": 0, "unsubscribed": 0}
+    if plan["next_offset"] is not None:
+        changed = database.commit_update_batch(bot_id, plan["next_offset"], plan["subscribe"], plan["unsubscribe"])
+        if changed["subscribed"] or changed["unsubscribed"]:
+            subscribers.invalidate()
+    sent = get_broadcaster().send_batch(
+        (i, chat_id, text, False) for i, (chat_id, text) in enumerate(replies)
+    )["sent"] if replies else 0
+
+    handled = sum(len(texts) for texts in plan["sequential"].values())
+    for result, count in (("bulk", plan["bulk"]), ("quick", plan["quick"]), ("handled", handled),
+                          ("ignored", plan["ignored"])):
+        if count:
+            metrics.POLLED_UPDATES.labels(result=result).inc(count)
+    summary = {"updates": len(updates), "next_offset": plan["next_offset"], "bulk": plan["bulk"],
+               "quick": plan["quick"], "handled": handled, "ignored": plan["ignored"], **changed,
+               "replies": len(replies), "replies_sent": sent,
+               "elapsed_ms": round((time.monotonic() - started) * 1000, 1)}
+    print(f"getUpdates 배치 {len(updates)}건 처리: 구독 명령 {plan['bulk']}, 개별 처리 {handled}, "
+          f"답장 {sent}/{len(replies)} ({summary['elapsed_ms']}ms)")
+    return summary
+
+
+def _poll_locked(bot_id: str, lock) -> None:
+    # 웹훅이 설정되어 있으면 getUpdates가 409로 거절되므로 먼저 해제합니다.
+    telegram_utils.delete_webhook()
+    offset = database.get_update_offset(bot_id)
+    _stats.update(polling=True, offset=offset)
+    while True:
+        # 잠금 연결이 끊겼으면 다른 프로세스가 폴링을 이어받았을 수 있으므로 배치마다 확인합니다.
+        lock.ensure()
+        updates = telegram_utils.get_updates(offset, TELEGRAM_POLL_TIMEOUT, TELEGRAM_POLL_LIMIT)
+        if not updates:
+            continue
+        lock.ensure()
+        summary = process_batch(updates, bot_id)
+        offset = summary["next_offset"]
+        _stats.update(offset=offset, batches=_stats["batches"] + 1, updates=_stats["updates"] + len(updates),
+                      last_batch=summary)
+
+
+def run() -> None:
+    """잠금을 얻으면 롱 폴링을 계속하고, 오류가 나면 잠금을 놓고 잠시 뒤 다시 시도합니다."""
+    if not telegram_utils.is_configured():
+        print("❌ TELEGRAM_BOT_TOKEN 미설정 - getUpdates 폴링을 시작하지 않습니다.")
+        return
+    bot_id = telegram_utils.bot_id()
+    while True:
+        try:
+            with database.advisory_lock(POLL_LOCK_NAME) as lock:
+                if lock:
+                    print("📥 getUpdates 롱 폴링 시작")
+                    _poll_locked(bot_id, lock)
+        except Exception as e:
+            print(f"getUpdates 폴링 오류(재시도 대기): {e}")
+        _stats["polling"] = False
+        time.sleep(TELEGRAM_POLL_RETRY)
+
+
+def start() -> None:
+    """현재 프로세스의 폴링 스레드를 시작합니다(이미 실행 중이면 무시)."""
+    global _thread, _thread_pid
+    with _thread_lock:
+        if _thread is not None and _thread.is_alive() and _thread_pid == os.getpid():
+            return
+        _thread = threading.Thread(target=run, daemon=True, name="telegram-poll")
+        _thread.start()
+        _thread_pid = os.getpid()
+
+
+def status() -> dict:
+    return {"mode": TELEGRAM_INGEST, **_stats}
+
+
+if __name__ == "__main__":
+    run()
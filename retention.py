@@ -0,0 +1,132 @@
+# retention.py
+"""
+기록 테이블 보존 기간 정리와 압축 보관
+
+sent_posts, 발송 기록(deliveries·outbox_messages), crawl_history는 계속 쌓이므로, 켜 두면
+(RETENTION_ENABLED=1) 하루 한 번 보존 기간이 지난 행을 COPY로 gzip CSV 파일(ARCHIVE_DIR/<테이블>/)에
+내보낸 뒤 배치 단위로 삭제합니다. 기본은 꺼져 있습니다.
+삭제는 ARCHIVE_DIR를 명시적으로 지정했을 때만 합니다. 컨테이너 디스크는 재배포 때 사라지므로
+영구 디스크 경로를 지정하고, 보관 없이 삭제만 하려면 ARCHIVE_DIR=""처럼 일부러 비워 둡니다.
+
+발송 기록(sent_posts)은 중복 발송을 막는 기준이라 기간이 지나도 게시판마다 최신
+SENT_POSTS_KEEP_PER_BOARD개와 고정 공지는 남깁니다. 그래서 기록이 수백만 행까지 자라는 대신
+보존 기간만큼으로 유지되고, 링크 UNIQUE 색인을 쓰는 중복 확인도 그 크기 안에서 끝납니다.
+
+    python retention.py   # 한 번 실행(작업 큐를 거치지 않음)
+"""
+import os
+import sys
+import threading
+import time
+
+import crawler
+import database
+import jobs
+
+RETENTION_JOB_KIND = "retention"
+RETENTION_ENABLED = os.environ.get("RETENTION_ENABLED", "0") == "1"
+# 정리 작업 예약 간격(초). 작업 큐가 같은 종류를 하나로 합치므로 노드가 여럿이어도 한 번만 실행됩니다.
+RETENTION_INTERVAL = float(os.environ.get("RETENTION_INTERVAL", "86400"))
+SENT_POSTS_RETENTION_DAYS = float(os.environ.get("SENT_POSTS_RETENTION_DAYS", "365"))
+# 크롤러가 읽는 목록 범위(CRAWL_BOARDS의 게시판별 "pages" × 페이지당 글 수)보다 넉넉하게 잡습니다.
+# 그보다 적으면 아직 목록에 보이는 글의 기록이 지워져 다시 발송되므로, 아래에서 그 범위까지 올립니다.
+SENT_POSTS_KEEP_PER_BOARD = int(os.environ.get("SENT_POSTS_KEEP_PER_BOARD", "500"))
+DELIVERY_RETENTION_DAYS = float(os.environ.get("DELIVERY_RETENTION_DAYS", "30"))
+# 스케줄러가 읽는 기간(14일)보다 길어야 합니다.
+CRAWL_HISTORY_RETENTION_DAYS = float(os.environ.get("CRAWL_HISTORY_RETENTION_DAYS", "90"))
+# None(미설정)이면 삭제하지 않습니다. 빈 문자열은 보관 없이 삭제한다는 뜻입니다.
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR")
+RETENTION_BATCH = int(os.environ.get("RETENTION_BATCH", "10000"))
+
+_crawl_window = max((b["pages"] for b in crawler.load_boards()), default=1) * crawler.BOARD_PAGE_SIZE
+if SENT_POSTS_KEEP_PER_BOARD < _crawl_window:
+    print(f"⚠️ SENT_POSTS_KEEP_PER_BOARD({SENT_POSTS_KEEP_PER_BOARD})가 크롤 범위({_crawl_window}개)보다 작아 "
+          f"{_crawl_window}개로 올립니다.")
+    SENT_POSTS_KEEP_PER_BOARD = _crawl_window
+
+# 다음 정리 예정 시각(monotonic). 0이면 아직 jobs 테이블의 마지막 실행 시각을 확인하지 않은 상태입니다.
+_next_due = 0.0
+_due_lock = threading.Lock()
+
+
+def _archive_dir() -> str | None:
+    """보관 경로를 반환합니다(빈 값이면 None, 보관 없이 삭제). 설정되지 않았으면 삭제를 거부합니다."""
+    if ARCHIVE_DIR is None:
+        raise RuntimeError("ARCHIVE_DIR가 설정되지 않아 기록을 삭제하지 않습니다. 영구 디스크 경로를 지정하거나, "
+                           "보관 없이 삭제하려면 ARCHIVE_DIR=\"\"로 명시하세요.")
+    return ARCHIVE_DIR or None
+
+
+def prune_sent_posts(older_than_days: float = SENT_POSTS_RETENTION_DAYS) -> dict:
+    """보존 기간이 지난 발송 기록을 보관 후 삭제합니다(게시판별 최신 글과 고정 공지는 남김)."""
+    return database.prune_sent_posts(older_than_days, SENT_POSTS_KEEP_PER_BOARD, _archive_dir(),
+                                     RETENTION_BATCH)
+
+
+def run(report=None) -> dict:
+    """모든 기록 테이블을 정리합니다. 작업 큐 처리 함수로도 쓰입니다."""
+    started = time.monotonic()
+    archive = _archive_dir()
+    result = {"status": "ok"}
+    steps = (
+        ("sent_posts", prune_sent_posts),
+        ("deliveries", lambda: database.prune_deliveries(DELIVERY_RETENTION_DAYS, archive, RETENTION_BATCH)),
+        ("crawl_history",
+         lambda: database.prune_crawl_history(CRAWL_HISTORY_RETENTION_DAYS, archive, RETENTION_BATCH)),
+    )
+    for name, step in steps:
+        if report:
+            report(step=name)
+        outcome = step()
+        outcome["files"] = len(outcome["files"])
+        result[name] = outcome
+    result["elapsed_sec"] = round(time.monotonic() - started, 2)
+    result["message"] = (f"기록 정리 완료: 발송 기록 {result['sent_posts']['deleted']}, "
+                         f"발송 내역 {result['deliveries']['deliveries_deleted']}, "
+                         f"크롤 기록 {result['crawl_history']['deleted']}행 삭제")
+    print(f"🧹 {result['message']} ({result['elapsed_sec']}초)")
+    return result
+
+
+def _remaining() -> float:
+    """마지막 정리 작업이 끝난 뒤 RETENTION_INTERVAL까지 남은 초를 반환합니다.
+
+    jobs 테이블을 기준으로 하므로 재배포하거나 다른 노드가 실행했어도 간격이 유지됩니다.
+    실행 기록이 없으면 바로 실행합니다.
+    """
+    elapsed = database.seconds_since_job_finished(RETENTION_JOB_KIND)
+    if elapsed is None:
+        return 0.0
+    return max(0.0, RETENTION_INTERVAL - elapsed)
+
+
+def maybe_enqueue() -> bool:
+    """유휴 처리: RETENTION_INTERVAL마다 정리 작업을 작업 큐에 등록합니다. 직접 일을 하지는 않습니다."""
+    global _next_due
+    if not RETENTION_ENABLED:
+        return False
+    with _due_lock:
+        now = time.monotonic()
+        if now < _next_due:
+            return False
+        try:
+            remaining = _remaining()
+        except Exception as e:
+            print(f"기록 정리 일정 확인 실패: {e}")
+            remaining = RETENTION_INTERVAL
+        _next_due = now + (remaining or RETENTION_INTERVAL)
+        if remaining > 0:
+            return False
+    try:
+        jobs.enqueue(RETENTION_JOB_KIND)
+    except Exception as e:
+        print(f"기록 정리 작업 등록 실패: {e}")
+    return False
+
+
+if __name__ == "__main__":
+    try:
+        run()
+    except Exception as e:
+        print(f"❌ 기록 정리 실패: {e}")
+        sys.exit(1)
@@ -0,0 +1,107 @@
+# scheduler.py
+"""
+적응형 크롤 스케줄러
+
+각 워커 프로세스의 스케줄러 스레드가 주기적으로 crawl_history를 읽어 다음 크롤 시각을
+정하고, 때가 되면 작업 큐에 크롤 작업을 등록합니다. 여러 프로세스가 동시에 등록해도
+작업 큐가 하나로 합치므로 중복 실행되지 않습니다.
+
+간격은 게시판이 실제로 바뀌는 빈도에 맞춥니다. 최근 실행과, 지난 며칠 동안 같은 시간대
+실행 중 새 글이 있던 비율(p)로 CRAWL_INTERVAL_MAX(p=0)와 CRAWL_INTERVAL_MIN(p=1) 사이를
+기하 보간하므로, 수강신청 기간처럼 글이 잦으면 짧아지고 조용한 시간대에는 길어집니다.
+야간에는 CRAWL_NIGHT_INTERVAL 이상으로 늘리고, 서킷이 열려 있으면 닫힐 때까지 쉽니다.
+"""
+import os
+import threading
+
+import database
+import jobs
+import metrics
+
+CRAWL_SCHEDULER_ENABLED = os.environ.get("CRAWL_SCHEDULER", "1") != "0"
+CRAWL_INTERVAL_MIN = float(os.environ.get("CRAWL_INTERVAL_MIN", "300"))
+CRAWL_INTERVAL_MAX = float(os.environ.get("CRAWL_INTERVAL_MAX", "3600"))
+CRAWL_NIGHT_INTERVAL = float(os.environ.get("CRAWL_NIGHT_INTERVAL", "7200"))
+# 야간 시간대(현지 시각, 시작 시 포함 ~ 끝 시 미포함)
+CRAWL_NIGHT_HOURS = os.environ.get("CRAWL_NIGHT_HOURS", "0-7")
+CRAWL_TIMEZONE = os.environ.get("CRAWL_TIMEZONE", "Asia/Seoul")
+SCHEDULER_TICK = float(os.environ.get("SCHEDULER_TICK", "30"))
+SCHEDULER_RECENT_RUNS = 12
+SCHEDULER_HISTORY_DAYS = 14
+
+_job_kind = None
+_thread = None
+_thread_pid = None
+_thread_lock = threading.Lock()
+_last_decision = {}
+
+
+def _night_hours():
+    start, end = (int(x) for x in CRAWL_NIGHT_HOURS.split("-", 1))
+    return start, end
+
+
+def _is_night(hour: int) -> bool:
+    start, end = _night_hours()
+    return start <= hour < end if start <= end else (hour >= start or hour < end)
+
+
+def next_interval(state: dict) -> tuple[float, str]:
+    """crawl_schedule_state() 결과로 다음 크롤까지의 간격(초)과 그 이유를 계산합니다."""
+    rates = [p for p in (state.get("p_recent"), state.get("p_hour")) if p is not None]
+    if not rates:
+        return CRAWL_INTERVAL_MIN, "기록 없음"
+    p = max(rates)
+    interval = CRAWL_INTERVAL_MAX * (CRAWL_INTERVAL_MIN / CRAWL_INTERVAL_MAX) ** p
+    reason = f"변경 비율 {p:.2f}"
+    if state.get("local_hour") is not None and _is_night(int(state["local_hour"])):
+        interval = max(interval, CRAWL_NIGHT_INTERVAL)
+        reason += ", 야간"
+    return interval, reason
+
+
+def tick() -> dict:
+    """한 번 판단하고, 때가 되었으면 크롤 작업을 등록합니다."""
+    state = database.crawl_schedule_state(CRAWL_TIMEZONE, SCHEDULER_RECENT_RUNS, SCHEDULER_HISTORY_DAYS)
+    interval, reason = next_interval(state)
+    metrics.CRAWL_INTERVAL_SECONDS.set(interval)
+    decision = {"interval_sec": round(interval), "reason": reason, "since_last_sec": state["since_last_sec"],
+                "circuit_open_until": state["circuit_open_until"], "enqueued": False}
+    if state["circuit_open_until"]:
+        decision["reason"] += ", 서킷 열림"
+    elif state["since_last_sec"] is None or state["since_last_sec"] >= interval:
+        job, created = jobs.enqueue(_job_kind)
+        decision.update(enqueued=created, job_id=job["id"])
+        if created:
+            print(f"⏰ 스케줄 크롤 등록: job_id={job['id']} (간격 {interval:.0f}초, {reason})")
+    _last_decision.clear()
+    _last_decision.update(decision)
+    return decision
+
+
+def _loop() -> None:
+    stop = threading.Event()
+    while not stop.wait(SCHEDULER_TICK):
+        try:
+            tick()
+        except Exception as e:
+            print(f"크롤 스케줄러 오류: {e}")
+
+
+def start(job_kind: str) -> None:
+    """현재 프로세스의 스케줄러 스레드를 시작합니다(CRAWL_SCHEDULER=0이면 시작하지 않음)."""
+    global _job_kind, _thread, _thread_pid
+    if not CRAWL_SCHEDULER_ENABLED:
+        return
+    with _thread_lock:
+        _job_kind = job_kind
+        if _thread is not None and _thread.is_alive() and _thread_pid == os.getpid():
+            return
+        _thread = threading.Thread(target=_loop, daemon=True, name="crawl-scheduler")
+        _thread.start()
+        _thread_pid = os.getpid()
+
+
+def status() -> dict:
+    """마지막 판단 결과를 반환합니다."""
+    return {"enabled": CRAWL_SCHEDULER_ENABLED, **_last_decision}
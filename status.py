@@ -0,0 +1,134 @@
+# status.py
+"""
+/status 응답용 크롤 상태 스냅샷
+
+상태 확인 요청마다 학교 사이트를 크롤링하지 않고, 크롤 작업이 crawl_history에 남긴 마지막 실행
+결과(시각, 오류, 단계별 소요 시간)와 마지막으로 저장된 게시글을 보여 줍니다. 스냅샷은 프로세스마다
+STATUS_CACHE_TTL초 동안 메모리에 두어, 대시보드가 자주 호출해도 DB 조회는 그 주기에 한 번입니다.
+
+refresh=1 요청만 사이트 첫 페이지를 직접 확인합니다. 동시에 들어온 요청은 한 번의 확인을 함께
+기다리고, STATUS_REFRESH_MIN_INTERVAL초 안의 재요청은 직전 결과를 재사용합니다. 확인은 크롤 작업과
+같은 호스트 예산과 서킷 브레이커를 거치고 재시도하지 않으며, 서킷이 열려 있으면 요청하지 않습니다.
+"""
+import os
+import threading
+import time
+
+import database
+from crawler import circuit_open_until, get_latest_post, restore_circuit
+
+STATUS_CACHE_TTL = float(os.environ.get("STATUS_CACHE_TTL", "5"))
+STATUS_REFRESH_MIN_INTERVAL = float(os.environ.get("STATUS_REFRESH_MIN_INTERVAL", "60"))
+# 마지막 실행이 이보다 오래되면 crawler_status를 stale로 표시합니다.
+STATUS_STALE_AFTER = float(os.environ.get("STATUS_STALE_AFTER", "10800"))
+
+
+class SingleFlight:
+    """같은 키의 동시 호출을 하나로 합칩니다. 먼저 온 호출이 실행하고 나머지는 그 결과를 받습니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """(결과, 다른 호출의 결과를 공유했는지)를 반환합니다. fn의 예외는 기다리던 호출에도 전달됩니다."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+        if not leader:
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"], True
+        try:
+            call["result"] = fn()
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+        return call["result"], False
+
+
+_flight = SingleFlight()
+_cache_lock = threading.Lock()
+_snapshot = {"value": None, "loaded_at": 0.0}
+_live = {"value": None, "checked_at": 0.0}
+
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def _crawler_status(last_run, age_sec) -> str:
+    if last_run is None:
+        return "unknown"
+    if last_run["status"] in ("circuit_open", "rate_limited"):
+        return "throttled"
+    if last_run["status"] != "ok":
+        return "failed"
+    return "stale" if age_sec is not None and age_sec > STATUS_STALE_AFTER else "working"
+
+
+def _build(row: dict) -> dict:
+    age_sec = round(float(row["age_sec"]), 1) if row["age_sec"] is not None else None
+    latest = row["latest_post"]
+    return {
+        "crawler_status": _crawler_status(row["last_run"], age_sec),
+        "age_sec": age_sec,
+        "last_run": row["last_run"],
+        "last_success_at": _iso(row["last_success_at"]),
+        "last_error": row["last_error"],
+        "latest_post": dict(latest, is_sent=True) if latest else None,
+        "checked_at": _iso(row["checked_at"]),
+    }
+
+
+def snapshot() -> dict:
+    """마지막 크롤 결과 요약을 반환합니다. cache_age_sec는 이 프로세스 캐시의 나이입니다."""
+    now = time.monotonic()
+    with _cache_lock:
+        value, loaded_at = _snapshot["value"], _snapshot["loaded_at"]
+    if value is None or now - loaded_at >= STATUS_CACHE_TTL:
+        def load():
+            built = _build(database.crawl_status_snapshot())
+            with _cache_lock:
+                _snapshot.update(value=built, loaded_at=time.monotonic())
+            return built
+        value, _ = _flight.do("snapshot", load)
+        loaded_at = _snapshot["loaded_at"]
+    return dict(value, cache_age_sec=round(max(0.0, time.monotonic() - loaded_at), 1))
+
+
+def _check_live() -> dict:
+    # 다른 워커가 연 서킷(crawl_history에 기록)을 이 프로세스에도 적용한 뒤, 열려 있으면 사이트에 요청하지 않습니다.
+    restore_circuit(database.latest_circuit_open_until())
+    open_until = circuit_open_until()
+    if open_until:
+        result = {"ok": False, "elapsed_ms": 0.0, "circuit_open_until": open_until}
+        _live.update(value=result, checked_at=time.monotonic())
+        return result
+    started = time.monotonic()
+    # 요청 스레드에서 실행되므로 재시도 없이 한 번만 요청합니다(요청 간격은 크롤 작업과 공유하는 호스트 예산이 지킵니다).
+    post = get_latest_post(max_retries=1)
+    elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+    if post is None:
+        result = {"ok": False, "elapsed_ms": elapsed_ms}
+    else:
+        result = {"ok": True, "elapsed_ms": elapsed_ms,
+                  "latest_post": dict(post, is_sent=database.fingerprint_lookup([post["link"]])[post["link"]]["sent"])}
+    _live.update(value=result, checked_at=time.monotonic())
+    return result
+
+
+def refresh() -> dict:
+    """사이트 첫 페이지를 직접 확인합니다. 동시 요청은 한 번의 확인을 공유합니다."""
+    value, checked_at = _live["value"], _live["checked_at"]
+    if value is not None and time.monotonic() - checked_at < STATUS_REFRESH_MIN_INTERVAL:
+        return dict(value, shared=True, age_sec=round(time.monotonic() - checked_at, 1))
+    value, shared = _flight.do("live", _check_live)
+    return dict(value, shared=shared, age_sec=round(time.monotonic() - _live["checked_at"], 1))
@@ -0,0 +1,199 @@
+# subscribers.py
+"""
+프로세스 내 구독자 캐시
+
+구독자 집합을 프로세스 메모리에 두고 gthread 요청 스레드들이 함께 씁니다. 구독자 테이블의
+트리거가 커밋 시 NOTIFY를 보내면 LISTEN 스레드가 캐시를 무효화하므로, 다른 gunicorn 워커나
+발송 중 자동 해제(차단 사용자)로 바뀐 내용도 바로 반영됩니다.
+캐시가 비어 있을 때(무효화 직후 등)는 전체를 다시 읽지 않고 한 행만 조회하며, 집합은 백그라운드
+스레드가 SUBSCRIBER_REFILL_DELAY만큼 기다렸다가 다시 채웁니다(구독이 몰릴 때 여러 번의 무효화를 한 번의
+적재로 합침). LISTEN 연결이 끊긴 동안에는 캐시를 쓰지 않고 매번 한 행씩 DB를 조회합니다.
+"""
+import os
+import select
+import threading
+import time
+
+import database
+import metrics
+
+SUBSCRIBER_CACHE_ENABLED = os.environ.get("SUBSCRIBER_CACHE", "1") != "0"
+LISTEN_RECONNECT_DELAY = float(os.environ.get("SUBSCRIBER_LISTEN_RECONNECT", "5"))
+SUBSCRIBER_REFILL_DELAY = float(os.environ.get("SUBSCRIBER_REFILL_DELAY", "1"))
+
+
+class SubscriberCache:
+    """구독자 user_id 집합 캐시입니다. 세대(generation) 번호로 조회 중 무효화된 결과를 버립니다."""
+
+    def __init__(self, load, lookup, listen=None, channel: str = database.SUBSCRIBERS_CHANNEL):
+        self._load = load
+        self._lookup = lookup
+        self._refilling = False
+        self._listen = listen
+        self._channel = channel
+        self._lock = threading.Lock()
+        self._members = None  # frozenset 또는 None(무효화됨)
+        self._generation = 0
+        self._listening = False
+        self._listener = None
+        self._listener_pid = None
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "listen_errors": 0}
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._members = None
+            self._stats["invalidations"] += 1
+
+    def _refill(self) -> None:
+        time.sleep(SUBSCRIBER_REFILL_DELAY)
+        try:
+            with self._lock:
+                generation = self._generation
+            # 키셋 페이지 단위로 읽어 중간 리스트 없이 집합을 만듭니다.
+            members = frozenset(self._load())
+            with self._lock:
+                # 조회하는 동안 알림이 왔다면 이 결과는 이미 낡았으므로 저장하지 않습니다(다음 미스가 다시 채움).
+                if generation == self._generation and self._listening:
+                    self._members = members
+        except Exception as e:
+            print(f"구독자 캐시 적재 실패: {e}")
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def _schedule_refill(self) -> None:
+        """호출 시 self._lock을 쥐고 있어야 합니다. 적재 스레드는 한 번에 하나만 돌립니다."""
+        if self._refilling or not self._listening:
+            return
+        self._refilling = True
+        threading.Thread(target=self._refill, daemon=True, name="subscriber-refill").start()
+
+    def _cached(self) -> frozenset | None:
+        """캐시된 집합을 반환합니다. 비어 있으면 백그라운드 적재를 예약하고 None을 반환합니다."""
+        if self._listen is not None:
+            self.start_listener()
+        with self._lock:
+            members = self._members if self._listening else None
+            if members is not None:
+                self._stats["hits"] += 1
+            else:
+                self._stats["misses"] += 1
+                self._schedule_refill()
+        metrics.SUBSCRIBER_CACHE.labels(result="hit" if members is not None else "miss").inc()
+        return members
+
+    def peek(self, user_id: str) -> bool | None:
+        """DB를 조회하지 않고 캐시만 확인합니다. 캐시가 비어 있으면 None."""
+        members = self._cached()
+        return None if members is None else user_id in members
+
+    def contains(self, user_id: str) -> bool:
+        """캐시에 있으면 메모리에서, 없으면 한 행만 조회해 답합니다."""
+        members = self._cached()
+        return self._lookup(user_id) if members is None else user_id in members
+
+    def _listen_loop(self) -> None:
+        while True:
+            conn = None
+            try:
+                conn = self._listen(self._channel)
+                # LISTEN 이전의 변경은 알림으로 받지 못했으므로 기존 캐시를 버리고 시작합니다.
+                self.invalidate()
+                with self._lock:
+                    self._listening = True
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self.invalidate()
+            except Exception as e:
+                with self._lock:
+                    self._listening = False
+                    self._stats["listen_errors"] += 1
+                print(f"구독자 캐시 LISTEN 연결 오류(재연결 대기): {e}")
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self.invalidate()
+            time.sleep(LISTEN_RECONNECT_DELAY)
+
+    def start_listener(self) -> None:
+        """현재 프로세스의 LISTEN 스레드를 시작합니다(이미 실행 중이면 무시)."""
+        if self._listener_pid == os.getpid() and self._listener is not None and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid() and self._listener is not None and self._listener.is_alive():
+                return
+            # fork 직후에는 부모의 캐시와 LISTEN 상태를 물려받지 않습니다.
+            self._members = None
+            self._listening = False
+            self._listener = threading.Thread(target=self._listen_loop, daemon=True, name="subscriber-listen")
+            self._listener.start()
+            self._listener_pid = os.getpid()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["listening"] = self._listening
+            stats["cached"] = None if self._members is None else len(self._members)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else None
+        return stats
+
+
+_cache = SubscriberCache(database.iter_subscribers, database.is_subscribed,
+                         listen=database.listen_connection if SUBSCRIBER_CACHE_ENABLED else None)
+
+
+def is_subscribed(user_id: str) -> bool:
+    return _cache.contains(str(user_id))
+
+
+def peek(user_id: str) -> bool | None:
+    return _cache.peek(str(user_id))
+
+
+def subscribe(user_id: str) -> bool:
+    """구독을 추가합니다. 캐시상 이미 구독 중이면 DB를 거치지 않고 False를 반환합니다.
+
+    캐시가 비어 있으면 조회 없이 INSERT ... ON CONFLICT 한 번으로 처리합니다.
+    """
+    user_id = str(user_id)
+    if peek(user_id):
+        return False
+    changed = database.add_subscriber(user_id)
+    if changed:
+        _cache.invalidate()
+    return changed
+
+
+def unsubscribe(user_id: str) -> bool:
+    """구독을 해제합니다. 캐시상 구독 중이 아니면 DB를 거치지 않고 False를 반환합니다."""
+    user_id = str(user_id)
+    if peek(user_id) is False:
+        return False
+    changed = database.remove_subscriber(user_id)
+    if changed:
+        _cache.invalidate()
+    return changed
+
+
+def invalidate() -> None:
+    """일괄 반영처럼 이 모듈을 거치지 않은 변경 뒤에 캐시를 바로 비웁니다."""
+    _cache.invalidate()
+
+
+def clear() -> int:
+    deleted = database.clear_subscribers()
+    _cache.invalidate()
+    return deleted
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
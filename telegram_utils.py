@@ -1,7 +1,13 @@
 import os
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Optional
 
+import metrics
+
 # 환경변수에서 토큰을 읽어와 공백/따옴표를 제거해 정규화합니다.
 _raw_token = os.environ.get("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_BOT_TOKEN = _raw_token.strip().strip('"').strip("'")
@@ -10,7 +16,141 @@ TELEGRAM_BOT_TOKEN = _raw_token.strip().strip('"').strip("'")
 if TELEGRAM_BOT_TOKEN and ":" not in TELEGRAM_BOT_TOKEN:
     print("⚠️ TELEGRAM_BOT_TOKEN 형식이 비정상일 수 있습니다. 콜론(:) 포함 여부를 확인하세요.")
 
-API_BASE = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}" if TELEGRAM_BOT_TOKEN else None
+# 로컬 스텁 서버로 벤치마크할 때는 TELEGRAM_API_URL로 주소를 바꿉니다.
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+API_BASE = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}" if TELEGRAM_BOT_TOKEN else None
+
+# 브로드캐스트 워커 수만큼 keep-alive 연결을 재사용할 수 있도록 풀 크기를 맞춥니다.
+TELEGRAM_POOL_SIZE = int(os.environ.get("TELEGRAM_POOL_SIZE", "16"))
+# 429 응답의 retry_after가 이 값(초) 이하이면 그 자리에서 기다렸다 재시도하고,
+# 더 길면 호출자(발송 대기열)가 나중에 재시도하도록 실패로 돌려줍니다.
+TELEGRAM_MAX_INLINE_RETRY_AFTER = float(os.environ.get("TELEGRAM_MAX_INLINE_RETRY_AFTER", "5"))
+TELEGRAM_429_RETRIES = int(os.environ.get("TELEGRAM_429_RETRIES", "2"))
+
+
+class LatencyHistogram:
+    """API 호출 지연 시간 히스토그램(밀리초 버킷, 스레드 안전)입니다."""
+
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        index = len(self.BUCKETS_MS)
+        for i, bound in enumerate(self.BUCKETS_MS):
+            if ms <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum_ms += ms
+
+    def _quantile(self, counts, q: float):
+        """q 분위수가 속한 버킷의 상한(ms)을 반환합니다."""
+        target = q * self._count
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= target and c:
+                return self.BUCKETS_MS[i] if i < len(self.BUCKETS_MS) else float("inf")
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            count, sum_ms = self._count, self._sum_ms
+        buckets = {f"le_{b}ms": c for b, c in zip(self.BUCKETS_MS, counts)}
+        buckets["inf"] = counts[-1]
+        return {
+            "count": count,
+            "avg_ms": round(sum_ms / count, 2) if count else 0.0,
+            "p50_le_ms": self._quantile(counts, 0.5) if count else None,
+            "p95_le_ms": self._quantile(counts, 0.95) if count else None,
+            "buckets": buckets,
+        }
+
+
+_latency: dict[str, LatencyHistogram] = {}
+_latency_lock = threading.Lock()
+
+
+def _observe(method: str, seconds: float) -> None:
+    metrics.TELEGRAM_REQUEST_SECONDS.labels(method=method).observe(seconds)
+    histogram = _latency.get(method)
+    if histogram is None:
+        with _latency_lock:
+            histogram = _latency.setdefault(method, LatencyHistogram())
+    histogram.observe(seconds)
+
+
+def latency_stats() -> dict:
+    """API 메서드별 호출 지연 히스토그램을 반환합니다."""
+    return {method: h.snapshot() for method, h in list(_latency.items())}
+
+
+_adapter = None
+_adapter_lock = threading.Lock()
+_local = threading.local()
+
+
+def _get_adapter() -> HTTPAdapter:
+    """프로세스 전체가 공유하는 연결 풀 어댑터입니다(urllib3 풀은 스레드 안전)."""
+    global _adapter
+    if _adapter is None:
+        with _adapter_lock:
+            if _adapter is None:
+                # 연결 단계 오류만 재시도합니다. 요청이 전송된 뒤의 오류는 중복 전송 위험이 있어 재시도하지 않습니다.
+                retries = Retry(total=2, connect=2, read=0, status=0, other=0, backoff_factor=0.2)
+                _adapter = HTTPAdapter(pool_connections=1, pool_maxsize=TELEGRAM_POOL_SIZE,
+                                       max_retries=retries, pool_block=False)
+    return _adapter
+
+
+def _get_session() -> requests.Session:
+    """스레드별 세션을 반환합니다. 모든 세션이 같은 어댑터(keep-alive 연결 풀)를 공유합니다."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = _get_adapter()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _local.session = session
+    return session
+
+
+def _call(method: str, data: dict | None = None, timeout: float = 10):
+    """Bot API를 호출합니다. 짧은 retry_after의 429는 기다렸다가 재시도합니다.
+
+    반환값: (응답, JSON 본문 dict). 요청 자체가 실패하면 RequestException이 발생합니다.
+    """
+    url = f"{API_BASE}/{method}"
+    for attempt in range(TELEGRAM_429_RETRIES + 1):
+        started = time.perf_counter()
+        try:
+            resp = _get_session().post(url, data=data, timeout=timeout)
+        finally:
+            _observe(method, time.perf_counter() - started)
+        try:
+            body = resp.json()
+        except ValueError:
+            body = {}
+        if resp.status_code != 429:
+            return resp, body
+        metrics.RATE_LIMITED.labels(target="telegram").inc()
+        if attempt == TELEGRAM_429_RETRIES:
+            return resp, body
+        retry_after = (body.get("parameters") or {}).get("retry_after") or 1
+        if retry_after > TELEGRAM_MAX_INLINE_RETRY_AFTER:
+            return resp, body
+        print(f"ℹ️ 텔레그램 429 - {retry_after}초 후 재시도 ({method})")
+        time.sleep(retry_after)
+    return resp, body
 
 
 def is_configured() -> bool:
@@ -18,30 +158,68 @@ def is_configured() -> bool:
     return bool(TELEGRAM_BOT_TOKEN and API_BASE)
 
 
-def send_message(chat_id: str | int, text: str, disable_web_page_preview: bool = False) -> bool:
-    """특정 chat_id(사용자/그룹)에 텍스트 메시지를 전송합니다."""
+def send_message_result(chat_id: str | int, text: str, disable_web_page_preview: bool = False) -> dict:
+    """메시지를 전송하고 결과를 상세히 반환합니다.
+
+    반환값: {"ok", "status", "error", "retry_after", "permanent"}
+    permanent=True는 재시도해도 성공할 수 없는 실패(봇 차단 403, 존재하지 않는 채팅 등)입니다.
+    """
     if not is_configured():
         print("❌ TELEGRAM_BOT_TOKEN 미설정")
-        return False
-    url = f"{API_BASE}/sendMessage"
+        return {"ok": False, "status": None, "error": "TELEGRAM_BOT_TOKEN 미설정", "retry_after": None, "permanent": False}
     data = {
         "chat_id": chat_id,
         "text": text,
         "disable_web_page_preview": disable_web_page_preview,
     }
     try:
-        resp = requests.post(url, data=data, timeout=10)
-        if resp.status_code == 200 and resp.json().get("ok"):
+        resp, body = _call("sendMessage", data)
+        if resp.status_code == 200 and body.get("ok"):
             print("✅ 텔레그램 전송 성공")
-            return True
+            return {"ok": True, "status": 200, "error": None, "retry_after": None, "permanent": False}
         print(f"❌ 텔레그램 전송 실패: {resp.status_code} {resp.text}")
+        metrics.TELEGRAM_FAILURES.labels(reason=str(resp.status_code)).inc()
         # 404가 발생하면 대부분 토큰 경로 오염(공백/따옴표 포함) 혹은 오타입니다.
         if resp.status_code == 404:
             print("ℹ️ 점검: TELEGRAM_BOT_TOKEN 앞뒤 공백/따옴표 제거, 정확한 값인지 확인하세요.")
-        return False
+        description = body.get("description") or resp.text[:200]
+        retry_after = (body.get("parameters") or {}).get("retry_after")
+        permanent = resp.status_code == 403 or (resp.status_code == 400 and "chat not found" in description.lower())
+        return {"ok": False, "status": resp.status_code, "error": description,
+                "retry_after": retry_after, "permanent": permanent}
     except requests.exceptions.RequestException as e:
         print(f"❌ 텔레그램 요청 오류: {e}")
-        return False
+        metrics.TELEGRAM_FAILURES.labels(reason="network").inc()
+        return {"ok": False, "status": None, "error": str(e), "retry_after": None, "permanent": False}
+
+
+def send_message(chat_id: str | int, text: str, disable_web_page_preview: bool = False) -> bool:
+    """특정 chat_id(사용자/그룹)에 텍스트 메시지를 전송합니다."""
+    return send_message_result(chat_id, text, disable_web_page_preview=disable_web_page_preview)["ok"]
+
+
+def get_updates(offset: int | None = None, timeout: int = 50, limit: int = 100) -> list[dict]:
+    """getUpdates를 롱 폴링합니다. 새 업데이트가 없으면 timeout초 동안 기다렸다가 빈 목록을 반환합니다.
+
+    offset보다 작은 update_id는 텔레그램 쪽에서 확인 처리되어 다시 오지 않습니다.
+    요청 실패나 오류 응답(웹훅이 설정된 경우의 409 등)은 RequestException으로 올립니다.
+    """
+    if not is_configured():
+        raise requests.exceptions.RequestException("TELEGRAM_BOT_TOKEN 미설정")
+    data = {"timeout": timeout, "limit": limit, "allowed_updates": '["message","edited_message"]'}
+    if offset is not None:
+        data["offset"] = offset
+    # 서버가 timeout초 동안 응답을 붙잡고 있으므로 HTTP 타임아웃은 그보다 길게 둡니다.
+    resp, body = _call("getUpdates", data, timeout=timeout + 10)
+    if resp.status_code != 200 or not body.get("ok"):
+        raise requests.exceptions.RequestException(
+            f"getUpdates 실패: {resp.status_code} {body.get('description') or resp.text[:200]}")
+    return body.get("result") or []
+
+
+def bot_id() -> str | None:
+    """토큰 앞부분(봇 id)을 반환합니다. 봇마다 getUpdates offset을 따로 저장하는 데 씁니다."""
+    return TELEGRAM_BOT_TOKEN.split(":", 1)[0] if TELEGRAM_BOT_TOKEN else None
 
 
 def set_webhook(webhook_url: str) -> bool:
@@ -49,10 +227,14 @@ def set_webhook(webhook_url: str) -> bool:
     if not is_configured():
         print("❌ TELEGRAM_BOT_TOKEN 미설정")
         return False
-    url = f"{API_BASE}/setWebhook"
     try:
-        resp = requests.post(url, data={"url": webhook_url}, timeout=10)
-        if resp.status_code == 200 and resp.json().get("ok"):
+        data = {"url": webhook_url}
+        # 설정하면 텔레그램이 매 요청에 X-Telegram-Bot-Api-Secret-Token 헤더로 돌려보냅니다.
+        secret = os.environ.get("TELEGRAM_WEBHOOK_SECRET")
+        if secret:
+            data["secret_token"] = secret
+        resp, body = _call("setWebhook", data)
+        if resp.status_code == 200 and body.get("ok"):
             print("✅ 텔레그램 웹훅 설정 성공")
             return True
         print(f"❌ 텔레그램 웹훅 설정 실패: {resp.status_code} {resp.text}")
@@ -67,10 +249,9 @@ def delete_webhook() -> bool:
     if not is_configured():
         print("❌ TELEGRAM_BOT_TOKEN 미설정")
         return False
-    url = f"{API_BASE}/deleteWebhook"
     try:
-        resp = requests.post(url, timeout=10)
-        if resp.status_code == 200 and resp.json().get("ok"):
+        resp, body = _call("deleteWebhook")
+        if resp.status_code == 200 and body.get("ok"):
             print("✅ 텔레그램 웹훅 해제 성공")
             return True
         print(f"❌ 텔레그램 웹훅 해제 실패: {resp.status_code} {resp.text}")
@@ -0,0 +1,117 @@
+# watches.py
+"""
+사용자별 키워드 알림(/watch)
+
+키워드를 하나 이상 등록한 구독자는 제목이나 게시판 이름에 키워드가 들어간 공지만 받고,
+등록하지 않은 구독자는 지금처럼 모든 공지를 받습니다.
+발송 시점에 모든 키워드로 Aho-Corasick 오토마톤을 한 번 만들고 제목마다 한 번만 훑으므로,
+비용은 사용자 수 × 키워드 수가 아니라 제목 길이 + 일치한 키워드 수에 비례합니다.
+"""
+import os
+from collections import deque
+
+import database
+
+WATCH_MAX_PER_USER = int(os.environ.get("WATCH_MAX_PER_USER", "20"))
+WATCH_MAX_LENGTH = 30
+
+
+def normalize(text: str) -> str:
+    """대소문자와 공백 차이를 무시합니다("수강 신청" == "수강신청")."""
+    return "".join(text.split()).lower()
+
+
+class AhoCorasick:
+    """순수 파이썬 Aho-Corasick 오토마톤입니다. find(text)는 text에 들어 있는 키워드 번호 집합을 반환합니다."""
+
+    def __init__(self, keywords: list[str]):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for index, keyword in enumerate(keywords):
+            node = 0
+            for ch in keyword:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] = self._out[node] + (index,)
+        # 너비 우선으로 실패 링크를 만들고, 실패 링크 쪽 출력을 미리 합쳐 둡니다.
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> set[int]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class WatchIndex:
+    """키워드 → 사용자 집합 역색인과 키워드 오토마톤입니다."""
+
+    def __init__(self, watches: dict[str, set]):
+        self.keywords = list(watches)
+        self._users = [frozenset(watches[k]) for k in self.keywords]
+        self._automaton = AhoCorasick(self.keywords) if self.keywords else None
+
+    def match(self, text: str) -> set:
+        """text에 등록 키워드가 들어 있는 사용자 집합을 반환합니다."""
+        if self._automaton is None:
+            return set()
+        users = set()
+        for index in self._automaton.find(normalize(text)):
+            users.update(self._users[index])
+        return users
+
+
+def load_index() -> WatchIndex:
+    """현재 구독자들의 키워드로 색인을 만듭니다."""
+    return WatchIndex({keyword: set(user_ids) for keyword, user_ids in database.load_watches()})
+
+
+def match_posts(posts: list[dict], index: WatchIndex | None = None) -> dict:
+    """게시글 링크별로 키워드가 일치한 사용자 목록을 반환합니다."""
+    index = index or load_index()
+    return {post["link"]: sorted(index.match(f"{post.get('board', '')} {post['title']}")) for post in posts}
+
+
+def add(user_id: str, keyword: str) -> tuple[bool, str]:
+    """키워드를 등록합니다. 반환값: (성공 여부, 정규화된 키워드 또는 오류 메시지)"""
+    keyword = normalize(keyword)
+    if not keyword:
+        return False, "키워드를 입력해주세요."
+    if len(keyword) > WATCH_MAX_LENGTH:
+        return False, f"키워드는 {WATCH_MAX_LENGTH}자 이하로 입력해주세요."
+    if not database.add_watch(str(user_id), keyword, WATCH_MAX_PER_USER):
+        return False, f"키워드는 최대 {WATCH_MAX_PER_USER}개까지 등록할 수 있습니다."
+    return True, keyword
+
+
+def remove(user_id: str, keyword: str | None = None) -> int:
+    """키워드를 해제합니다. keyword가 없으면 전체 해제합니다."""
+    return database.remove_watches(str(user_id), normalize(keyword) if keyword else None)
+
+
+def list_for(user_id: str) -> list[str]:
+    return database.list_watches(str(user_id))
@@ -0,0 +1,107 @@
+# webhook.py
+"""
+텔레그램 웹훅 수신 경로
+
+accept()는 업데이트를 검사·중복 제거한 뒤 곧바로 결과를 돌려주므로, 텔레그램은 우리 DB나
+외부 HTTP 지연을 기다리지 않습니다. 메모리만으로 답할 수 있는 명령은 웹훅 응답 본문
+(method=sendMessage)으로 답장해 별도 요청을 아끼고, 나머지는 제한된 워커 풀에서 처리합니다.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import commands
+import metrics
+from telegram_utils import send_message as tg_send_message
+
+WEBHOOK_WORKERS = int(os.environ.get("WEBHOOK_WORKERS", "4"))
+# 처리 중 + 대기 중인 업데이트 상한. 넘치면 503으로 답해 텔레그램이 나중에 다시 보내게 합니다.
+WEBHOOK_QUEUE_MAX = int(os.environ.get("WEBHOOK_QUEUE_MAX", "200"))
+WEBHOOK_DEDUP_SIZE = int(os.environ.get("WEBHOOK_DEDUP_SIZE", "10000"))
+
+
+class UpdateDeduper:
+    """최근 update_id를 기억해 재전송된 업데이트를 걸러냅니다(프로세스 단위, LRU)."""
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, update_id) -> bool:
+        """처음 보는 update_id이면 기록하고 True, 이미 본 것이면 False를 반환합니다."""
+        with self._lock:
+            if update_id in self._seen:
+                return False
+            self._seen[update_id] = None
+            if len(self._seen) > self.size:
+                self._seen.popitem(last=False)
+            return True
+
+    def forget(self, update_id) -> None:
+        with self._lock:
+            self._seen.pop(update_id, None)
+
+
+_deduper = UpdateDeduper(WEBHOOK_DEDUP_SIZE)
+_slots = threading.BoundedSemaphore(max(1, WEBHOOK_QUEUE_MAX))
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ThreadPoolExecutor(max_workers=max(1, WEBHOOK_WORKERS), thread_name_prefix="webhook")
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _process(chat_id, text: str) -> None:
+    try:
+        reply = commands.handle(chat_id, text)
+        tg_send_message(chat_id, reply)
+    except Exception as e:
+        print(f"텔레그램 명령 처리 오류(chat_id={chat_id}): {e}")
+    finally:
+        _slots.release()
+
+
+def accept(update: dict) -> tuple[dict, int]:
+    """업데이트를 접수하고 (응답 본문, HTTP 상태)를 반환합니다."""
+    update_id = update.get("update_id")
+    if update_id is not None and not _deduper.claim(update_id):
+        metrics.WEBHOOK_UPDATES.labels(result="duplicate").inc()
+        return {"ok": True}, 200
+
+    parsed = commands.parse_update(update)
+    if parsed is None:
+        metrics.WEBHOOK_UPDATES.labels(result="ignored").inc()
+        return {"ok": True}, 200
+    chat_id, text = parsed
+    print(f"Telegram webhook: chat_id={chat_id}, text='{text}'")
+
+    reply = commands.quick_reply(chat_id, text)
+    if reply is not None:
+        metrics.WEBHOOK_UPDATES.labels(result="replied").inc()
+        return {"method": "sendMessage", "chat_id": chat_id, "text": reply}, 200
+
+    if not _slots.acquire(blocking=False):
+        # 다시 보내질 업데이트가 중복으로 걸러지지 않도록 기록을 지웁니다.
+        if update_id is not None:
+            _deduper.forget(update_id)
+        metrics.WEBHOOK_UPDATES.labels(result="rejected").inc()
+        return {"ok": False, "description": "busy"}, 503
+    try:
+        _get_pool().submit(_process, chat_id, text)
+    except Exception:
+        _slots.release()
+        if update_id is not None:
+            _deduper.forget(update_id)
+        raise
+    metrics.WEBHOOK_UPDATES.labels(result="queued").inc()
+    return {"ok": True}, 200